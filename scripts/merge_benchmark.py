@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+
+
+"""
+This program benchmarks how spyctl's merge library scales. It
+generates synthetic guardian policies, baselines, fingerprints and
+deviations of a configurable size, then times merging and diffing
+them and tracks the peak memory used. Results are written as JSON so
+runs can be stored and compared. No API access is needed.
+
+Run the benchmarks and store the results using, for example,
+     ./merge_benchmark.py --depth 4 --breadth 3 -o bench.json
+
+Compare a later run against the stored results, exiting non-zero if
+anything got slower or bigger than the threshold allows, using
+     ./merge_benchmark.py --depth 4 --breadth 3 --baseline bench.json
+
+Only benchmark the policies in the repo's policy_library using
+     ./merge_benchmark.py --suite library
+
+"""
+
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from copy import deepcopy
+
+import yaml
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import spyctl.merge_lib as m_lib  # noqa: E402
+import spyctl.resources.baselines as b  # noqa: E402
+import spyctl.resources.policies as p  # noqa: E402
+import spyctl.schemas_v2 as schemas  # noqa: E402
+import spyctl.spyctl_lib as lib  # noqa: E402
+
+RESULTS_VERSION = 1
+POLICY_LIBRARY_DIR = os.path.join(REPO_DIR, "policy_library")
+PROC_NAMES = [
+    "bash",
+    "sh",
+    "python3",
+    "node",
+    "java",
+    "nginx",
+    "curl",
+    "sleep",
+    "cat",
+    "grep",
+]
+EUSERS = ["root", "www-data", "nobody"]
+PORTS = [22, 53, 80, 443, 3306, 5432, 6379, 8080, 8443, 27017]
+DNS_SUFFIXES = ["svc.cluster.local", "example.com", "amazonaws.com"]
+
+
+# -------------------------------------------------------------
+def _parse_cmd_line():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=__doc__,
+    )
+    parser.add_argument(
+        "--suite",
+        choices=["synthetic", "library", "all"],
+        default="all",
+        help="Which objects to benchmark with.",
+    )
+    parser.add_argument(
+        "--depth", type=int, default=4, help="Depth of process trees."
+    )
+    parser.add_argument(
+        "--breadth",
+        type=int,
+        default=3,
+        help="Number of roots and of children per process.",
+    )
+    parser.add_argument(
+        "--ingress", type=int, default=50, help="Ingress nodes per policy."
+    )
+    parser.add_argument(
+        "--egress", type=int, default=200, help="Egress nodes per policy."
+    )
+    parser.add_argument(
+        "--cidr-mix",
+        default="32:0.6,24:0.3,16:0.1",
+        help="Weights of the CIDR prefix lengths of ip blocks,"
+        " e.g. '32:0.6,24:0.3,16:0.1'.",
+    )
+    parser.add_argument(
+        "--dns-ratio",
+        type=float,
+        default=0.2,
+        help="Fraction of network nodes using dns names instead of CIDRs.",
+    )
+    parser.add_argument(
+        "--fingerprints",
+        type=int,
+        default=20,
+        help="Fingerprints merged into each policy.",
+    )
+    parser.add_argument(
+        "--deviations",
+        type=int,
+        default=50,
+        help="Deviations merged into each policy.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=10,
+        help="Timed runs per benchmark.",
+    )
+    parser.add_argument(
+        "--policy-library",
+        default=POLICY_LIBRARY_DIR,
+        help="Directory of policies for the library suite.",
+    )
+    parser.add_argument(
+        "-o", "--output", help="Write the results as JSON to this file."
+    )
+    parser.add_argument(
+        "--baseline", help="Results file to compare this run against."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed relative slowdown or memory growth over the"
+        " baseline before it counts as a regression. Raise it on machines"
+        " with noisy timings, such as small shared VMs.",
+    )
+    parser.add_argument(
+        "--noise-floor",
+        type=float,
+        default=2.0,
+        help="Milliseconds the fastest run must slow down by, on top of the"
+        " threshold, to count as a regression. Keeps timer noise in very"
+        " short benchmarks from failing the comparison.",
+    )
+    args = parser.parse_args()
+    args.cidr_mix = _parse_cidr_mix(args.cidr_mix)
+    return args
+
+
+def _parse_cidr_mix(mix: str):
+    rv = {}
+    for item in mix.split(","):
+        prefixlen, weight = item.split(":")
+        rv[int(prefixlen)] = float(weight)
+    return rv
+
+
+# -------------------------------------------------------------
+# Synthetic objects
+
+
+class Generator:
+    def __init__(self, options, seed):
+        self.options = options
+        self.rng = random.Random(seed)
+        self.next_id = 0
+
+    def process_tree(self, depth, breadth, euser=None):
+        name = self.rng.choice(PROC_NAMES)
+        self.next_id += 1
+        node = {
+            lib.NAME_FIELD: name,
+            lib.EXE_FIELD: [f"/usr/bin/{name}"],
+            lib.ID_FIELD: f"{name}_{self.next_id}",
+        }
+        if euser is None:
+            node[lib.EUSER_FIELD] = [self.rng.choice(EUSERS)]
+        if self.rng.random() < 0.1:
+            node[lib.LISTENING_SOCKETS] = [
+                {
+                    lib.PROTO_FIELD: "TCP",
+                    lib.PORT_FIELD: self.rng.choice(PORTS),
+                }
+            ]
+        if depth > 1:
+            node[lib.CHILDREN_FIELD] = [
+                self.process_tree(depth - 1, breadth, euser=False)
+                for _ in range(breadth)
+            ]
+        return node
+
+    def process_policy(self, depth, breadth):
+        return [self.process_tree(depth, breadth) for _ in range(breadth)]
+
+    def cidr(self):
+        prefixlens = list(self.options.cidr_mix)
+        weights = list(self.options.cidr_mix.values())
+        prefixlen = self.rng.choices(prefixlens, weights)[0]
+        address = self.rng.getrandbits(32)
+        address &= (0xFFFFFFFF << (32 - prefixlen)) & 0xFFFFFFFF
+        octets = ".".join(str(address >> s & 0xFF) for s in (24, 16, 8, 0))
+        return f"{octets}/{prefixlen}"
+
+    def peer(self):
+        if self.rng.random() < self.options.dns_ratio:
+            name = f"svc{self.rng.randrange(1000)}"
+            return {
+                lib.DNS_SELECTOR_FIELD: [
+                    f"{name}.{self.rng.choice(DNS_SUFFIXES)}"
+                ]
+            }
+        return {lib.IP_BLOCK_FIELD: {lib.CIDR_FIELD: self.cidr()}}
+
+    def network_node(self, direction, proc_ids):
+        if direction == lib.EGRESS_FIELD:
+            peer_field = lib.TO_FIELD
+        else:
+            peer_field = lib.FROM_FIELD
+        return {
+            peer_field: [self.peer()],
+            lib.PROCESSES_FIELD: [self.rng.choice(proc_ids)],
+            lib.PORTS_FIELD: [
+                {
+                    lib.PROTO_FIELD: "TCP",
+                    lib.PORT_FIELD: self.rng.choice(PORTS),
+                }
+            ],
+        }
+
+    def spec(self, depth, breadth, ingress, egress):
+        proc_policy = self.process_policy(depth, breadth)
+        proc_ids = [root[lib.ID_FIELD] for root in proc_policy]
+        return {
+            lib.CONT_SELECTOR_FIELD: {lib.IMAGE_FIELD: "benchmark:*"},
+            lib.PROC_POLICY_FIELD: proc_policy,
+            lib.NET_POLICY_FIELD: {
+                lib.INGRESS_FIELD: [
+                    self.network_node(lib.INGRESS_FIELD, proc_ids)
+                    for _ in range(ingress)
+                ],
+                lib.EGRESS_FIELD: [
+                    self.network_node(lib.EGRESS_FIELD, proc_ids)
+                    for _ in range(egress)
+                ],
+            },
+        }
+
+    def guardian_object(self, kind, spec, **metadata):
+        rv = {
+            lib.API_FIELD: lib.API_VERSION,
+            lib.KIND_FIELD: kind,
+            lib.METADATA_FIELD: {
+                lib.METADATA_NAME_FIELD: "benchmark",
+                lib.METADATA_TYPE_FIELD: lib.POL_TYPE_CONT,
+                lib.LATEST_TIMESTAMP_FIELD: time.time(),
+                **metadata,
+            },
+            lib.SPEC_FIELD: spec,
+        }
+        if kind == lib.POL_KIND:
+            rv[lib.RESPONSE_FIELD] = {
+                lib.RESP_DEFAULT_FIELD: [
+                    {lib.ACTION_MAKE_REDFLAG: {lib.FLAG_SEVERITY: "high"}}
+                ],
+                lib.RESP_ACTIONS_FIELD: [],
+            }
+        return rv
+
+    def policy(self):
+        opts = self.options
+        spec = self.spec(opts.depth, opts.breadth, opts.ingress, opts.egress)
+        return self.guardian_object(
+            lib.POL_KIND, spec, **{lib.METADATA_UID_FIELD: "pol:benchmark"}
+        )
+
+    def baseline(self):
+        opts = self.options
+        spec = self.spec(opts.depth, opts.breadth, opts.ingress, opts.egress)
+        return self.guardian_object(lib.BASELINE_KIND, spec)
+
+    def fingerprint(self):
+        # Fingerprints cover a slice of what a policy would
+        opts = self.options
+        spec = self.spec(
+            opts.depth,
+            max(1, opts.breadth // 2),
+            max(1, opts.ingress // 10),
+            max(1, opts.egress // 10),
+        )
+        return self.guardian_object(lib.FPRINT_KIND, spec)
+
+    def deviation(self):
+        spec = self.spec(2, 1, 0, 1)
+        return self.guardian_object(
+            lib.DEVIATION_KIND, spec, policy_uid="pol:benchmark"
+        )
+
+
+def perturb(policy, gen: Generator):
+    """A copy of a policy with a few new processes and connections, as
+    if it had been observed running somewhere new."""
+    rv = deepcopy(policy)
+    spec = rv[lib.SPEC_FIELD]
+    proc_policy = spec.setdefault(lib.PROC_POLICY_FIELD, [])
+    if proc_policy:
+        root = proc_policy[0]
+        root.setdefault(lib.CHILDREN_FIELD, []).append(
+            gen.process_tree(2, 1, euser=False)
+        )
+    proc_policy.append(gen.process_tree(2, 1))
+    proc_ids = [root[lib.ID_FIELD] for root in proc_policy]
+    net_policy = spec.setdefault(lib.NET_POLICY_FIELD, {})
+    for direction in (lib.INGRESS_FIELD, lib.EGRESS_FIELD):
+        nodes = net_policy.setdefault(direction, [])
+        nodes.append(gen.network_node(direction, proc_ids))
+    return rv
+
+
+# -------------------------------------------------------------
+# Benchmarks, each is a setup function returning the timed function
+
+
+def policy_merge_object(policy):
+    return m_lib.MergeObject(
+        policy, p.POLICY_MERGE_SCHEMAS, schemas.valid_object
+    )
+
+
+def baseline_merge_object(baseline):
+    return m_lib.MergeObject(
+        baseline, b.BASELINE_MERGE_SCHEMAS, schemas.valid_object
+    )
+
+
+def bench_asymmetric_merge(targets, with_objs):
+    def setup():
+        merge_objs = [policy_merge_object(t) for t in targets]
+
+        def run():
+            for merge_obj, others in zip(merge_objs, with_objs):
+                for other in others:
+                    merge_obj.asymmetric_merge(other)
+
+        return run
+
+    return setup
+
+
+def bench_symmetric_merge(targets, others):
+    def setup():
+        merge_objs = [baseline_merge_object(t) for t in targets]
+
+        def run():
+            for merge_obj, other in zip(merge_objs, others):
+                merge_obj.symmetric_merge(other)
+
+        return run
+
+    return setup
+
+
+def bench_internal_merge(targets):
+    def setup():
+        node_lists = []
+        for target in targets:
+            spec = target[lib.SPEC_FIELD]
+            proc_list = m_lib.ProcessNodeList(spec[lib.PROC_POLICY_FIELD])
+            # Network nodes look up their processes in the base list
+            m_lib.BASE_NODE_LIST = proc_list
+            net_policy = spec[lib.NET_POLICY_FIELD]
+            for direction in (lib.INGRESS_FIELD, lib.EGRESS_FIELD):
+                node_lists.append(
+                    m_lib.NetworkNodeList(net_policy[direction], proc_list)
+                )
+
+        def run():
+            for node_list in node_lists:
+                node_list.internal_merge()
+
+        return run
+
+    return setup
+
+
+def bench_get_diff(merged):
+    def setup():
+        def run():
+            for merge_obj in merged:
+                merge_obj.get_diff()
+
+        return run
+
+    return setup
+
+
+def bench_guardian_object_diff(merged):
+    def setup():
+        def run():
+            for merge_obj in merged:
+                m_lib.guardian_object_diff(
+                    merge_obj.original_obj, merge_obj.get_obj_data()
+                )
+
+        return run
+
+    return setup
+
+
+def merged_objects(targets, with_objs):
+    rv = []
+    for target, others in zip(targets, with_objs):
+        merge_obj = policy_merge_object(target)
+        for other in others:
+            merge_obj.asymmetric_merge(other)
+        rv.append(merge_obj)
+    return rv
+
+
+def synthetic_benchmarks(options):
+    gen = Generator(options, options.seed)
+    policy = gen.policy()
+    fprints = [gen.fingerprint() for _ in range(options.fingerprints)]
+    deviations = [gen.deviation() for _ in range(options.deviations)]
+    baseline = gen.baseline()
+    other_baseline = gen.baseline()
+    merged = merged_objects([policy], [fprints + deviations])
+    return {
+        "synthetic/asymmetric_merge/fingerprints": bench_asymmetric_merge(
+            [policy], [fprints]
+        ),
+        "synthetic/asymmetric_merge/deviations": bench_asymmetric_merge(
+            [policy], [deviations]
+        ),
+        "synthetic/symmetric_merge": bench_symmetric_merge(
+            [baseline], [other_baseline]
+        ),
+        "synthetic/internal_merge": bench_internal_merge([policy]),
+        "synthetic/get_diff": bench_get_diff(merged),
+        "synthetic/guardian_object_diff": bench_guardian_object_diff(merged),
+    }
+
+
+def load_policy_library(directory):
+    rv = []
+    pattern = os.path.join(directory, "**", "*.yaml")
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path) as f:
+            rv.append(yaml.safe_load(f))
+    return rv
+
+
+def library_benchmarks(options):
+    gen = Generator(options, options.seed)
+    policies = load_policy_library(options.policy_library)
+    if not policies:
+        sys.exit(f"No policies found in {options.policy_library}")
+    others = [perturb(policy, gen) for policy in policies]
+    merged = merged_objects(policies, [[o] for o in others])
+    return {
+        "library/asymmetric_merge": bench_asymmetric_merge(
+            policies, [[o] for o in others]
+        ),
+        "library/symmetric_merge": bench_symmetric_merge(policies, others),
+        "library/internal_merge": bench_internal_merge(others),
+        "library/get_diff": bench_get_diff(merged),
+        "library/guardian_object_diff": bench_guardian_object_diff(merged),
+    }
+
+
+# -------------------------------------------------------------
+# Measuring and reporting
+
+
+def calibration():
+    """A fixed pure python workload, timed alongside every benchmark so
+    that comparisons can factor out how fast the machine was running."""
+    data = [
+        {
+            "id": f"proc-{i}",
+            "children": [
+                {"name": f"child-{j}", "ports": PORTS, "leaf": j % 2 == 0}
+                for j in range(5)
+            ],
+        }
+        for i in range(500)
+    ]
+
+    def run():
+        deepcopy(data)
+
+    return run
+
+
+def measure(setup, calibrate, repeat):
+    times = []
+    calibration_times = []
+    for _ in range(repeat):
+        run = setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            calibrate()
+            calibration_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    # Tracing slows everything down so memory gets a run of its own
+    run = setup()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.mean(times),
+        "peak_bytes": peak,
+        "repeat": repeat,
+        "calibration_s": min(calibration_times),
+    }
+
+
+def compare(results, baseline, threshold, noise_floor):
+    """Returns the names of the benchmarks that regressed.
+
+    A slowdown only counts if even the fastest run is slower than the
+    baseline's median run by the threshold, and slower than the
+    baseline's fastest run by more than noise_floor seconds, and the
+    median run is slower too. Times are first scaled by how much faster
+    the calibration workload ran in the baseline, so a machine that is
+    busier than when the baseline was made doesn't look like a
+    regression. The median calibration over all benchmarks is used
+    because a single one can be as noisy as its benchmark."""
+    speed = 1
+    calibrations = [
+        (base["calibration_s"], results[name]["calibration_s"])
+        for name, base in baseline.items()
+        if name in results and base.get("calibration_s")
+    ]
+    # Baselines from before calibration was recorded aren't scaled
+    if calibrations:
+        speed = statistics.median(base for base, _ in calibrations)
+        speed /= statistics.median(result for _, result in calibrations)
+    regressions = []
+    print(f"\n{'benchmark':<45} {'min':>8} {'median':>8} {'memory':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<45} {'new':>8} {'new':>8} {'new':>8}")
+            continue
+        min_s = result["min_s"] * speed
+        base_median_s = max(base["median_s"], 1e-9)
+        min_ratio = min_s / base_median_s
+        median_ratio = result["median_s"] * speed / base_median_s
+        mem_ratio = result["peak_bytes"] / max(base["peak_bytes"], 1)
+        slower = (
+            min_ratio > 1 + threshold
+            and median_ratio > 1 + threshold
+            and min_s - base["min_s"] > noise_floor
+        )
+        flag = ""
+        if slower or mem_ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<45} {min_ratio:>7.2f}x {median_ratio:>7.2f}x"
+            f" {mem_ratio:>7.2f}x{flag}"
+        )
+    return regressions
+
+
+options = _parse_cmd_line()
+
+benchmarks = {}
+if options.suite in ("synthetic", "all"):
+    benchmarks.update(synthetic_benchmarks(options))
+if options.suite in ("library", "all"):
+    benchmarks.update(library_benchmarks(options))
+
+calibrate = calibration()
+results = {}
+print(f"{'benchmark':<45} {'median':>10} {'min':>10} {'peak':>10}")
+for name, setup in benchmarks.items():
+    result = measure(setup, calibrate, options.repeat)
+    results[name] = result
+    print(
+        f"{name:<45} {result['median_s'] * 1000:>8.1f}ms"
+        f" {result['min_s'] * 1000:>8.1f}ms"
+        f" {result['peak_bytes'] / 1024:>8.0f}KB"
+    )
+
+output = {
+    "version": RESULTS_VERSION,
+    "python": platform.python_version(),
+    "params": {
+        "depth": options.depth,
+        "breadth": options.breadth,
+        "ingress": options.ingress,
+        "egress": options.egress,
+        "cidr_mix": options.cidr_mix,
+        "dns_ratio": options.dns_ratio,
+        "fingerprints": options.fingerprints,
+        "deviations": options.deviations,
+        "seed": options.seed,
+    },
+    "results": results,
+}
+if options.output:
+    with open(options.output, "w") as f:
+        json.dump(output, f, indent=2)
+
+if options.baseline:
+    with open(options.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("params") != json.loads(json.dumps(output["params"])):
+        print(
+            "\nWarning: the baseline was generated with different"
+            " parameters.",
+            file=sys.stderr,
+        )
+    if compare(
+        results,
+        baseline.get("results", {}),
+        options.threshold,
+        options.noise_floor / 1000,
+    ):
+        sys.exit(1)
@@ -29,6 +29,11 @@ MAX_TIME_RANGE_SECS = 43200  # 12 hours
 NAMESPACES_MAX_RANGE_SECS = 2000
 TIMEOUT_MSG = "A timeout occurred during the API request. "
 
+# Sends the requests of the api primitives, replaced by commands run from
+# the daemon so requests go out on its warm connections, see
+# set_transport
+TRANSPORT: Callable[..., requests.Response] = requests.request
+
 
 class NotFoundException(ValueError):
     pass
@@ -39,6 +44,13 @@ class NotFoundException(ValueError):
 # ----------------------------------------------------------------- #
 
 
+def set_transport(transport: Callable[..., requests.Response]):
+    """Sends the requests of the api primitives with transport, a function
+    taking the arguments of requests.request."""
+    global TRANSPORT
+    TRANSPORT = transport
+
+
 def get(url, key, params=None, raise_notfound=False):
     if key:
         headers = {
@@ -49,7 +61,9 @@ def get(url, key, params=None, raise_notfound=False):
     else:
         headers = None
     try:
-        r = requests.get(url, headers=headers, timeout=TIMEOUT, params=params)
+        r = TRANSPORT(
+            "GET", url, headers=headers, timeout=TIMEOUT, params=params
+        )
     except requests.exceptions.Timeout as e:
         cli.err_exit(TIMEOUT_MSG + str(*e.args))
     context_uid = r.headers.get("x-context-uid", "No context uid found.")
@@ -83,7 +97,7 @@ def get(url, key, params=None, raise_notfound=False):
 def post(url, data, key, raise_notfound=False):
     headers = {"Authorization": f"Bearer {key}"}
     try:
-        r = requests.post(url, json=data, headers=headers, timeout=TIMEOUT)
+        r = TRANSPORT("POST", url, json=data, headers=headers, timeout=TIMEOUT)
     except requests.exceptions.Timeout as e:
         cli.err_exit(TIMEOUT_MSG + str(e.args))
     context_uid = r.headers.get("x-context-uid", "No context uid found.")
@@ -117,7 +131,7 @@ def post(url, data, key, raise_notfound=False):
 def put(url, data, key):
     headers = {"Authorization": f"Bearer {key}"}
     try:
-        r = requests.put(url, json=data, headers=headers, timeout=TIMEOUT)
+        r = TRANSPORT("PUT", url, json=data, headers=headers, timeout=TIMEOUT)
     except requests.exceptions.Timeout as e:
         cli.err_exit(TIMEOUT_MSG + str(e.args))
     context_uid = r.headers.get("x-context-uid", "No context uid found.")
@@ -149,7 +163,7 @@ def put(url, data, key):
 def delete(url, key):
     headers = {"Authorization": f"Bearer {key}"}
     try:
-        r = requests.delete(url, headers=headers, timeout=TIMEOUT)
+        r = TRANSPORT("DELETE", url, headers=headers, timeout=TIMEOUT)
     except requests.exceptions.Timeout as e:
         cli.err_exit(TIMEOUT_MSG + str(e.args))
     context_uid = r.headers.get("x-context-uid", "No context uid found.")
@@ -1,16 +1,25 @@
+import itertools
 import json
+import math
 import os
 import re
 import sys
 import time
 from collections.abc import Sequence
+from contextlib import contextmanager, redirect_stdout
 from pathlib import Path
 from pydoc import pager, pipepager
-from typing import Callable, Dict, List
+from typing import Callable, Dict, Iterable, List, Optional
 
 import yaml
 
 import spyctl.spyctl_lib as lib
+import spyctl.table_export as tbl
+
+try:
+    import orjson
+except ImportError:  # Optional, only used to speed up json output
+    orjson = None
 
 yaml.Dumper.ignore_aliases = lambda *args: True
 
@@ -18,6 +27,17 @@ WARNING_MSG = "is_warning"
 WARNING_COLOR = lib.WARNING_COLOR
 COLOR_END = lib.COLOR_END
 
+# Record streams are written once this many characters are buffered or
+# this many seconds have passed since the last write.
+WRITE_BUFFER_SIZE = 1 << 16
+WRITE_FLUSH_INTERVAL = 0.5
+
+# Rows a streamed table reads before fixing its column widths
+TABLE_SAMPLE_ROWS = 100
+# Cell types of a streamed table from least to most generic, a column
+# has the most generic type of its cells, as in tabulate
+TABLE_CELL_TYPES = [type(None), bool, int, float, str]
+
 
 def try_log(*args, **kwargs):
     lib.try_log(*args, **kwargs)
@@ -28,9 +48,15 @@ def try_print(*args, **kwargs):
         print(*args, **kwargs)
         sys.stdout.flush()
     except BrokenPipeError:
-        devnull = os.open(os.devnull, os.O_WRONLY)
-        os.dup2(devnull, sys.stdout.fileno())
-        sys.exit(1)
+        _exit_broken_pipe()
+
+
+def _exit_broken_pipe():
+    # Python flushes stdout again at exit, so point it somewhere that
+    # won't raise a second time
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    sys.exit(1)
 
 
 def unsupported_output_msg(output: str) -> str:
@@ -117,7 +143,7 @@ def show(
     """
     out_data = None
     if output == lib.OUTPUT_YAML:
-        out_data = yaml.dump(obj, sort_keys=False)
+        out_data = lib.yaml_dump(obj, sort_keys=False)
         if output_fn:
             output_fn += ".yaml"
     elif output == lib.OUTPUT_JSON:
@@ -156,6 +182,359 @@ def show(
             try_print(out_data)
 
 
+class RecordWriter:
+    def __init__(
+        self,
+        output,
+        ndjson=False,
+        alternative_outputs: Dict[str, Callable] = {},
+        buffer_size=WRITE_BUFFER_SIZE,
+        single=False,
+    ):
+        """Writes a stream of records to stdout, formatted like show()
+        would format each of them, but batching the writes.
+
+        Records are written once buffer_size characters are buffered or
+        WRITE_FLUSH_INTERVAL seconds have passed, and when the writer is
+        closed. With json output and ndjson unset, the records are
+        written as a single json array, "[]" if there are none. Only when
+        single is set is a lone record written on its own, as show()
+        would. A closed pipe ends the stream once, rather than being
+        handled for every record.
+
+        >>> with RecordWriter(output, ndjson=NDJSON) as writer:
+        ...     for record in records:
+        ...         writer.write(record)
+
+        Args:
+            output (str): the format of the output
+            ndjson (bool, optional): If output is json, output each
+                record on a single line. Defaults to False.
+            alternative_outputs (Dict[str, Callable], optional): A
+                dictionary of formats to callables for custom outputs.
+                Defaults to {}. Callable must return a string.
+            buffer_size (int, optional): Number of characters to buffer
+                before writing. Defaults to WRITE_BUFFER_SIZE.
+            single (bool, optional): The records are the result of
+                asking for a single named resource, so one record is
+                written as an object rather than an array. Defaults to
+                False.
+        """
+        self.output = output
+        self.ndjson = ndjson
+        self.alternative_outputs = alternative_outputs
+        self.buffer_size = buffer_size
+        self.single = single
+        self.buffer: List[str] = []
+        self.buffered = 0
+        self.last_write = time.monotonic()
+        self.count = 0
+        # The first record of a single resource's json, held until we
+        # know whether there will be more than one
+        self.first = None
+        self.closed = False
+        if (
+            output not in (lib.OUTPUT_YAML, lib.OUTPUT_JSON, lib.OUTPUT_RAW)
+            and output not in alternative_outputs
+        ):
+            try_log(unsupported_output_msg(output), is_warning=True)
+            self.closed = True
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif not self.closed:
+            # Keep what was already output, but leave a json array
+            # unterminated so the output can't be mistaken for complete
+            self.closed = True
+            self.flush()
+
+    def write(self, obj):
+        if self.closed:
+            return
+        output = self.output
+        if output == lib.OUTPUT_JSON:
+            if self.ndjson:
+                items = obj if _seq_but_not_str(obj) else [obj]
+                for item in items:
+                    self.__emit(_json_dumps(item) + "\n")
+                return
+            self.__write_array_item(_json_dumps(obj, indent=True))
+            return
+        if output == lib.OUTPUT_YAML:
+            out_data = lib.yaml_dump(obj, sort_keys=False)
+        elif output == lib.OUTPUT_RAW:
+            out_data = obj
+        else:
+            out_data = self.alternative_outputs[output](obj)
+        if out_data:
+            self.__emit(out_data + "\n")
+
+    def write_line(self, line: str):
+        """Writes a line of raw output as is, even an empty one."""
+        if not self.closed:
+            self.__emit(line + "\n")
+
+    def flush(self):
+        if not self.buffer:
+            return
+        out_data = "".join(self.buffer)
+        self.buffer.clear()
+        self.buffered = 0
+        self.last_write = time.monotonic()
+        try:
+            sys.stdout.write(out_data)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            self.closed = True
+            _exit_broken_pipe()
+
+    def close(self):
+        if self.closed:
+            return
+        if self.output == lib.OUTPUT_JSON and not self.ndjson:
+            if self.first is not None:
+                self.__emit(self.first + "\n")
+            elif self.count:
+                self.__emit("\n]\n")
+            else:
+                self.__emit("[]\n")
+        self.closed = True
+        self.flush()
+
+    def __write_array_item(self, out_data: str):
+        # Indented the way json.dumps(records, indent=2) would indent
+        # the items of the array
+        self.count += 1
+        if self.count == 1:
+            if self.single:
+                self.first = out_data
+                return
+            self.__emit("[\n  " + out_data.replace("\n", "\n  "))
+            return
+        if self.first is not None:
+            self.__emit("[\n  " + self.first.replace("\n", "\n  "))
+            self.first = None
+        self.__emit(",\n  " + out_data.replace("\n", "\n  "))
+
+    def __emit(self, out_data: str):
+        self.buffer.append(out_data)
+        self.buffered += len(out_data)
+        if (
+            self.buffered >= self.buffer_size
+            or time.monotonic() - self.last_write >= WRITE_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+
+def show_records(
+    objs: Iterable,
+    output,
+    alternative_outputs: Dict[str, Callable] = {},
+    ndjson=False,
+    single=False,
+):
+    """Display a stream of python objects, see RecordWriter. Table
+    outputs (e.g. parquet) are written by a table_export.TableWriter."""
+    if output in lib.TABLE_OUTPUTS:
+        writer = tbl.TableWriter(output)
+    else:
+        writer = RecordWriter(
+            output, ndjson, alternative_outputs, single=single
+        )
+    try:
+        with writer:
+            for obj in objs:
+                writer.write(obj)
+    except BrokenPipeError:
+        _exit_broken_pipe()
+
+
+def show_table_stream(
+    rows: Iterable[List],
+    headers: List[str],
+    sample_size=TABLE_SAMPLE_ROWS,
+):
+    """Display a table as its rows arrive, without holding the rows in
+    memory.
+
+    The columns are typed, formatted and aligned from the headers and
+    the first sample_size rows as tabulate's "plain" format would for
+    str, int, float, bool and None cells: floats are formatted with
+    "g", numbers are aligned on their decimal point and empty rows are
+    kept. A table of up to sample_size rows is identical to tabulate's
+    (bool and empty string cells are typed as tabulate 0.10 types them,
+    0.9 differs).
+    A later cell that is wider than its column overflows it, pushing
+    the rest of its row to the right, rather than being cut.
+
+    Args:
+        rows (Iterable[List]): The rows of the table.
+        headers (List[str]): The column headers.
+        sample_size (int, optional): Number of rows used to lay out the
+            columns. Defaults to TABLE_SAMPLE_ROWS.
+    """
+    rows = iter(rows)
+    sample = [
+        _table_row(row, len(headers))
+        for row in itertools.islice(rows, sample_size)
+    ]
+    columns = [
+        _TableColumn(header, [row[i] for row in sample])
+        for i, header in enumerate(headers)
+    ]
+
+    def format_row(cells: List) -> str:
+        line = "  ".join(
+            column.format(cell) for column, cell in zip(columns, cells)
+        )
+        return line.rstrip()
+
+    with RecordWriter(lib.OUTPUT_RAW) as writer:
+        writer.write_line(
+            "  ".join(column.header for column in columns).rstrip()
+        )
+        for cells in sample:
+            writer.write_line(format_row(cells))
+        for row in rows:
+            writer.write_line(format_row(_table_row(row, len(headers))))
+
+
+class _TableColumn:
+    def __init__(self, header: str, cells: List):
+        """A column of show_table_stream, typed and sized from a sample
+        of its cells.
+
+        Args:
+            header (str): The column header.
+            cells (List): The sampled cells of the column.
+        """
+        self.type = max(
+            [bool, *map(_table_cell_type, cells)],
+            key=TABLE_CELL_TYPES.index,
+        )
+        self.numeric = self.type in (int, float)
+        texts = [self.__text(cell) for cell in cells]
+        # Digits after the decimal point, numbers are padded on the
+        # right to line those up
+        self.decimals = max(map(_afterpoint, texts), default=-1)
+        self.width = max(
+            [len(header) + 2, *(len(self.__align(text)) for text in texts)]
+        )
+        if self.numeric:
+            self.header = header.rjust(self.width)
+        else:
+            self.header = header.ljust(self.width)
+
+    def format(self, cell) -> str:
+        text = self.__align(self.__text(cell))
+        if self.numeric:
+            return text.rjust(self.width)
+        return text.ljust(self.width)
+
+    def __text(self, cell) -> str:
+        if cell is None or (isinstance(cell, str) and not cell):
+            return ""
+        if self.type is float:
+            try:
+                return format(float(cell), "g")
+            except (ValueError, TypeError):
+                pass
+        return str(cell)
+
+    def __align(self, text: str) -> str:
+        if self.numeric:
+            return text + " " * (self.decimals - _afterpoint(text))
+        return text.strip()
+
+
+def _table_row(row: List, length: int) -> List:
+    return list(
+        itertools.islice(itertools.chain(row, [None] * length), length)
+    )
+
+
+def _table_cell_type(cell) -> type:
+    if cell is None or (isinstance(cell, str) and not cell):
+        return type(None)
+    if hasattr(cell, "isoformat"):  # dates and times
+        return str
+    if type(cell) is bool or cell in ("True", "False"):
+        return bool
+    if _is_int(cell):
+        return int
+    if _is_number(cell):
+        return float
+    return str
+
+
+def _afterpoint(text: str) -> int:
+    if not _is_number(text) or _is_int(text):
+        return -1
+    pos = text.rfind(".")
+    if pos < 0:
+        pos = text.lower().rfind("e")
+    return len(text) - pos - 1 if pos >= 0 else -1
+
+
+def _is_int(value) -> bool:
+    if type(value) is int:
+        return True
+    if not isinstance(value, str):
+        return False
+    try:
+        int(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_number(value) -> bool:
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return False
+    if isinstance(value, str) and (math.isinf(number) or math.isnan(number)):
+        # Not a number that overflows, like "1e999"
+        return value.lower() in ("inf", "-inf", "nan")
+    return True
+
+
+def _json_dumps(obj, indent=False) -> str:
+    if indent:
+        return json.dumps(obj, sort_keys=False, indent=2)
+    # Only --ndjson lines use orjson, whose output differs from
+    # json.dumps': no spaces after separators, non-ASCII characters
+    # unescaped, NaN as null and exponents written like 1e20
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            # e.g. non-string keys or integers too large for orjson
+            pass
+    return json.dumps(obj)
+
+
+@contextmanager
+def output_to_file(path: Optional[str]):
+    """Sends what would be output to stdout to the file at path
+    instead, compressed if path ends in .gz or .zst. Does nothing if path
+    is None."""
+    if not path:
+        yield
+        return
+    try:
+        out_file = lib.open_file(path, "w")
+    except OSError as e:
+        err_exit(f"Unable to open '{path}' for writing: {e.strerror}")
+    with out_file, redirect_stdout(out_file):
+        yield
+    try_log(f"Saved output to {path}")
+
+
 def read_stdin():
     if sys.stdin.isatty():
         return ""
@@ -177,7 +556,7 @@ def handle_list(list_string: str, obj_to_str=None) -> List[str]:
         try:
             objs = json.loads(list_string)
         except json.JSONDecodeError:
-            objs = yaml.load(list_string, yaml.Loader)
+            objs = yaml.load(list_string, lib.YamlLoader)
             if isinstance(objs, str):
                 raise ValueError
         if obj_to_str is not None:
@@ -0,0 +1,41 @@
+import time
+
+import spyctl.cli as cli
+import spyctl.daemon as dmn
+
+
+def handle_daemon_start(cache_ttl: int, foreground=False):
+    if not dmn.supported():
+        cli.err_exit("The spyctl daemon is not supported on this platform.")
+    status = dmn.send_message(dmn.STATUS)
+    if status is not None:
+        cli.err_exit(f"The daemon is already running (pid {status['pid']}).")
+    if foreground:
+        cli.try_log(f"Serving spyctl commands on {dmn.socket_path()}")
+        dmn.serve(cache_ttl)
+        return
+    pid = dmn.start(cache_ttl)
+    if pid is None:
+        cli.err_exit(f"The daemon did not start, see {dmn.log_path()}")
+    cli.try_log(f"Daemon started (pid {pid}).")
+
+
+def handle_daemon_stop():
+    if not dmn.send_message(dmn.STOP):
+        cli.err_exit("The daemon is not running.")
+    cli.try_log("Daemon stopped.")
+
+
+def handle_daemon_status():
+    status = dmn.send_message(dmn.STATUS)
+    if status is None:
+        cli.try_log("The daemon is not running.")
+        return
+    started = time.strftime(
+        "%Y-%m-%d %H:%M:%S", time.localtime(status["started"])
+    )
+    cli.try_log(
+        f"Daemon running (pid {status['pid']}) since {started},"
+        f" {status['commands']} commands run,"
+        f" {status['cached']} responses cached."
+    )
@@ -1,4 +1,13 @@
-from typing import IO, Dict, List, Optional, Union
+from typing import (
+    IO,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
 
 import spyctl.api as api
 import spyctl.cli as cli
@@ -70,6 +79,7 @@ def handle_diff(
                 et,
                 latest,
                 force_fprints,
+                cache_fprints=len(filename_target) > 1,
             )
             if with_obj:
                 diff_resource(
@@ -112,6 +122,7 @@ def handle_diff(
                     et,
                     latest,
                     force_fprints,
+                    cache_fprints=len(POLICIES) > 1,
                 )
                 if with_obj:
                     diff_resource(
@@ -175,6 +186,7 @@ def handle_diff(
                     et,
                     latest,
                     force_fprints,
+                    cache_fprints=len(targets) > 1,
                 )
                 if with_obj:
                     diff_resource(
@@ -207,7 +219,8 @@ def get_with_obj(
     et,
     latest,
     with_fingerprints=False,
-) -> Optional[Union[Dict, List[Dict]]]:
+    cache_fprints=True,
+) -> Optional[Union[Dict, List[Dict], Iterator[Dict], bool]]:
     global FINGERPRINTS
     target_uid = target.get(lib.METADATA_FIELD, {}).get(lib.METADATA_UID_FIELD)
     if with_file:
@@ -271,12 +284,15 @@ def get_with_obj(
         ):
             return False
         if FINGERPRINTS is None:
-            with_obj = get_with_fingerprints(target, st, et, latest)
+            with_obj = get_with_fingerprints(
+                target, st, et, latest, cache=cache_fprints and not latest
+            )
             cli.try_log(f"Filtering fingerprints for {target_name}")
             with_obj = filter_fingerprints(target, with_obj)
         else:
             cli.try_log(f"Filtering fingerprints for {target_name}")
             with_obj = filter_fingerprints(target, FINGERPRINTS)
+        with_obj = merge_cmd.non_empty(with_obj)
     else:
         if latest:
             st = merge_cmd.get_latest_timestamp(target)
@@ -306,19 +322,32 @@ def load_with_file(with_file: IO) -> Dict:
     return rv
 
 
-def get_with_fingerprints(target: Dict, st, et, latest) -> List[Dict]:
-    global FINGERPRINTS
-    fingerprints = merge_cmd.get_with_fingerprints(target, st, et, latest)
-    FINGERPRINTS = fingerprints
+def get_with_fingerprints(
+    target: Dict, st, et, latest, cache=True
+) -> Iterator[Dict]:
+    fingerprints = merge_cmd.get_with_fingerprints(
+        target, st, et, latest, cache=False
+    )
+    if cache:
+        fingerprints = __cache_fingerprints(fingerprints)
     return fingerprints
 
 
-def filter_fingerprints(target, fingerprints) -> List[Dict]:
-    filters = lib.selectors_to_filters(target)
-    rv = filt.filter_fingerprints(
-        fingerprints, **filters, use_context_filters=False
-    )
-    return rv
+def __cache_fingerprints(
+    fingerprints: Iterable[Dict],
+) -> Generator[Dict, None, None]:
+    global FINGERPRINTS
+    cached = []
+    for fingerprint in fingerprints:
+        cached.append(fingerprint)
+        yield fingerprint
+    FINGERPRINTS = cached
+
+
+def filter_fingerprints(
+    target, fingerprints: Iterable[Dict]
+) -> Generator[Dict, None, None]:
+    return merge_cmd.filter_fingerprints(target, fingerprints)
 
 
 def get_with_policy(pol_uid: str, policies: List[Dict]) -> Dict:
@@ -328,7 +357,7 @@ def get_with_policy(pol_uid: str, policies: List[Dict]) -> Dict:
 def diff_resource(
     target: Dict,
     target_name,
-    with_obj: Union[Dict, List[Dict]],
+    with_obj: Union[Dict, Iterable[Dict]],
     pager=False,
     merge_network=True,
     full_diff=False,
@@ -347,12 +376,16 @@ def handle_output(
     full_diff=False,
     output=lib.OUTPUT_DEFAULT,
 ):
-    if output == lib.OUTPUT_DEFAULT:
-        output = lib.OUTPUT_RAW
-        diff_object = False
+    if output == lib.OUTPUT_PATCH:
+        output = lib.OUTPUT_JSON
+        diff_data = merged_obj.get_patch()
     else:
-        diff_object = True
-    diff_data = merged_obj.get_diff(full_diff, diff_object)
+        if output == lib.OUTPUT_DEFAULT:
+            output = lib.OUTPUT_RAW
+            diff_object = False
+        else:
+            diff_object = True
+        diff_data = merged_obj.get_diff(full_diff, diff_object)
     if pager:
         cli.show(diff_data, output, dest=lib.OUTPUT_DEST_PAGER)
     else:
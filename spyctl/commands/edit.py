@@ -94,7 +94,7 @@ def handle_edit_file(file: IO):
             kind = (lib.POL_KIND, lib.POL_TYPE_TRACE)
     resource_type = KIND_TO_RESOURCE_TYPE[kind]
     edit_resource(
-        yaml.dump(resource, sort_keys=False),
+        lib.yaml_dump(resource, sort_keys=False),
         file,
         resource_type,
         schemas.KIND_TO_SCHEMA[kind],
@@ -147,7 +147,7 @@ def handle_edit_notif_config(name_or_id):
         key = lib.NOTIFICATION_KIND
     if not config:
         cli.err_exit("Editing legacy notification configs not supported.")
-    resource_yaml = yaml.dump(config, sort_keys=False)
+    resource_yaml = lib.yaml_dump(config, sort_keys=False)
     edit_resource(
         resource_yaml,
         edit_id,
@@ -186,7 +186,7 @@ def handle_edit_notif_tgt(name_or_id):
                 break
     if not edit_tgt:
         cli.err_exit(f"No notification targets matching '{name_or_id}'.")
-    resource_yaml = yaml.dump(edit_tgt.as_dict(), sort_keys=False)
+    resource_yaml = lib.yaml_dump(edit_tgt.as_dict(), sort_keys=False)
     edit_resource(
         resource_yaml,
         edit_tgt.id,
@@ -221,7 +221,7 @@ def handle_edit_policy(name_or_id):
     if not policies:
         cli.err_exit(f"No Policies matching '{name_or_id}'.")
     policy = policies[0]
-    resource_yaml = yaml.dump(policy, sort_keys=False)
+    resource_yaml = lib.yaml_dump(policy, sort_keys=False)
     edit_resource(
         resource_yaml,
         policy[lib.METADATA_FIELD][lib.METADATA_UID_FIELD],
@@ -262,7 +262,7 @@ def handle_edit_suppression_policy(name_or_id):
     if not policies:
         cli.err_exit(f"No Suppression Policies matching '{name_or_id}'.")
     policy = policies[0]
-    resource_yaml = yaml.dump(policy, sort_keys=False)
+    resource_yaml = lib.yaml_dump(policy, sort_keys=False)
     edit_resource(
         resource_yaml,
         policy[lib.METADATA_FIELD][lib.METADATA_UID_FIELD],
@@ -452,7 +452,7 @@ def apply_file_edits(resource, file: IO):
             if extension == ".json":
                 f.write(json.dumps(resource, sort_keys=False, indent=2))
             else:
-                f.write(yaml.dump(resource, sort_keys=False))
+                f.write(lib.yaml_dump(resource, sort_keys=False))
     except Exception as e:
         cli.err_exit(f"Unable to write output to {file.name}", exception=e)
     cli.try_log(f"Successfully edited resource file '{file.name}'")
@@ -1,11 +1,13 @@
 import time
 import fnmatch
-from typing import IO, Dict, List, Tuple
+from typing import IO, Dict, List, Optional, Tuple
 
 import spyctl.api as api
 import spyctl.cli as cli
 import spyctl.config.configs as cfg
 import spyctl.filter_resource as filt
+import spyctl.group_by as grp
+import spyctl.name_index as names
 import spyctl.resources.agents as spy_agents
 import spyctl.resources.api_filters as _af
 import spyctl.resources.clusters as spyctl_clusts
@@ -133,6 +135,7 @@ def handle_get(
 def handle_get_clusters(name_or_id, output: str, **filters: Dict):
     ctx = cfg.get_current_context()
     clusters = api.get_clusters(*ctx.get_api_data())
+    names.set_names(names.CLUSTERS, ctx.name, clusters)
     clusters = filt.filter_clusters(clusters, **filters)
     if name_or_id:
         clusters = filt.filter_obj(clusters, ["name", "uid"], name_or_id)
@@ -142,8 +145,9 @@ def handle_get_clusters(name_or_id, output: str, **filters: Dict):
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for cluster in clusters:
-            cli.show(cluster, output, ndjson=NDJSON)
+        cli.show_records(
+            clusters, output, ndjson=NDJSON, single=bool(name_or_id)
+        )
 
 
 def handle_get_notification_configs(name_or_id, output: str, **filters: Dict):
@@ -164,14 +168,16 @@ def handle_get_notification_configs(name_or_id, output: str, **filters: Dict):
         cli.show(summary, lib.OUTPUT_RAW)
     else:
         if not full_policy:
-            for route in routes:
-                config = route.get(lib.DATA_FIELD, {}).get(
-                    lib.NOTIF_SETTINGS_FIELD
-                )
-                if config:
-                    cli.show(config, output, ndjson=NDJSON)
-                else:
-                    cli.show(route, output, ndjson=NDJSON)
+            cli.show_records(
+                (
+                    route.get(lib.DATA_FIELD, {}).get(lib.NOTIF_SETTINGS_FIELD)
+                    or route
+                    for route in routes
+                ),
+                output,
+                ndjson=NDJSON,
+                single=bool(name_or_id),
+            )
         else:
             cli.show(n_pol, output, ndjson=NDJSON)
 
@@ -200,9 +206,17 @@ def handle_get_notification_targets(
         summary = spyctl_tgt.targets_wide_output(targets)
         cli.show(summary, lib.OUTPUT_RAW)
     else:
-        for tgt_name, tgt_data in targets.items():
-            target = spyctl_tgt.Target(backend_target={tgt_name: tgt_data})
-            cli.show(target.as_dict(), output, ndjson=NDJSON)
+        cli.show_records(
+            (
+                spyctl_tgt.Target(
+                    backend_target={tgt_name: tgt_data}
+                ).as_dict()
+                for tgt_name, tgt_data in targets.items()
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_sources(name_or_id, output: str, **filters: Dict):
@@ -217,8 +231,9 @@ def handle_get_sources(name_or_id, output: str, **filters: Dict):
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for source in sources:
-            cli.show(source, output, ndjson=NDJSON)
+        cli.show_records(
+            sources, output, ndjson=NDJSON, single=bool(name_or_id)
+        )
 
 
 # ----------------------------------------------------------------- #
@@ -301,8 +316,9 @@ def handle_get_agents(
             )
             cli.show(summary, lib.OUTPUT_RAW)
         else:
-            for agent in agents:
-                cli.show(agent, output, ndjson=NDJSON)
+            cli.show_records(
+                agents, output, ndjson=NDJSON, single=bool(name_or_id)
+            )
 
 
 def handle_get_containers(name_or_id, st, et, output, **filters):
@@ -317,20 +333,25 @@ def handle_get_containers(name_or_id, st, et, output, **filters):
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for container in api.get_containers(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline=pipeline,
-            limit_mem=LIMIT_MEM,
-            disable_pbar_on_first=not lib.is_redirected(),
-        ):
-            cli.show(container, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_containers(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline=pipeline,
+                limit_mem=LIMIT_MEM,
+                disable_pbar_on_first=not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_connections(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
     ignore_ips = filters.pop("ignore_ips", False)
+    top, top_by = __pop_top(output, filters)
     sources, filters = _af.Connections.build_sources_and_filters(**filters)
     pipeline = _af.Connections.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
@@ -341,20 +362,26 @@ def handle_get_connections(name_or_id, st, et, output, **filters):
             ignore_ips,
             pipeline=pipeline,
             limit_mem=LIMIT_MEM,
+            top=top,
+            top_by=top_by,
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for connection in api.get_connections(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline=pipeline,
-            limit_mem=LIMIT_MEM,
-            disable_pbar_on_first=not lib.is_redirected(),
-        ):
-            cli.show(connection, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_connections(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline=pipeline,
+                limit_mem=LIMIT_MEM,
+                disable_pbar_on_first=not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_conn_buns(name_or_id, st, et, output, **filters):
@@ -373,44 +400,54 @@ def handle_get_conn_buns(name_or_id, st, et, output, **filters):
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for conn_bun in api.get_connection_bundles(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(conn_bun, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_connection_bundles(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_deployments(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.Deployments.build_sources_and_filters(**filters)
     pipeline = _af.Deployments.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_deployments.deployments_stream_summary_output(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for deployment in api.get_deployments(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            disable_pbar_on_first=not lib.is_redirected(),
-        ):
-            cli.show(deployment, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_deployments(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                disable_pbar_on_first=not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_deviations(name_or_id: str, st, et, output, **filters):
     unique = not filters.pop("non_unique", False)  # Default is unique
     raw_data = filters.pop("raw_data", False)
     include_irrelevant = filters.pop("include_irrelevant", False)
+    relevance_cache = filters.pop("relevance_cache", False)
     ctx = cfg.get_current_context()
     sources, filters = _af.Deviations.build_sources_and_filters(**filters)
     if _af.POLICIES_CACHE:
@@ -460,98 +497,129 @@ def handle_get_deviations(name_or_id: str, st, et, output, **filters):
             dev_name_or_uid=dev_uid,
             dev_filters=filters,
             include_irrelevant=include_irrelevant,
+            relevance_cache=relevance_cache,
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for deviation in spyctl_dev.get_deviations_stream(
-            ctx,
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            disable_pbar_on_first=not lib.is_redirected(),
-            unique=unique,
-            raw_data=raw_data,
-            include_irrelevant=include_irrelevant,
-            policies=policies,
-        ):
-            cli.show(deviation, output, ndjson=NDJSON)
+        cli.show_records(
+            spyctl_dev.get_deviations_stream(
+                ctx,
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                disable_pbar_on_first=not lib.is_redirected(),
+                unique=unique,
+                raw_data=raw_data,
+                include_irrelevant=include_irrelevant,
+                policies=policies,
+                relevance_cache=relevance_cache,
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_machines(name_or_id, st, et, output: str, **filters: Dict):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
+    # Only a listing of every machine in the time window replaces the
+    # names indexed for shell completion
+    index_names = not name_or_id and not any(filters.values())
     sources, filters = _af.Machines.build_sources_and_filters(**filters)
     pipeline = _af.Machines.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_machines.machines_summary_output(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx,
+            sources,
+            (st, et),
+            pipeline,
+            LIMIT_MEM,
+            stream=stream,
+            index_names=index_names,
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for machine in api.get_machines(
+        machines = api.get_machines(
             *ctx.get_api_data(),
             sources,
             (st, et),
             pipeline,
             LIMIT_MEM,
             not lib.is_redirected(),
-        ):
-            cli.show(machine, output, ndjson=NDJSON)
+        )
+        if index_names:
+            machines = names.collect(names.MACHINES, ctx.name, machines)
+        cli.show_records(
+            machines, output, ndjson=NDJSON, single=bool(name_or_id)
+        )
 
 
 def handle_get_namespaces(name_or_uid, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.Namespaces.build_sources_and_filters(**filters)
     pipeline = _af.Namespaces.generate_pipeline(name_or_uid, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_names.namespace_summary_output(
-            name_or_uid, ctx, sources, (st, et), pipeline
+            name_or_uid, ctx, sources, (st, et), pipeline, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for namespace in api.get_namespaces(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            not lib.is_redirected(),
-        ):
-            cli.show(namespace, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_namespaces(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_uid),
+        )
 
 
 def handle_get_nodes(name_or_id, st, et, output: str, **filters: Dict):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.Nodes.build_sources_and_filters(**filters)
     pipeline = _af.Nodes.generate_pipeline(
         name_or_id,
     )
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_nodes.nodes_output_summary(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported
     else:
-        for node in api.get_nodes(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(node, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_nodes(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_opsflags(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    top, top_by = __pop_top(output, filters)
     sources, filters = _af.OpsFlags.build_sources_and_filters(**filters)
     pipeline = _af.OpsFlags.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
@@ -562,185 +630,227 @@ def handle_get_opsflags(name_or_id, st, et, output, **filters):
             (st, et),
             pipeline,
             LIMIT_MEM,
+            top,
+            top_by,
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for flag in api.get_opsflags(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(flag, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_opsflags(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_pods(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.Pods.build_sources_and_filters(**filters)
     pipeline = _af.Pods.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_pods.pods_output_summary(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for pod in api.get_pods(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(pod, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_pods(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_daemonsets(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.Daemonsets.build_sources_and_filters(**filters)
     pipeline = _af.Daemonsets.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_daemonset.daemonsets_output_summary(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for daemonset in api.get_daemonsets(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(daemonset, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_daemonsets(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_processes(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    top, top_by = __pop_top(output, filters)
     sources, filters = _af.Processes.build_sources_and_filters(**filters)
     pipeline = _af.Processes.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_procs.processes_stream_output_summary(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, top, top_by
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for process in api.get_processes(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(process, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_processes(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_replicasets(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.ReplicaSet.build_sources_and_filters(**filters)
     pipeline = _af.ReplicaSet.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_replicaset.replicaset_output_summary(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for replicaset in api.get_replicaset(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(replicaset, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_replicaset(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_roles(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.Role.build_sources_and_filters(**filters)
     pipeline = _af.Role.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_roles.role_output_summary(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for role in api.get_role(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(role, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_role(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_clusterroles(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.ClusterRole.build_sources_and_filters(**filters)
     pipeline = _af.ClusterRole.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_clusterroles.clusterrole_output_summary(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for clusterrole in api.get_clusterrole(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(clusterrole, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_clusterrole(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_rolebinding(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.RoleBinding.build_sources_and_filters(**filters)
     pipeline = _af.RoleBinding.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_rolebinding.rolebinding_output_summary(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for rolebinding in api.get_rolebinding(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(rolebinding, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_rolebinding(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_clusterrolebinding(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
     sources, filters = _af.ClusterRoleBinding.build_sources_and_filters(
         **filters
     )
@@ -749,25 +859,30 @@ def handle_get_clusterrolebinding(name_or_id, st, et, output, **filters):
     )
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_crb.clusterrolebinding_output_summary(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx, sources, (st, et), pipeline, LIMIT_MEM, stream=stream
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for crb in api.get_clusterrolebinding(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(crb, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_clusterrolebinding(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_redflags(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    top, top_by = __pop_top(output, filters)
     sources, filters = _af.RedFlags.build_sources_and_filters(**filters)
     pipeline = _af.RedFlags.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
@@ -778,29 +893,44 @@ def handle_get_redflags(name_or_id, st, et, output, **filters):
             (st, et),
             pipeline,
             LIMIT_MEM,
+            top,
+            top_by,
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for flag in api.get_redflags(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(flag, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_redflags(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 def handle_get_spydertraces(name_or_id, st, et, output, **filters):
     ctx = cfg.get_current_context()
+    stream = __pop_stream(output, filters)
+    top, top_by = __pop_top(output, filters)
     sources, filters = _af.Spydertraces.build_sources_and_filters(**filters)
     pipeline = _af.Spydertraces.generate_pipeline(name_or_id, filters=filters)
     if output == lib.OUTPUT_DEFAULT:
         summary = spyctl_spytrace.spydertraces_stream_summary_output(
-            ctx, sources, (st, et), pipeline, LIMIT_MEM
+            ctx,
+            sources,
+            (st, et),
+            pipeline,
+            LIMIT_MEM,
+            top,
+            top_by,
+            stream=stream,
         )
         cli.show(summary, lib.OUTPUT_RAW)
     elif output == lib.OUTPUT_WIDE:
@@ -809,15 +939,19 @@ def handle_get_spydertraces(name_or_id, st, et, output, **filters):
         )
         cli.show(summary, lib.OUTPUT_RAW)
     else:
-        for spydertrace in api.get_spydertraces(
-            *ctx.get_api_data(),
-            sources,
-            (st, et),
-            pipeline,
-            LIMIT_MEM,
-            not lib.is_redirected(),
-        ):
-            cli.show(spydertrace, output, ndjson=NDJSON)
+        cli.show_records(
+            api.get_spydertraces(
+                *ctx.get_api_data(),
+                sources,
+                (st, et),
+                pipeline,
+                LIMIT_MEM,
+                not lib.is_redirected(),
+            ),
+            output,
+            ndjson=NDJSON,
+            single=bool(name_or_id),
+        )
 
 
 # ----------------------------------------------------------------- #
@@ -848,8 +982,11 @@ def handle_get_notif_config_templates(name_or_id: str, output, **filters):
     elif output == lib.OUTPUT_WIDE:
         __wide_not_supported()
     else:
-        for tmpl in templates:
-            cli.show(tmpl.as_dict(), output)
+        cli.show_records(
+            (tmpl.as_dict() for tmpl in templates),
+            output,
+            single=bool(name_or_id),
+        )
 
 
 # ----------------------------------------------------------------- #
@@ -877,6 +1014,8 @@ def handle_get_policies(name_or_id, output, files, st, et, **filters):
             policies.append(resource_data)
     else:
         policies = api.get_policies(*ctx.get_api_data(), raw_data=raw_data)
+        if not raw_data:
+            names.set_names(names.POLICIES, ctx.name, policies)
     policies = filt.filter_policies(policies, **filters)
     if name_or_id:
         policies = filt.filter_obj(
@@ -913,8 +1052,9 @@ def handle_get_policies(name_or_id, output, files, st, et, **filters):
         elif output == lib.OUTPUT_WIDE:
             __wide_not_supported()
         else:
-            for policy in policies:
-                cli.show(policy, output, ndjson=NDJSON)
+            cli.show_records(
+                policies, output, ndjson=NDJSON, single=bool(name_or_id)
+            )
 
 
 def handle_get_suppression_policies(name_or_id, st, et, output, **filters):
@@ -1007,8 +1147,9 @@ def handle_get_fingerprints(
                 expr=name_or_id_expr,
                 **filters,
             )
-            for fprint in fprints:
-                cli.show(fprint, output, ndjson=NDJSON)
+            cli.show_records(
+                fprints, output, ndjson=NDJSON, single=bool(name_or_id)
+            )
         else:
             fprints = list(
                 api.get_guardian_fingerprints(
@@ -1040,14 +1181,14 @@ def handle_agent_metrics_json(agents: List[Dict], st, et):
     cli.try_log("Retrieving metrics records.")
     sources = [agent["muid"] for agent in agents]
     pipeline = _af.AgentMetrics.generate_pipeline()
-    for metrics_record in api.get_agent_metrics(
+    metrics_records = api.get_agent_metrics(
         *ctx.get_api_data(),
         sources,
         (st, et),
         pipeline,
         not lib.is_redirected(),
-    ):
-        cli.show(metrics_record, lib.OUTPUT_JSON, ndjson=NDJSON)
+    )
+    cli.show_records(metrics_records, lib.OUTPUT_JSON, ndjson=NDJSON)
 
 
 def handle_agent_usage_csv(agents: List[Dict], st, et, metrics_csv_file: IO):
@@ -1073,20 +1214,23 @@ def handle_agent_usage_json(agents: List[Dict], st, et):
     agent_map = spy_agents.metrics_ref_map(agents)
     sources = [agent["muid"] for agent in agents]
     pipeline = _af.AgentMetrics.generate_pipeline()
-    for metrics_record in api.get_agent_metrics(
+    metrics_records = api.get_agent_metrics(
         *ctx.get_api_data(),
         sources,
         (st, et),
         pipeline,
         not lib.is_redirected(),
-    ):
-        cli.show(
+    )
+    cli.show_records(
+        (
             spy_agents.usage_dict(
                 metrics_record, agent_map.get(metrics_record["ref"])
-            ),
-            lib.OUTPUT_JSON,
-            ndjson=NDJSON,
-        )
+            )
+            for metrics_record in metrics_records
+        ),
+        lib.OUTPUT_JSON,
+        ndjson=NDJSON,
+    )
 
 
 # ----------------------------------------------------------------- #
@@ -1111,14 +1255,10 @@ def __calculate_has_matching_fprints(
             limit_mem=LIMIT_MEM,
         )
     )
+    fprint_index = filt.FingerprintIndex(fingerprints)
     for policy in policies:
         filters = lib.selectors_to_filters(policy)
-        if filt.filter_fingerprints(
-            fingerprints,
-            use_context_filters=False,
-            suppress_warning=True,
-            **filters,
-        ):
+        if fprint_index.matching(**filters):
             has_matching.append(policy)
         else:
             no_matching.append(policy)
@@ -1150,16 +1290,9 @@ def __calc_policy_coverage(
         total += len(groups)
     if total == 0:
         cli.err_exit("No fingerprints to calculate coverage of.")
-    uncovered_fprints = fingerprints
-    for policy in policies:
-        filters = lib.selectors_to_filters(policy)
-        uncovered_fprints = filt.filter_fingerprints(
-            uncovered_fprints,
-            use_context_filters=False,
-            suppress_warning=True,
-            not_matching=True,
-            **filters,
-        )
+    uncovered_fprints = filt.FingerprintIndex(fingerprints).not_matching_any(
+        lib.selectors_to_filters(policy) for policy in policies
+    )
     uncovered_fprint_groups = spyctl_fprints.make_fingerprint_groups(
         uncovered_fprints
     )
@@ -1199,6 +1332,7 @@ def __get_fingerprints_matching_files_scope(
             limit_mem=LIMIT_MEM,
         )
     )
+    fprint_index = filt.FingerprintIndex(orig_fprints)
     rv = []
     for file in files:
         resrc_data = lib.load_resource_file(file)
@@ -1208,14 +1342,7 @@ def __get_fingerprints_matching_files_scope(
                 f"Unable generate filters for {file.name}. Does it have a"
                 " spec field with selectors?"
             )
-        rv.extend(
-            filt.filter_fingerprints(
-                orig_fprints,
-                use_context_filters=False,
-                suppress_warning=True,
-                **filters,
-            )
-        )
+        rv.extend(fprint_index.matching(**filters))
     if not rv:
         cli.try_log("No fingerprints matched input files.")
     return rv
@@ -1253,22 +1380,37 @@ def __get_fingerprints_matching_policies_scope(
             limit_mem=LIMIT_MEM,
         )
     )
+    fprint_index = filt.FingerprintIndex(orig_fprints)
     rv = []
     for policy in policies:
         filters = lib.selectors_to_filters(policy)
-        rv.extend(
-            filt.filter_fingerprints(
-                orig_fprints,
-                use_context_filters=False,
-                suppress_warning=True,
-                **filters,
-            )
-        )
+        rv.extend(fprint_index.matching(**filters))
     if not rv:
         cli.try_log("No fingerprints matched policies scope.")
     return rv
 
 
+def __pop_top(output: str, filters: Dict) -> Tuple[Optional[int], str]:
+    top = filters.pop("top", None)
+    top_by = filters.pop("top_by", None) or grp.TOP_BY_COUNT
+    if top and output != lib.OUTPUT_DEFAULT:
+        cli.try_log(
+            "The --top option only applies to the default summary output",
+            is_warning=True,
+        )
+    return top, top_by
+
+
+def __pop_stream(output: str, filters: Dict) -> bool:
+    stream = filters.pop("stream", False)
+    if stream and output != lib.OUTPUT_DEFAULT:
+        cli.try_log(
+            "The --stream option only applies to the default summary output",
+            is_warning=True,
+        )
+    return stream
+
+
 def __get_latest_timestamp(obj: Dict):
     latest_timestamp = obj.get(lib.METADATA_FIELD, {}).get(
         lib.LATEST_TIMESTAMP_FIELD
@@ -1,4 +1,14 @@
-from typing import IO, Dict, List, Optional, Union
+import itertools
+from typing import (
+    IO,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
 
 import spyctl.api as api
 import spyctl.cli as cli
@@ -85,6 +95,7 @@ def handle_merge(
                 et,
                 latest,
                 with_fingerprints=force_fprints,
+                cache_fprints=len(filename_target) > 1,
             )
             # If we have something to merge, add to actions
             if with_obj:
@@ -126,6 +137,7 @@ def handle_merge(
                     latest,
                     output_dest,
                     with_fingerprints=force_fprints,
+                    cache_fprints=len(POLICIES) > 1,
                 )
                 # If we have something to merge, add to actions
                 if with_obj:
@@ -197,6 +209,7 @@ def handle_merge(
                     latest,
                     output_dest,
                     with_fingerprints=force_fprints,
+                    cache_fprints=len(targets) > 1,
                 )
                 if with_obj:
                     merged_obj = merge_resource(
@@ -241,7 +254,8 @@ def get_with_obj(
     latest,
     dest: str = "",
     with_fingerprints=False,
-) -> Optional[Union[Dict, List[Dict], bool]]:
+    cache_fprints=True,
+) -> Optional[Union[Dict, List[Dict], Iterator[Dict], bool]]:
     global FINGERPRINTS
     target_uid = target.get(lib.METADATA_FIELD, {}).get(lib.METADATA_UID_FIELD)
     if dest == lib.OUTPUT_DEST_API:
@@ -304,12 +318,15 @@ def get_with_obj(
         ):
             return False
         if FINGERPRINTS is None:
-            with_obj = get_with_fingerprints(target, st, et, latest)
+            with_obj = get_with_fingerprints(
+                target, st, et, latest, cache=cache_fprints and not latest
+            )
             cli.try_log(f"Filtering fingerprints for {target_name}")
             with_obj = filter_fingerprints(target, with_obj)
         else:
             cli.try_log(f"Filtering fingerprints for {target_name}")
             with_obj = filter_fingerprints(target, FINGERPRINTS)
+        with_obj = non_empty(with_obj)
     else:
         if latest:
             st = get_latest_timestamp(target)
@@ -354,8 +371,9 @@ def get_latest_timestamp(target: Dict) -> float:
     return st
 
 
-def get_with_fingerprints(target: Dict, st, et, latest) -> List[Dict]:
-    global FINGERPRINTS
+def get_with_fingerprints(
+    target: Dict, st, et, latest, cache=True
+) -> Iterator[Dict]:
     ctx = cfgs.get_current_context()
     if latest:
         filters = lib.selectors_to_filters(target)
@@ -363,39 +381,69 @@ def get_with_fingerprints(target: Dict, st, et, latest) -> List[Dict]:
         if muids:
             filters[lib.MACHINES_FIELD] = muids
         pipeline = _af.Fingerprints.generate_pipeline(filters=filters)
-        fingerprints = list(
-            api.get_fingerprints(
-                *ctx.get_api_data(),
-                [ctx.global_source],
-                time=(st, et),
-                pipeline=pipeline,
-            )
+        fingerprints = api.get_fingerprints(
+            *ctx.get_api_data(),
+            [ctx.global_source],
+            time=(st, et),
+            pipeline=pipeline,
         )
     else:
-        fingerprints = list(
-            api.get_fingerprints(
-                *ctx.get_api_data(),
-                [ctx.global_source],
-                time=(st, et),
-            )
+        fingerprints = api.get_fingerprints(
+            *ctx.get_api_data(),
+            [ctx.global_source],
+            time=(st, et),
         )
-    FINGERPRINTS = fingerprints
+    if cache:
+        fingerprints = __cache_fingerprints(fingerprints)
     return fingerprints
 
 
+def __cache_fingerprints(
+    fingerprints: Iterable[Dict],
+) -> Generator[Dict, None, None]:
+    """Passes fingerprints through as they stream in, keeping them for
+    the next target once the stream has been fully consumed."""
+    global FINGERPRINTS
+    cached = []
+    for fingerprint in fingerprints:
+        cached.append(fingerprint)
+        yield fingerprint
+    FINGERPRINTS = cached
+
+
 def get_with_deviations(uid: str, st, et) -> List[Dict]:
     deviations = dev.get_unique_deviations(uid, st, et)
     return deviations
 
 
-def filter_fingerprints(target, fingerprints) -> List[Dict]:
+def filter_fingerprints(
+    target, fingerprints: Iterable[Dict]
+) -> Generator[Dict, None, None]:
     filters = lib.selectors_to_filters(target)
-    rv = filt.filter_fingerprints(
+    rv = filt.iter_filter_fingerprints(
         fingerprints, **filters, use_context_filters=False
     )
     return rv
 
 
+def non_empty(objs: Iterable[Dict]) -> Optional[Iterator[Dict]]:
+    """Pulls the first object off of a stream so callers can tell
+    whether there is anything to merge with without consuming the rest.
+
+    Args:
+        objs (Iterable[Dict]): Objects to be merged, may be a generator.
+
+    Returns:
+        Optional[Iterator[Dict]]: An iterator over all of the objects or
+            None if there are none.
+    """
+    objs = iter(objs)
+    first = next(objs, None)
+    if first is None:
+        return None
+    return itertools.chain((first,), objs)
+
+
 def get_with_policy(pol_uid: str, policies: List[Dict]) -> Dict:
     return p.get_policy_by_uid(pol_uid, policies)
 
@@ -403,46 +451,45 @@ def get_with_policy(pol_uid: str, policies: List[Dict]) -> Dict:
 def merge_resource(
     target: Dict,
     target_name: str,
-    with_obj: Union[Dict, List[Dict]],
+    with_obj: Union[Dict, Iterable[Dict]],
     src_cmd="merge",
     merge_network=True,
     ctx: cfgs.Context = None,
     latest=False,
     check_irrelevant=False,
 ) -> Optional[m_lib.MergeObject]:
-    if target == with_obj:
+    if target is with_obj or (
+        isinstance(with_obj, Dict)
+        and m_lib.frozen_hash(target) == m_lib.frozen_hash(with_obj)
+    ):
         cli.try_log(
             f"{src_cmd} target and with-object are the same.. skipping"
         )
         return None
     if not ctx:
         ctx = cfgs.get_current_context()
-    merge_with_objects = []
     if isinstance(with_obj, Dict):
         merge_with_objects = r_lib.handle_input_data(with_obj, ctx)
     else:
-        for obj in with_obj:
-            merge_with_objects.extend(
-                r_lib.handle_input_data(data=obj, ctx=ctx)
-            )
+        merge_with_objects = itertools.chain.from_iterable(
+            r_lib.handle_input_data(data=obj, ctx=ctx) for obj in with_obj
+        )
+    # Skip merging the same content more than once
+    merge_with_objects = m_lib.dedup_merge_objects(merge_with_objects)
     resrc_kind = target.get(lib.KIND_FIELD)
     merge_obj = get_merge_object(resrc_kind, target, merge_network, src_cmd)
-    if isinstance(merge_with_objects, list):
-        for w_obj in merge_with_objects:
-            if is_type_mismatch(target, target_name, src_cmd, w_obj):
-                continue
-            try:
-                merge_obj.asymmetric_merge(w_obj, check_irrelevant)
-            except m_lib.InvalidMergeError as e:
-                cli.try_log(
-                    f"Unable to {src_cmd} with invalid object. {w_obj}",
-                    *e.args,
-                )
-    else:
-        raise Exception(
-            f"Bug found, attempting to {src_cmd} with invalid object"
-        )
-    if target[lib.SPEC_FIELD] == merge_obj.get_obj_data().get(lib.SPEC_FIELD):
+    # Objects are merged one at a time as they stream in
+    for w_obj in merge_with_objects:
+        if is_type_mismatch(target, target_name, src_cmd, w_obj):
+            continue
+        try:
+            merge_obj.asymmetric_merge(w_obj, check_irrelevant)
+        except m_lib.InvalidMergeError as e:
+            cli.try_log(
+                f"Unable to {src_cmd} with invalid object. {w_obj}",
+                *e.args,
+            )
+    if not merge_obj.spec_changed:
         if latest and src_cmd == "merge":
             cli.try_log(
                 f"{src_cmd} of {target_name} produced no updates to the"
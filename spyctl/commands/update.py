@@ -4,7 +4,6 @@
 from typing import Optional
 import spyctl.api as api
 import spyctl.config.configs as cfg
-import yaml
 from pathlib import Path
 import spyctl.resources.policies as p
 import spyctl.spyctl_lib as lib
@@ -24,7 +23,7 @@ def handle_update_response_actions(backup_dir: Optional[str]):
                 uid = pol_data[lib.METADATA_FIELD][lib.METADATA_UID_FIELD]
                 outfile = Path.joinpath(backup_path, uid)
                 print(f"Backing up {uid} tp {str(outfile)}")
-                outfile.write_text(yaml.dump(pol_data, sort_keys=False))
+                outfile.write_text(lib.yaml_dump(pol_data, sort_keys=False))
             except Exception:
                 import traceback
 
@@ -49,7 +48,7 @@ def handle_update_policy_modes(backup_dir: Optional[str]):
                 uid = pol_data[lib.METADATA_FIELD][lib.METADATA_UID_FIELD]
                 outfile = Path.joinpath(backup_path, uid)
                 print(f"Backing up {uid} tp {str(outfile)}")
-                outfile.write_text(yaml.dump(pol_data, sort_keys=False))
+                outfile.write_text(lib.yaml_dump(pol_data, sort_keys=False))
             except Exception:
                 import traceback
 
@@ -80,7 +79,7 @@ def handle_update_policy_modes(backup_dir: Optional[str]):
                 uid = policy[lib.METADATA_FIELD][lib.METADATA_UID_FIELD]
                 outfile = Path.joinpath(backup_path, uid)
                 print(f"Backing up {uid} tp {str(outfile)}")
-                outfile.write_text(yaml.dump(policy, sort_keys=False))
+                outfile.write_text(lib.yaml_dump(policy, sort_keys=False))
             except Exception:
                 import traceback
 
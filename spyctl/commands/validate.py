@@ -8,7 +8,7 @@ import spyctl.schemas_v2 as schemas
 import spyctl.spyctl_lib as lib
 
 
-def handle_validate(file: IO, do_api=False):
+def handle_validate(file: IO, do_api=False, jobs=1):
     if file and do_api:
         ctx = cfg.get_current_context()
         resrc_data = lib.load_file_for_api_test(file)
@@ -20,12 +20,36 @@ def handle_validate(file: IO, do_api=False):
         else:
             print(invalid_message)
     elif file:
-        resrc_data = lib.load_resource_file(file, validate_cmd=True)
+        resrc_data = lib.load_resource_file(
+            file, validate_cmd=True, validate=False
+        )
         if isinstance(resrc_data, list):
-            cli.try_log("List of objects valid!")
+            validate_file_list(file.name, resrc_data, jobs)
         else:
-            kind = resrc_data[lib.KIND_FIELD]
-            cli.try_log(f"{kind} valid!")
+            validate_file_object(file.name, resrc_data)
+
+
+def validate_file_object(name: str, obj: Dict):
+    if not schemas.valid_object(obj, verbose=True):
+        cli.try_log(f"Invalid object in {name!r}. See error logs.")
+        return
+    kind = obj[lib.KIND_FIELD]
+    cli.try_log(f"{kind} valid!")
+
+
+def validate_file_list(name: str, objs: List, jobs=1):
+    # Every invalid object is reported, not just the first
+    invalid = 0
+    for i, error in schemas.validate_objects(objs, jobs):
+        cli.try_log(error, is_warning=True)
+        cli.try_log(
+            f"Invalid object in {name!r} at index {i}. See error logs."
+        )
+        invalid += 1
+    if invalid:
+        cli.try_log(f"{invalid} of {len(objs)} objects invalid.")
+    else:
+        cli.try_log("List of objects valid!")
 
 
 def validate_json(json_data: Union[str, Any]) -> bool:
@@ -1,17 +1,21 @@
+import os
+import pickle
 from copy import deepcopy
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import click
-import yaml
 from click.shell_completion import CompletionItem
 from tabulate import tabulate
 
-import spyctl.api as api
 import spyctl.cli as cli
 import spyctl.config.secrets as s
 import spyctl.spyctl_lib as lib
-import spyctl.schemas_v2 as schemas
+
+# Kept off the startup path, requests is only needed to look up orgs and
+# the pydantic models only when a config file is validated
+api = lib.lazy_import("spyctl.api")
+schemas = lib.lazy_import("spyctl.schemas_v2")
 
 APP_NAME = "spyctl"
 APP_DIR = f".{APP_NAME}"
@@ -25,6 +29,10 @@ GLOBAL_CONFIG_PATH = Path.joinpath(GLOBAL_CONFIG_DIR, CONFIG_FILENAME)
 GLOBAL_SECRETS_PATH = Path.joinpath(GLOBAL_SECRETS_DIR, SECRETS_FILENAME)
 LOCAL_CONFIG_PATH = Path(f"./{APP_DIR}/{CONFIG_FILENAME}")
 LOCAL_SECRETS_PATH = Path(f"./{APP_DIR}/{SECRETS_DIR}/{SECRETS_FILENAME}")
+# The loaded and validated config and secrets files, see load_config
+CONFIG_CACHE_PATH = Path.joinpath(GLOBAL_CONFIG_DIR, ".config_cache")
+CONFIG_CACHE_VERSION = 1
+SCHEMAS_PATH = Path(__file__).parents[1] / "schemas_v2.py"
 CURRENT_CONTEXT = None
 LOADED_CONFIG: "Config" = None
 # Pa
@@ -253,12 +261,16 @@ def load_config(silent=False):
     """Loads spyctl configurations from disk starting with the current
     directory and ending with the global config. If no configuration
     file exists, the program exits.
+
+    Once every config and secret found has passed schema validation,
+    the loaded files are cached, so later runs skip parsing and
+    validating them until one of the files changes.
     """
     if not GLOBAL_CONFIG_PATH.exists():
         GLOBAL_CONFIG_DIR.mkdir(parents=True, exist_ok=True)
         GLOBAL_CONFIG_PATH.touch()
         with GLOBAL_CONFIG_PATH.open("w") as f:
-            yaml.dump(CONFIG_TEMPLATE, f)
+            lib.yaml_dump(CONFIG_TEMPLATE, f)
     if not GLOBAL_SECRETS_PATH.exists():
         GLOBAL_SECRETS_DIR.mkdir(parents=True, exist_ok=True)
         # GLOBAL_SECRETS_DIR.chmod(700)
@@ -268,20 +280,35 @@ def load_config(silent=False):
     if LOADED_CONFIG is None or TESTING:
         LOADED_CONFIG = None
         LOADED_CONFIGS = {}
-        s.load_secrets()
-        configs_data = lib.walk_up_tree(GLOBAL_CONFIG_PATH, LOCAL_CONFIG_PATH)
+        config_paths = lib.find_up_tree(GLOBAL_CONFIG_PATH, LOCAL_CONFIG_PATH)
+        secrets_paths = lib.find_up_tree(
+            GLOBAL_SECRETS_PATH, LOCAL_SECRETS_PATH
+        )
+        cache_key = __config_cache_key(config_paths + secrets_paths)
+        cached = __read_config_cache(cache_key)
+        validate = cached is None
+        if validate:
+            configs_data = lib.load_files(config_paths)
+            secrets_data = lib.load_files(secrets_paths)
+            # Serialized now, loading the secrets fills in defaults
+            cache_data = pickle.dumps(
+                (configs_data, secrets_data), pickle.HIGHEST_PROTOCOL
+            )
+        else:
+            configs_data, secrets_data = cached
+        all_valid = s.load_secrets(
+            loaded_files=secrets_data, validate=validate
+        )
         configs: List[Config] = []
         seen = set()
         for config_path, config_data in configs_data:
-            if not schemas.valid_object(config_data):
+            if validate and not schemas.valid_object(config_data):
                 cli.err_exit(f"Config at {str(config_path)} is invalid.")
             try:
                 cfg = Config(config_data, config_path, config_path.parent)
-                cfg_cpy = Config(
-                    deepcopy(config_data), config_path, config_path.parent
-                )
                 for context_data in config_data[lib.CONTEXTS_FIELD]:
-                    if not schemas.valid_context(context_data):
+                    if validate and not schemas.valid_context(context_data):
+                        all_valid = False
                         ctx_name = context_data.get(lib.CONTEXT_NAME_FIELD)
                         prefix = (
                             f"Context {ctx_name!r}" if ctx_name else "Context"
@@ -289,9 +316,9 @@ def load_config(silent=False):
                         cli.try_log(f"{prefix} in {config_path} is invalid")
                         continue
                     cfg.add_context(context_data)
-                    cfg_cpy.add_context(context_data)
                 configs.append(cfg)
-                LOADED_CONFIGS[str(config_path)] = deepcopy(cfg_cpy)
+                # Copied before more local configs are merged into cfg
+                LOADED_CONFIGS[str(config_path)] = deepcopy(cfg)
             except InvalidConfigDataError as e:
                 if str(config_path) not in seen and not silent:
                     cli.try_log(
@@ -305,6 +332,8 @@ def load_config(silent=False):
                         f" {' '.join(e.args)}"
                     )
             seen.add(str(config_path))
+        if validate and all_valid:
+            __write_config_cache(cache_key, cache_data)
         if len(configs) == 0 and not silent:
             cli.try_log(
                 "No valid configurations."
@@ -321,6 +350,40 @@ def load_config(silent=False):
             )
 
 
+def __config_cache_key(paths: List[Path]) -> Tuple:
+    # Editing any of the files, or the schemas, invalidates the cache
+    key = [CONFIG_CACHE_VERSION, lib.API_VERSION]
+    for path in [*paths, SCHEMAS_PATH]:
+        stat = path.stat()
+        key.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(key)
+
+
+def __read_config_cache(key: Tuple) -> Optional[Tuple]:
+    try:
+        with CONFIG_CACHE_PATH.open("rb") as f:
+            cached_key, data = pickle.load(f)
+        if cached_key != key:
+            return None
+        return pickle.loads(data)
+    except Exception:
+        return None
+
+
+def __write_config_cache(key: Tuple, data: bytes):
+    # The cache holds the api keys of the secrets, so like them it is
+    # only readable by the user. Written to a temporary file first so
+    # concurrent runs never read a partial cache.
+    tmp_path = Path(f"{CONFIG_CACHE_PATH}.{os.getpid()}")
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((key, data), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, CONFIG_CACHE_PATH)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
 def get_loaded_config() -> Optional[Config]:
     return LOADED_CONFIG
 
@@ -410,7 +473,7 @@ def init():
             config_template = deepcopy(CONFIG_TEMPLATE)
             if global_current_ctx:
                 config_template[CURR_CONTEXT_FIELD] = global_current_ctx
-            yaml.dump(config_template, f)
+            lib.yaml_dump(config_template, f)
         cli.try_log(
             f"{'Reset' if reset else 'Created'} configuration file at"
             f" {str(local_workspace_path)}."
@@ -467,7 +530,7 @@ def set_context(
     target_config.context_paths[name] = config.config_path
     try:
         with context_path.open("w") as f:
-            yaml.dump(target_config.as_dict(), f, sort_keys=False)
+            lib.yaml_dump(target_config.as_dict(), f, sort_keys=False)
             cli.try_log(
                 f"{'Updated' if updated else 'Set new'} context '{name}' in"
                 f" configuration file '{context_path}'."
@@ -479,7 +542,7 @@ def set_context(
                 )
         if local_updated_curr_ctx:
             with local_config.config_path.open("w") as f:
-                yaml.dump(local_config.as_dict(), f, sort_keys=False)
+                lib.yaml_dump(local_config.as_dict(), f, sort_keys=False)
                 if (
                     local_config.config_path != context_path
                     or not tgt_updated_curr_ctx
@@ -533,7 +596,7 @@ def delete_context(name, force_global):
             target_config.current_context = CURR_CONTEXT_NONE
     try:
         with context_path.open("w") as f:
-            yaml.dump(target_config.as_dict(), f, sort_keys=False)
+            lib.yaml_dump(target_config.as_dict(), f, sort_keys=False)
             cli.try_log(
                 f"Deleted context '{name}' in"
                 f" configuration file '{context_path}'."
@@ -610,7 +673,7 @@ def use_context(name, force_global):
     target_config.current_context = name
     try:
         with context_path.open("w") as f:
-            yaml.dump(target_config.as_dict(), f, sort_keys=False)
+            lib.yaml_dump(target_config.as_dict(), f, sort_keys=False)
             cli.try_log(
                 f"Set current context to '{name}' in"
                 f" configuration file '{context_path}'."
@@ -13,7 +13,8 @@ import spyctl.cli as cli
 import spyctl.config.configs as cfgs
 import spyctl.spyctl_lib as lib
 import spyctl.filter_resource as filt
-import spyctl.schemas_v2 as schemas
+
+schemas = lib.lazy_import("spyctl.schemas_v2")
 
 SECRET_KIND = lib.SECRET_KIND
 
@@ -131,17 +132,34 @@ class Secret:
                 )
 
 
-def load_secrets(silent=False):
+def load_secrets(silent=False, loaded_files=None, validate=True) -> bool:
+    """Loads the secrets files from the current directory up to the
+    global one.
+
+    Args:
+        silent (bool, optional): Don't log invalid secrets. Defaults to
+            False.
+        loaded_files (List[Tuple[Path, List]], optional): The already
+            loaded secrets files, as returned by lib.walk_up_tree.
+        validate (bool, optional): Whether to schema validate the
+            secrets. Defaults to True.
+
+    Returns:
+        bool: False if a secret failed schema validation.
+    """
     global SECRETS
+    valid = True
     if SECRETS is None or cfgs.TESTING:
         SECRETS = {}
-        loaded_files = lib.walk_up_tree(
-            cfgs.GLOBAL_SECRETS_PATH, cfgs.LOCAL_SECRETS_PATH
-        )
+        if loaded_files is None:
+            loaded_files = lib.walk_up_tree(
+                cfgs.GLOBAL_SECRETS_PATH, cfgs.LOCAL_SECRETS_PATH
+            )
         # Reversed because more local files overwrite more global files
         for secrets_path, secrets_data in reversed(loaded_files):
             for secret_data in secrets_data:
-                if not schemas.valid_object(secret_data):
+                if validate and not schemas.valid_object(secret_data):
+                    valid = False
                     if not isinstance(secret_data, dict):
                         cli.try_log(
                             f"{secrets_path!r} has a secret that is not a"
@@ -165,6 +183,7 @@ def load_secrets(silent=False):
                             "Bug detected, unable to create secret from"
                             f" {secrets_path}. {' '.join(e.args)}"
                         )
+    return valid
 
 
 def set_secret(name: str, apiurl: str = None, apikey: str = None):
@@ -223,7 +242,7 @@ def set_secret(name: str, apiurl: str = None, apikey: str = None):
     try:
         with cfgs.GLOBAL_SECRETS_PATH.open("w") as f:
             try:
-                yaml.dump(output_data, f, sort_keys=False)
+                lib.yaml_dump(output_data, f, sort_keys=False)
                 if updated:
                     cli.try_log(
                         "Updated apisecret"
@@ -259,7 +278,7 @@ def delete_secret(secret_name: Dict):
     try:
         with cfgs.GLOBAL_SECRETS_PATH.open("w") as f:
             try:
-                yaml.dump(output_data, f, sort_keys=False)
+                lib.yaml_dump(output_data, f, sort_keys=False)
                 cli.try_log(
                     f"Deleted secret"
                     f" '{secret_name}' from {str(cfgs.GLOBAL_SECRETS_PATH)}"
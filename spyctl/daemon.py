@@ -0,0 +1,630 @@
+"""An opt-in resident daemon that runs spyctl commands warm.
+
+`spyctl daemon start` leaves a process listening on a unix socket in
+~/.spyctl. It has the command modules imported and the config loaded,
+and keeps one requests session, so api calls reuse open TLS
+connections, along with a short lived cache of GET responses such as
+sources, clusters and policies.
+
+While the socket exists the spyctl entry point (run) forwards each
+command to the daemon along with its arguments, working directory,
+environment and standard streams. Each command runs in a child forked
+from the warm daemon, so commands never see each other's state, and
+reloads the config from the caller's directory. The child sends its api
+requests back to the daemon to go out on the warm session.
+Anything that goes wrong before the command starts falls back to
+running it in the calling process.
+
+The client side only uses the standard library, spyctl itself is not
+imported unless the command runs locally.
+"""
+
+import importlib
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Same directory as configs.GLOBAL_CONFIG_DIR, not imported from there to
+# keep the forwarding path free of spyctl imports
+DAEMON_DIR = Path.joinpath(Path.home(), ".spyctl")
+SOCKET_FILENAME = "daemon.sock"
+KEY_FILENAME = ".daemon_key"
+LOG_FILENAME = "daemon.log"
+# Set to run commands in the calling process even if a daemon is running
+NO_DAEMON_ENV = "SPYCTL_NO_DAEMON"
+
+# Seconds a GET response is reused for, and how many are kept
+CACHE_TTL = 30
+CACHE_SIZE = 256
+# Larger responses are not cached
+CACHE_MAX_BYTES = 8 << 20
+START_TIMEOUT = 30
+
+# Messages, each is sent as (message, data)
+RUN = "run"
+HTTP = "http"
+STATUS = "status"
+STOP = "stop"
+# First item of an http reply for a request that raised
+HTTP_ERROR = "error"
+
+# Loaded before the daemon starts accepting commands, the lazily
+# imported command modules and what they import
+WARM_MODULES = [
+    "spyctl.spyctl",
+    "spyctl.api",
+    "spyctl.commands.apply",
+    "spyctl.commands.create",
+    "spyctl.commands.delete",
+    "spyctl.commands.describe",
+    "spyctl.commands.diff",
+    "spyctl.commands.edit",
+    "spyctl.commands.export",
+    "spyctl.commands.get",
+    "spyctl.commands.logs",
+    "spyctl.commands.merge",
+    "spyctl.commands.show_schema",
+    "spyctl.commands.spy_import",
+    "spyctl.commands.suppress",
+    "spyctl.commands.test_notification",
+    "spyctl.commands.update",
+    "spyctl.commands.validate",
+    "spyctl.resources.api_filters",
+    "spyctl.schemas_v2",
+]
+
+
+def socket_path() -> Path:
+    return Path.joinpath(DAEMON_DIR, SOCKET_FILENAME)
+
+
+def key_path() -> Path:
+    return Path.joinpath(DAEMON_DIR, KEY_FILENAME)
+
+
+def log_path() -> Path:
+    return Path.joinpath(DAEMON_DIR, LOG_FILENAME)
+
+
+def code_stamp() -> int:
+    """Changes whenever the installed spyctl code does, a daemon running
+    older code is not used."""
+    stamp = 0
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for dir_path, _, file_names in os.walk(package_dir):
+        for file_name in file_names:
+            if file_name.endswith(".py"):
+                path = os.path.join(dir_path, file_name)
+                stamp = max(stamp, os.stat(path).st_mtime_ns)
+    return stamp
+
+
+# ----------------------------------------------------------------- #
+#                               Client                              #
+# ----------------------------------------------------------------- #
+
+
+def run():
+    """The spyctl entry point, forwards the command to the daemon if one
+    is running."""
+    if not os.environ.get(NO_DAEMON_ENV):
+        code = forward(sys.argv[1:])
+        if code is not None:
+            sys.exit(code)
+    from spyctl.spyctl import main
+
+    main()
+
+
+def forward(args: List[str]) -> Optional[int]:
+    """Runs a command in the daemon, returning its exit code, or None if
+    there is no daemon to run it."""
+    if args[:1] == ["daemon"]:
+        return None
+    conn = connect()
+    if conn is None:
+        return None
+    from multiprocessing.reduction import send_handle
+
+    with conn:
+        try:
+            request = {
+                "args": args,
+                "cwd": os.getcwd(),
+                "env": dict(os.environ),
+                "stamp": code_stamp(),
+            }
+            conn.send((RUN, request))
+            for fd in range(3):
+                send_handle(conn, fd, None)
+            pid = conn.recv()
+        except (OSError, EOFError):
+            return None
+        if pid is None:
+            return None
+        while True:
+            try:
+                return conn.recv()
+            except KeyboardInterrupt:
+                # The command runs outside of the terminal's process group
+                try:
+                    os.kill(pid, signal.SIGINT)
+                except ProcessLookupError:
+                    pass
+            except (OSError, EOFError):
+                return 1
+
+
+def connect():
+    """A connection to the running daemon, None if there is none."""
+    path = socket_path()
+    if not path.exists():
+        return None
+    from multiprocessing import AuthenticationError
+    from multiprocessing.connection import Client
+
+    try:
+        return Client(str(path), "AF_UNIX", authkey=key_path().read_bytes())
+    except (OSError, EOFError, AuthenticationError):
+        return None
+
+
+def send_message(message: str):
+    """Sends a message to the running daemon and returns its reply, None
+    if there is no daemon."""
+    conn = connect()
+    if conn is None:
+        return None
+    with conn:
+        try:
+            conn.send((message, None))
+            return conn.recv()
+        except (OSError, EOFError):
+            return None
+
+
+# ----------------------------------------------------------------- #
+#                               Server                              #
+# ----------------------------------------------------------------- #
+
+
+class Daemon:
+    def __init__(self, cache_ttl: int = CACHE_TTL):
+        """Runs forwarded commands until stopped, see serve.
+
+        Args:
+            cache_ttl (int, optional): Seconds a GET response is reused
+                for, 0 disables the cache. Defaults to CACHE_TTL.
+        """
+        import requests
+
+        from spyctl.cache_dict import CacheDict
+
+        self.cache_ttl = cache_ttl
+        self.session = requests.Session()
+        self.cache = CacheDict(cache_len=CACHE_SIZE)
+        self.cache_lock = threading.Lock()
+        self.key = os.urandom(32)
+        self.stamp = code_stamp()
+        self.started = time.time()
+        self.commands = 0
+
+    def serve(self):
+        from multiprocessing import AuthenticationError
+        from multiprocessing.connection import Listener
+
+        DAEMON_DIR.mkdir(parents=True, exist_ok=True)
+        _write_private(key_path(), self.key)
+        path = socket_path()
+        path.unlink(missing_ok=True)
+        # Forked while this is the only thread
+        self.forks = _ForkServer(self.key)
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(str(path), "AF_UNIX", authkey=self.key)
+        finally:
+            os.umask(umask)
+        # stop() and SIGTERM end the accept loop below
+        signal.signal(signal.SIGTERM, _exit)
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    # Failed handshakes
+                    continue
+                threading.Thread(
+                    target=self.__handle, args=(conn,), daemon=True
+                ).start()
+        finally:
+            listener.close()
+
+    def __handle(self, conn):
+        with conn:
+            try:
+                message, data = conn.recv()
+                if message == RUN:
+                    self.__run(conn, data)
+                elif message == HTTP:
+                    self.__proxy(conn, data)
+                elif message == STATUS:
+                    conn.send(self.__status())
+                elif message == STOP:
+                    conn.send(True)
+                    self.stop()
+            except (OSError, EOFError, RuntimeError):
+                # The caller went away
+                return
+
+    def stop(self):
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def __status(self) -> Dict:
+        return {
+            "pid": os.getpid(),
+            "started": self.started,
+            "commands": self.commands,
+            "cached": len(self.cache),
+        }
+
+    def __run(self, conn, request: Dict):
+        from multiprocessing.reduction import recv_handle
+
+        fds = [recv_handle(conn) for _ in range(3)]
+        if request["stamp"] != self.stamp:
+            # spyctl was upgraded, the caller runs the command itself
+            for fd in fds:
+                os.close(fd)
+            conn.send(None)
+            self.stop()
+            return
+        self.commands += 1
+        replies = self.forks.run(request, fds)
+        for fd in fds:
+            os.close(fd)
+        conn.send(replies.get())
+        conn.send(replies.get())
+
+    def __proxy(self, conn, data: Tuple):
+        # A command's connection, carrying all of its api requests
+        while True:
+            conn.send(self.__http(*data))
+            try:
+                message, data = conn.recv()
+            except (OSError, EOFError):
+                return
+            if message != HTTP:
+                return
+
+    def __http(self, method: str, url: str, kwargs: Dict) -> Tuple:
+        import requests
+
+        cache_key = None
+        if method == "GET" and self.cache_ttl > 0:
+            cache_key = json.dumps([url, kwargs], sort_keys=True, default=str)
+            with self.cache_lock:
+                cached = self.cache.get(cache_key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+        elif method != "GET":
+            # Anything may have changed
+            with self.cache_lock:
+                self.cache.clear()
+        try:
+            r = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            return HTTP_ERROR, type(e).__name__, str(e)
+        reply = (r.status_code, r.reason, dict(r.headers), r.content, r.url)
+        if (
+            cache_key is not None
+            and r.status_code == 200
+            and len(r.content) <= CACHE_MAX_BYTES
+        ):
+            expires = time.monotonic() + self.cache_ttl
+            with self.cache_lock:
+                self.cache[cache_key] = (expires, reply)
+        return reply
+
+
+def serve(cache_ttl: int = CACHE_TTL):
+    """Runs the daemon in this process until it is stopped."""
+    _warm()
+    Daemon(cache_ttl).serve()
+
+
+def supported() -> bool:
+    """The daemon needs fork and unix sockets, which windows lacks."""
+    return hasattr(os, "fork")
+
+
+def start(cache_ttl: int = CACHE_TTL) -> Optional[int]:
+    """Starts the daemon in the background, returning its pid once it
+    accepts commands, None if it did not start in time."""
+    DAEMON_DIR.mkdir(parents=True, exist_ok=True)
+    socket_path().unlink(missing_ok=True)
+    pid = os.fork()
+    if pid == 0:
+        # Detached from the terminal, with a second fork so the daemon is
+        # not a session leader
+        os.setsid()
+        if os.fork() != 0:
+            os._exit(0)
+        code = 0
+        try:
+            os.chdir("/")
+            null = os.open(os.devnull, os.O_RDWR)
+            log = os.open(
+                log_path(), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600
+            )
+            for fd, target in [(null, 0), (log, 1), (log, 2)]:
+                os.dup2(fd, target)
+            serve(cache_ttl)
+        except SystemExit:
+            pass
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    os.waitpid(pid, 0)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        status = send_message(STATUS)
+        if status is not None:
+            return status["pid"]
+        time.sleep(0.05)
+    return None
+
+
+class _ForkServer:
+    def __init__(self, key: bytes):
+        """A process forking the children that run commands. Forking from
+        the daemon's threads could leave a child holding a lock (import,
+        logging, stdio) that another thread had at the time, so the fork
+        server is forked before the daemon starts any and stays single
+        threaded.
+
+        Args:
+            key (bytes): The daemon's authentication key, commands use it
+                to send their api requests back to the daemon.
+        """
+        import socket
+        from multiprocessing.connection import Connection
+
+        parent, child = socket.socketpair()
+        self.pid = os.fork()
+        if self.pid == 0:
+            parent.close()
+            code = 0
+            try:
+                _serve_forks(Connection(child.detach()), key)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        child.close()
+        self.conn = Connection(parent.detach())
+        self.lock = threading.Lock()
+        # request id -> queue of the command's pid then its exit code
+        self.replies: Dict[int, queue.Queue] = {}
+        self.last_id = 0
+        threading.Thread(target=self.__read, daemon=True).start()
+
+    def run(self, request: Dict, fds: List[int]) -> queue.Queue:
+        """Runs a command with fds as its standard streams. The returned
+        queue gets the pid of the command, then its exit code, None for
+        both if the fork server is gone."""
+        from multiprocessing.reduction import send_handle
+
+        replies = queue.Queue()
+        with self.lock:
+            self.last_id += 1
+            request_id = self.last_id
+            self.replies[request_id] = replies
+            try:
+                self.conn.send((request_id, request))
+                for fd in fds:
+                    send_handle(self.conn, fd, self.pid)
+            except OSError:
+                del self.replies[request_id]
+                replies.put(None)
+                replies.put(None)
+        return replies
+
+    def __read(self):
+        while True:
+            try:
+                request_id, value, exited = self.conn.recv()
+            except (OSError, EOFError):
+                break
+            with self.lock:
+                if exited:
+                    replies = self.replies.pop(request_id)
+                else:
+                    replies = self.replies[request_id]
+            replies.put(value)
+        with self.lock:
+            for replies in self.replies.values():
+                replies.put(None)
+                replies.put(None)
+            self.replies.clear()
+        os.kill(os.getpid(), signal.SIGTERM)
+
+
+def _serve_forks(conn, key: bytes):
+    import select
+    from multiprocessing.reduction import recv_handle
+
+    # SIGCHLD wakes up select to report the exit code of commands
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write, warn_on_full_buffer=False)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # pid -> request id
+    running: Dict[int, int] = {}
+    while True:
+        ready, _, _ = select.select([conn, wakeup_read], [], [])
+        if wakeup_read in ready:
+            while True:
+                try:
+                    os.read(wakeup_read, 512)
+                except BlockingIOError:
+                    break
+        while running:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            conn.send((running.pop(pid), _exit_code(status), True))
+        if conn not in ready:
+            continue
+        try:
+            request_id, request = conn.recv()
+            fds = [recv_handle(conn) for _ in range(3)]
+        except (OSError, EOFError):
+            # The daemon stopped
+            return
+        pid = os.fork()
+        if pid == 0:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            for fd in (conn.fileno(), wakeup_read, wakeup_write):
+                os.close(fd)
+            _run_child(fds, request, key)
+        for fd in fds:
+            os.close(fd)
+        running[pid] = request_id
+        conn.send((request_id, pid, False))
+
+
+def _exit_code(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        # Killed by a signal, exit as shells report it
+        return 128 + os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _run_child(fds: List[int], request: Dict, key: bytes):
+    code = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdin = open(0, closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", buffering=1, closefd=False)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        sys.argv = ["spyctl", *request["args"]]
+        _reset_config()
+        code = _run_command(request["args"], key)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except OSError:
+            pass
+        os._exit(code)
+
+
+def _reset_config():
+    # The config loaded when the daemon started is stale, it is reloaded
+    # from the caller's directory (cheaply, see configs.load_config)
+    import spyctl.config.configs as cfgs
+    import spyctl.config.secrets as s
+
+    cfgs.LOADED_CONFIG = None
+    cfgs.LOADED_CONFIGS = {}
+    cfgs.CURRENT_CONTEXT = None
+    s.SECRETS = None
+
+
+def _run_command(args: List[str], key: bytes) -> int:
+    import spyctl.api as api
+    from spyctl.spyctl import main
+
+    api.set_transport(_Transport(key))
+    try:
+        main(args=args, prog_name="spyctl")
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    return 0
+
+
+class _Transport:
+    def __init__(self, key: bytes):
+        """Sends a command's api requests through the daemon, a
+        connection per thread."""
+        self.key = key
+        self.local = threading.local()
+
+    def __call__(self, method: str, url: str, **kwargs):
+        import requests
+        from multiprocessing.connection import Client
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = Client(str(socket_path()), "AF_UNIX", authkey=self.key)
+            self.local.conn = conn
+        conn.send((HTTP, (method, url, kwargs)))
+        reply = conn.recv()
+        if reply[0] == HTTP_ERROR:
+            _, name, message = reply
+            error = getattr(requests.exceptions, name, None)
+            if not isinstance(error, type) or not issubclass(
+                error, requests.exceptions.RequestException
+            ):
+                error = requests.exceptions.RequestException
+            raise error(message)
+        r = requests.Response()
+        r.status_code, r.reason, headers, r._content, r.url = reply
+        r._content_consumed = True
+        r.headers = CaseInsensitiveDict(headers)
+        r.encoding = get_encoding_from_headers(r.headers)
+        return r
+
+
+def _warm():
+    for name in WARM_MODULES:
+        module = importlib.import_module(name)
+        # Lazily imported modules only load once an attribute is used
+        getattr(module, "__file__", None)
+    import spyctl.config.configs as cfgs
+
+    try:
+        cfgs.load_config(silent=True)
+    except SystemExit:
+        pass
+
+
+def _write_private(path: Path, data: bytes):
+    tmp_path = Path(f"{path}.{os.getpid()}")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _exit(signum, frame):
+    sys.exit(0)
@@ -1,12 +1,30 @@
+import bisect
 import fnmatch
+import os
+import re
 import time
 from copy import deepcopy
-from typing import Dict, Iterable, List, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import spyctl.config.configs as cfgs
 import spyctl.spyctl_lib as lib
 
 DEFAULT_FILTER_TIME = (lib.time_inp("2h"), time.time())
+NORMALIZE_CASE = os.path.normcase("A") != "A"
+MAX_FILTER_VERDICTS = 100000
+# (context, its filters), resolved once per context. A new command loads
+# a new context, so a daemon child does not reuse a stale entry.
+CONTEXT_FILTERS: Tuple["cfgs.Context", Dict[str, List[str]]] = None
 
 CONT_SEL_TGT = [lib.SPEC_FIELD, lib.CONT_SELECTOR_FIELD]
 SVC_SEL_TGT = [lib.SPEC_FIELD, lib.SVC_SELECTOR_FIELD]
@@ -198,6 +216,72 @@ def filter_opsflags(
     return flag_grp_data
 
 
+def _fingerprint_selectors() -> Dict[str, Callable[[Any], List[Tuple]]]:
+    """Filter name -> function turning a filter value into the
+    (target_fields, filters) clauses a fingerprint must all match."""
+
+    def fields_selector(tgt_fields):
+        return lambda filt: [(tgt_fields, filt)]
+
+    def prefix_selector(tgt_fields):
+        def selector(filt):
+            filt += "*" if filt[-1] != "*" else filt
+            return [(tgt_fields, filt)]
+
+        return selector
+
+    def labels_selector(label_tgt_fields):
+        def selector(filt: Dict):
+            clauses = []
+            for key, value in filt.items():
+                tgt_fields = deepcopy(label_tgt_fields)
+                tgt_fields[0].append(key)
+                clauses.append((tgt_fields, value))
+            return clauses
+
+        return selector
+
+    return {
+        cfgs.CGROUP_FIELD: fields_selector(CGROUP_TGT_FIELDS),
+        lib.CONT_NAME_FIELD: fields_selector(CONT_NAME_TGT_FIELDS),
+        lib.CONT_ID_FIELD: prefix_selector(CONT_ID_TGT_FIELDS),
+        lib.IMAGE_FIELD: fields_selector(IMAGE_TGT_FIELDS),
+        lib.IMAGEID_FIELD: prefix_selector(IMAGEID_TGT_FIELDS),
+        lib.NAMESPACE_FIELD: fields_selector(
+            [[lib.METADATA_FIELD, lib.METADATA_NAMESPACE_FIELD]]
+        ),
+        lib.NAMESPACE_LABELS_FIELD: labels_selector(
+            NAMESPACE_LABEL_TGT_FIELDS
+        ),
+        lib.POD_LABELS_FIELD: labels_selector(POD_LABEL_TGT_FIELDS),
+    }
+
+
+def __fingerprint_matchers() -> Dict[str, Callable[[Any], Callable]]:
+    """Filter name -> function compiling a filter value into a
+    predicate for a single fingerprint."""
+
+    def matcher(selector):
+        def compile_selector(filt):
+            return compile_clauses(selector(filt))
+
+        return compile_selector
+
+    return {
+        name: matcher(selector)
+        for name, selector in _fingerprint_selectors().items()
+    }
+
+
+def compile_clauses(clauses: List[Tuple]) -> Callable[[Dict], bool]:
+    """A predicate matching records that match every (target_fields,
+    filters) clause."""
+    matches = [compile_filter_obj(*clause) for clause in clauses]
+    if len(matches) == 1:
+        return matches[0]
+    return lambda rec: all(match(rec) for match in matches)
+
+
 def filter_fingerprints(
     fingerprint_data: List[Dict],
     namespaces_data=None,
@@ -211,72 +295,22 @@ def filter_fingerprints(
     not_matching=False,
     **filters,
 ):
-    def cont_id_filter(data, filt):
-        filt += "*" if filt[-1] != "*" else filt
-        return filter_obj(data, CONT_ID_TGT_FIELDS, filt)
-
-    def image_id_filter(data, filt):
-        filt += "*" if filt[-1] != "*" else filt
-        return filter_obj(data, IMAGEID_TGT_FIELDS, filt)
-
-    def filter_namespace_labels(data, filt: Dict):
-        for key, value in filt.items():
-            tgt_fields = deepcopy(NAMESPACE_LABEL_TGT_FIELDS)
-            tgt_fields[0].append(key)
-            data = filter_obj(
-                data,
-                tgt_fields,
-                value,
-            )
-        return data
-
-    def filter_pod_labels(data, filt: Dict):
-        for key, value in filt.items():
-            tgt_fields = deepcopy(POD_LABEL_TGT_FIELDS)
-            tgt_fields[0].append(key)
-            data = filter_obj(
-                data,
-                tgt_fields,
-                value,
-            )
-        return data
-
-    filter_set = {
-        cfgs.CGROUP_FIELD: lambda data, filt: filter_obj(
-            data, CGROUP_TGT_FIELDS, filt
-        ),
-        lib.CONT_NAME_FIELD: lambda data, filt: filter_obj(
-            data, CONT_NAME_TGT_FIELDS, filt
-        ),
-        lib.CONT_ID_FIELD: cont_id_filter,
-        lib.IMAGE_FIELD: lambda data, filt: filter_obj(
-            data, IMAGE_TGT_FIELDS, filt
-        ),
-        lib.IMAGEID_FIELD: image_id_filter,
-        lib.NAMESPACE_FIELD: lambda data, filt: filter_obj(
-            data,
-            [[lib.METADATA_FIELD, lib.METADATA_NAMESPACE_FIELD]],
-            filt,
-        ),
-        lib.NAMESPACE_LABELS_FIELD: filter_namespace_labels,
-        lib.POD_LABELS_FIELD: filter_pod_labels,
-    }
+    matchers = __fingerprint_matchers()
     if not_matching:
-        non_matches = []
-        for fingerprint in fingerprint_data:
-            if not use_filters(
-                [fingerprint],
-                filter_set,
-                filters,
-                use_context_filters,
-                suppress_warning=True,
-            ):
-                non_matches.append(fingerprint)
-        fingerprint_data = non_matches
+        active = __active_filters(matchers, filters, use_context_filters)
+        matches = [match(filt) for _, match, filt in active]
+        fingerprint_data = [
+            fingerprint
+            for fingerprint in fingerprint_data
+            if not all(match(fingerprint) for match in matches)
+        ]
     else:
         fingerprint_data = use_filters(
             fingerprint_data,
-            filter_set,
+            {
+                name: __list_filter(matcher)
+                for name, matcher in matchers.items()
+            },
             filters,
             use_context_filters,
             suppress_warning=suppress_warning,
@@ -284,6 +318,193 @@ def filter_fingerprints(
     return fingerprint_data
 
 
+def iter_filter_fingerprints(
+    fingerprint_data: Iterable[Dict],
+    use_context_filters=True,
+    suppress_warning=False,
+    **filters,
+) -> Generator[Dict, None, None]:
+    """Lazily filters a stream of fingerprints. The active filters are
+    compiled once up front and each fingerprint is checked on its own as
+    it arrives, so the stream never has to be held in memory.
+
+    Args:
+        fingerprint_data (Iterable[Dict]): Fingerprints to filter, may be
+            a generator.
+        use_context_filters (bool, optional): Fall back to the current
+            context's filters. Defaults to True.
+        suppress_warning (bool, optional): Don't log when every
+            fingerprint is filtered out. Defaults to False.
+
+    Yields:
+        Dict: The fingerprints matching all of the filters, in order.
+    """
+    active = __active_filters(
+        __fingerprint_matchers(), filters, use_context_filters
+    )
+    matches = [match(filt) for _, match, filt in active]
+    # Index of the filter that emptied the stream, mirroring use_filters
+    empty_at = -1
+    for fingerprint in fingerprint_data:
+        for i, match in enumerate(matches):
+            if not match(fingerprint):
+                if empty_at is not None:
+                    empty_at = max(empty_at, i)
+                break
+        else:
+            empty_at = None
+            yield fingerprint
+    if empty_at is not None and empty_at >= 0 and not suppress_warning:
+        lib.try_log(f"No results after filtering on '{active[empty_at][0]}'")
+
+
+def __list_filter(matcher: Callable[[Any], Callable]) -> Callable:
+    def list_filter(data, filt):
+        match = matcher(filt)
+        return [rec for rec in data if match(rec)]
+
+    return list_filter
+
+
+class FingerprintIndex:
+    """An inverted index over the selector fields of a list of
+    fingerprints, for matching many sets of filters (usually one per
+    policy) against the same fingerprints.
+
+    Each target field maps its string values to the positions of the
+    fingerprints holding them, so a set of filters only looks at the
+    fingerprints that could match it rather than the whole list. Glob
+    filters are resolved against the distinct values of a field, through
+    a sorted prefix index when the glob is a plain prefix. Candidates are
+    confirmed with the same predicates filter_fingerprints uses, so the
+    results are the same as calling it with use_context_filters=False.
+    """
+
+    def __init__(self, fingerprints: Iterable[Dict]):
+        self.fingerprints = list(fingerprints)
+        self.selectors = _fingerprint_selectors()
+        # path -> (value -> positions, positions of non-str values)
+        self.fields: Dict[Tuple, Tuple[Dict[str, List[int]], List[int]]] = {}
+        self.sorted_values: Dict[Tuple, List[str]] = {}
+
+    def matching(self, **filters) -> List[Dict]:
+        """The fingerprints matching all of the filters, in order."""
+        return [self.fingerprints[i] for i in self.__matching(filters)]
+
+    def not_matching_any(self, filter_sets: Iterable[Dict]) -> List[Dict]:
+        """The fingerprints matched by none of the sets of filters, in
+        order. Equivalent to chaining filter_fingerprints with
+        not_matching=True over each set."""
+        matched = set()
+        for filters in filter_sets:
+            matched.update(self.__matching(filters, matched))
+        return [
+            fprint
+            for i, fprint in enumerate(self.fingerprints)
+            if i not in matched
+        ]
+
+    def __matching(self, filters: Dict, skip=()) -> List[int]:
+        clauses = []
+        for name, selector in self.selectors.items():
+            if name in filters:
+                clauses.extend(selector(filters[name]))
+        candidates = None
+        for target_fields, value in clauses:
+            found = self.__candidates(target_fields, value)
+            if found is None:
+                continue
+            if candidates is None:
+                candidates = found
+            else:
+                candidates &= found
+            if not candidates:
+                return []
+        if candidates is None:
+            candidates = range(len(self.fingerprints))
+        else:
+            candidates = sorted(candidates)
+        match = compile_clauses(clauses)
+        fprints = self.fingerprints
+        return [i for i in candidates if i not in skip and match(fprints[i])]
+
+    def __candidates(self, target_fields, filters) -> Optional[set]:
+        """Positions of the fingerprints that may match a clause, or None
+        if the clause can't be narrowed down by the index."""
+        try:
+            if "-all" in filters:
+                return None
+            if not isinstance(filters, list):
+                filters = [filters]
+            rv = set()
+            for field in target_fields:
+                path = (
+                    tuple(field.split("."))
+                    if isinstance(field, str)
+                    else tuple(field)
+                )
+                values, others = self.__field(path)
+                rv.update(others)
+                for fil in filters:
+                    if "*" in fil:
+                        for value in self.__glob_values(path, fil):
+                            rv.update(values[value])
+                    else:
+                        rv.update(values.get(fil, ()))
+            return rv
+        except Exception:
+            # Let the predicates report (or tolerate) odd filters
+            return None
+
+    def __field(self, path: Tuple) -> Tuple[Dict[str, List[int]], List[int]]:
+        if path in self.fields:
+            return self.fields[path]
+        values = {}
+        others = []
+        for i, fprint in enumerate(self.fingerprints):
+            value = fprint
+            try:
+                for key in path:
+                    if value is None:
+                        break
+                    value = value.get(key)
+            except Exception:
+                others.append(i)
+                continue
+            if value is None:
+                continue
+            if isinstance(value, str):
+                values.setdefault(value, []).append(i)
+            else:
+                others.append(i)
+        self.fields[path] = values, others
+        return values, others
+
+    def __glob_values(self, path: Tuple, glob: str) -> List[str]:
+        values, _ = self.fields[path]
+        prefix = glob[:-1]
+        if (
+            NORMALIZE_CASE
+            or not glob.endswith("*")
+            or any(char in prefix for char in "*?[")
+        ):
+            match = re.compile(fnmatch.translate(os.path.normcase(glob)))
+            return [
+                value
+                for value in values
+                if match.match(os.path.normcase(value))
+            ]
+        if path not in self.sorted_values:
+            self.sorted_values[path] = sorted(values)
+        keys = self.sorted_values[path]
+        rv = []
+        for i in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            rv.append(keys[i])
+        return rv
+
+
 def filter_policies(
     policy_data: List[Dict],
     namespaces_data=None,
@@ -361,67 +582,161 @@ def use_filters(
     use_context_filters=True,
     suppress_warning=False,
 ):
-    ctx_filters = cfgs.get_current_context().get_filters()
     data_empty_at_start = len(data) == 0
-    for filt, func in filter_functions.items():
-        if filt in filters:
-            data = func(data, filters[filt])
-        elif use_context_filters and filt in ctx_filters:
-            data = func(data, ctx_filters[filt])
+    for filt, func, value in __active_filters(
+        filter_functions, filters, use_context_filters
+    ):
+        data = func(data, value)
         if len(data) == 0 and not data_empty_at_start and not suppress_warning:
             lib.try_log(f"No results after filtering on '{filt}'")
             return data
     return data
 
 
+def __active_filters(
+    filter_functions: Dict, filters: Dict, use_context_filters=True
+) -> List[Tuple[str, Callable, Any]]:
+    """Resolves which filter functions apply and the value each one
+    filters on, in the same order use_filters would apply them."""
+    ctx_filters = {}
+    if use_context_filters:
+        ctx_filters = __context_filters()
+    rv = []
+    for filt, func in filter_functions.items():
+        if filt in filters:
+            rv.append((filt, func, filters[filt]))
+        elif filt in ctx_filters:
+            rv.append((filt, func, ctx_filters[filt]))
+    return rv
+
+
+def __context_filters() -> Dict[str, List[str]]:
+    global CONTEXT_FILTERS
+    ctx = cfgs.CURRENT_CONTEXT
+    if ctx is None or CONTEXT_FILTERS is None or CONTEXT_FILTERS[0] is not ctx:
+        ctx = cfgs.get_current_context()
+        CONTEXT_FILTERS = (ctx, ctx.get_filters())
+    return CONTEXT_FILTERS[1]
+
+
 def filter_obj(
     obj: List[Dict],
     target_fields: List[Union[str, List[str]]],
     filters: Union[List[str], str],
 ) -> List[Dict]:
-    rv = []
     if "-all" in filters:
         return obj
-    if isinstance(filters, list):
-        for rec in obj:
-            if match_filters(rec, target_fields, filters):
-                rv.append(rec)
-    else:
-        for rec in obj:
-            if match_filters(rec, target_fields, [filters]):
-                rv.append(rec)
-    return rv
+    match = compile_filters(target_fields, filters)
+    return [rec for rec in obj if match(rec)]
+
+
+def compile_filter_obj(
+    target_fields: List[Union[str, List[str]]],
+    filters: Union[List[str], str],
+) -> Callable[[Dict], bool]:
+    """The predicate filter_obj applies to each record."""
+    if "-all" in filters:
+        return lambda rec: True
+    return compile_filters(target_fields, filters)
 
 
 def match_filters(
     record: Dict, target_fields: List[str], filters: List[str]
 ) -> bool:
-    for fil in filters:
-        for field in target_fields:
-            value = get_field_value(field, record)
+    return compile_filters(target_fields, filters)(record)
+
+
+def compile_filters(
+    target_fields: List[Union[str, List[str]]],
+    filters: Union[List[str], str],
+) -> Callable[[Dict], bool]:
+    """Compiles filters into a predicate that matches records the same
+    way match_filters always has: a record matches if any filter matches
+    the value of any target field. Field paths are split once and each
+    field is extracted once per record. Glob filters become a single
+    precompiled regex and the rest an exact-match set.
+
+    Args:
+        target_fields (List[Union[str, List[str]]]): Dotted paths or
+            lists of keys to the fields to check.
+        filters (Union[List[str], str]): Exact values or globs.
+
+    Returns:
+        Callable[[Dict], bool]: Returns True for matching records.
+    """
+    if not isinstance(filters, list):
+        filters = [filters]
+    # (first key, remaining keys) for each field
+    steps = []
+    for field in target_fields:
+        path = field.split(".") if isinstance(field, str) else list(field)
+        steps.append((path[0], path[1:]))
+    globs = [fil for fil in filters if "*" in fil]
+    exact = [fil for fil in filters if "*" not in fil]
+    try:
+        exact_set = set(exact)
+    except TypeError:
+        exact_set = exact
+    glob_match = None
+    if globs:
+        glob_match = re.compile(
+            "|".join(fnmatch.translate(__normcase(fil)) for fil in globs)
+        ).match
+    # Field values repeat a lot across records, remember their verdicts
+    verdicts = {}
+
+    def match_str(value: str) -> bool:
+        verdict = value in exact_set or bool(
+            glob_match and glob_match(__normcase(value))
+        )
+        if len(verdicts) < MAX_FILTER_VERDICTS:
+            verdicts[value] = verdict
+        return verdict
+
+    def match(record: Dict) -> bool:
+        for first, rest in steps:
+            value = record.get(first)
+            for key in rest:
+                if value is None:
+                    break
+                value = value.get(key)
             if value is None:
                 continue
-            if "*" in fil:
-                if isinstance(value, str) and fnmatch.fnmatch(value, fil):
+            if isinstance(value, str):
+                verdict = verdicts.get(value)
+                if verdict is None:
+                    verdict = match_str(value)
+                if verdict:
+                    return True
+                continue
+            if exact:
+                if any(value == fil for fil in exact):
                     return True
                 try:
-                    if not isinstance(value, str):
-                        for val in get_field_value(field, record):
-                            if fnmatch.fnmatch(val, fil):
-                                return True
+                    if any(fil in value for fil in exact):
+                        return True
                 except Exception:
                     pass
-            else:
-                if value == fil:
-                    return True
+            if glob_match:
+                # Like fnmatch, stops at the first value that isn't a str
                 try:
-                    if fil in get_field_value(
-                        field, record
-                    ) and not isinstance(value, str):
-                        return True
+                    for val in value:
+                        if glob_match(__normcase(val)):
+                            return True
                 except Exception:
                     pass
-    return False
+        return False
+
+    return match
+
+
+def __normcase(value: str) -> str:
+    # fnmatch ignores case on platforms with case-insensitive paths
+    if NORMALIZE_CASE:
+        return os.path.normcase(value)
+    if not isinstance(value, str):
+        raise TypeError(f"expected str, not {type(value).__name__}")
+    return value
 
 
 def filter_agents(
@@ -0,0 +1,384 @@
+"""A small columnar group-by engine for the resource summaries.
+
+Records are consumed in batches. The group key and every aggregated
+column are extracted once per batch, keys are mapped to dense group ids,
+and each aggregate is then applied to a whole column at a time over
+plain lists indexed by group id, rather than through a method call per
+record on a group object.
+
+>>> groups = GroupBy(
+...     lambda proc: proc["name"],
+...     count=(COUNT, None),
+...     latest=(MAX, "time"),
+... ).update(processes)
+>>> for name, group in groups.items():
+...     print(name, group["count"], group["latest"])
+"""
+
+import heapq
+import itertools
+from collections import Counter
+from operator import methodcaller
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Union,
+)
+
+BATCH_SIZE = 10000
+
+# Aggregates
+COUNT = "count"  # Number of records in the group
+SUM = "sum"  # Sum of the values
+FIRST = "first"  # Value from the first record of the group
+MAX = "max"  # Largest value, None values are ignored
+MIN = "min"  # Smallest value, None values are ignored
+ANY = "any"  # True if any value is truthy
+DISTINCT = "distinct"  # Set of the values
+
+# Ranking of the groups kept by top-k summaries
+TOP_BY_COUNT = "count"
+TOP_BY_LATEST = "latest"
+TOP_BY_CHOICES = [TOP_BY_COUNT, TOP_BY_LATEST]
+
+# None for the whole record, a field name, or a function of the record
+Source = Union[None, str, Callable[[Dict], Any]]
+
+
+class GroupBy:
+    def __init__(
+        self,
+        key: Source,
+        batch_size: int = BATCH_SIZE,
+        **aggregates: Tuple[str, Source],
+    ) -> None:
+        """Groups records by key, computing the named aggregates for
+        each group.
+
+        Args:
+            key (Source): The field or function giving the group key of
+                a record.
+            batch_size (int, optional): Number of records extracted and
+                aggregated at a time. Defaults to BATCH_SIZE.
+            **aggregates (Tuple[str, Source]): name -> (aggregate,
+                source) for the columns of each group.
+        """
+        for name, (agg, _) in aggregates.items():
+            if agg not in AGGREGATES:
+                raise ValueError(f"Unknown aggregate '{agg}' for '{name}'")
+        self.key = key
+        self.batch_size = batch_size
+        self.aggregates = aggregates
+        self.index: Dict[Hashable, int] = {}
+        self.columns: Dict[str, List] = {name: [] for name in aggregates}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def update(self, records: Iterable[Dict]) -> "GroupBy":
+        records = iter(records)
+        while True:
+            batch = list(itertools.islice(records, self.batch_size))
+            if not batch:
+                return self
+            self.add_batch(batch)
+
+    def add_batch(self, batch: List[Dict]):
+        index = self.index
+        start = len(index)
+        keys = _values(batch, self.key)
+        for key in dict.fromkeys(keys):
+            if key not in index:
+                index[key] = len(index)
+        gids = list(map(index.__getitem__, keys))
+        new = len(index) - start
+        for name, (agg, source) in self.aggregates.items():
+            AGGREGATES[agg](
+                self.columns[name], gids, _values(batch, source), new
+            )
+
+    def error(self, key: Hashable) -> int:
+        """Counts are exact."""
+        return 0
+
+    def items(self) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+        """Yields (key, {aggregate name: value}) for each group in the
+        order the groups were first seen."""
+        columns = self.columns
+        for gid, key in enumerate(self.index):
+            yield key, {name: column[gid] for name, column in columns.items()}
+
+
+class TopK:
+    def __init__(
+        self,
+        key: Source,
+        k: int,
+        by: Source = None,
+        **aggregates: Tuple[str, Source],
+    ) -> None:
+        """Keeps only the k heaviest groups of a stream, so memory stays
+        bounded however many distinct keys there are.
+
+        With by unset, groups are ranked by record count using the
+        Space-Saving algorithm: a new key replaces the group with the
+        lowest count and inherits that count as its error. Otherwise
+        groups are ranked by the largest value of by (e.g. a timestamp),
+        which is exact, and the error covers the records of groups that
+        were dropped or evicted.
+
+        Either way a group's true record count is between the count
+        accumulated since it was last admitted and that count plus its
+        error.
+
+        Args:
+            key (Source): The field or function giving the group key of
+                a record.
+            k (int): Number of groups to keep.
+            by (Source, optional): Rank by the largest value of this
+                field or function instead of by count. Defaults to None.
+            **aggregates (Tuple[str, Source]): name -> (aggregate,
+                source) for the columns of each group.
+        """
+        for name, (agg, _) in aggregates.items():
+            if agg not in STEPS:
+                raise ValueError(f"Unknown aggregate '{agg}' for '{name}'")
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.key = _getter(key)
+        self.k = k
+        self.by = None if by is None else _getter(by)
+        self.aggregates = [
+            (name, _getter(source), *STEPS[agg])
+            for name, (agg, source) in aggregates.items()
+        ]
+        # key -> [records since admitted, error, rank, aggregates]
+        self.entries: Dict[Hashable, List] = {}
+        self.heap: List[Tuple[Any, int, Hashable]] = []
+        self.seq = 0
+        # Records of groups not kept, for ranking by value
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def update(self, records: Iterable[Dict]) -> "TopK":
+        entries = self.entries
+        aggregates = self.aggregates
+        for record in records:
+            key = self.key(record)
+            entry = entries.get(key)
+            if entry is None:
+                self.__admit(key, record)
+                continue
+            entry[0] += 1
+            if self.by is None:
+                entry[2] += 1
+            else:
+                value = self.by(record)
+                if value is not None and value > entry[2]:
+                    entry[2] = value
+            row = entry[3]
+            for i, (_, source, _, step) in enumerate(aggregates):
+                row[i] = step(row[i], source(record))
+        return self
+
+    def items(self) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+        """Yields (key, {aggregate name: value}) for each group kept,
+        heaviest first. Counts are those accumulated since the group was
+        admitted, see error()."""
+        ranked = sorted(
+            self.entries.items(), key=lambda item: item[1][2], reverse=True
+        )
+        for key, entry in ranked:
+            yield key, {
+                name: value
+                for (name, *_), value in zip(self.aggregates, entry[3])
+            }
+
+    def error(self, key: Hashable) -> int:
+        """How many more records the group may have had than counted."""
+        return self.entries[key][1]
+
+    def __admit(self, key: Hashable, record: Dict):
+        if self.by is None:
+            rank = 1
+        else:
+            rank = self.by(record)
+            if rank is None:
+                rank = float("-inf")
+        error = 0 if self.by is None else self.dropped
+        if len(self.entries) >= self.k:
+            lowest_key, lowest = self.__lowest()
+            if self.by is None:
+                error = lowest[2]
+                rank += error
+            elif rank <= lowest[2]:
+                self.dropped += 1
+                return
+            else:
+                self.dropped += lowest[0]
+                error = self.dropped
+            heapq.heappop(self.heap)
+            del self.entries[lowest_key]
+        row = [init(source(record)) for _, source, init, _ in self.aggregates]
+        self.entries[key] = [1, error, rank, row]
+        self.__push(rank, key)
+
+    def __lowest(self) -> Tuple[Hashable, List]:
+        """The kept group with the lowest rank, fixing up heap entries
+        whose rank has grown since they were pushed."""
+        heap = self.heap
+        while True:
+            rank, _, key = heap[0]
+            entry = self.entries.get(key)
+            if entry is not None and entry[2] == rank:
+                return key, entry
+            heapq.heappop(heap)
+            if entry is not None:
+                self.__push(entry[2], key)
+
+    def __push(self, rank, key: Hashable):
+        # The sequence number keeps keys from being compared on ties
+        self.seq += 1
+        heapq.heappush(self.heap, (rank, self.seq, key))
+
+
+def group(
+    records: Iterable[Dict],
+    key: Source,
+    top: int = None,
+    top_by: str = TOP_BY_COUNT,
+    latest: Source = None,
+    **aggregates: Tuple[str, Source],
+) -> Union[GroupBy, TopK]:
+    """Groups records for a summary, keeping only the top groups by
+    count or by their latest value (e.g. timestamp) if top is set."""
+    if not top:
+        return GroupBy(key, **aggregates).update(records)
+    by = latest if top_by == TOP_BY_LATEST else None
+    return TopK(key, top, by, **aggregates).update(records)
+
+
+def count_range(count: int, error: int) -> str:
+    """Renders a count, as a range if it is approximate."""
+    if not error:
+        return str(count)
+    return f"{count}..{count + error}"
+
+
+def _getter(source: Source) -> Callable[[Dict], Any]:
+    if source is None:
+        return _identity
+    if callable(source):
+        return source
+    return methodcaller("get", source)
+
+
+def _identity(record: Dict) -> Dict:
+    return record
+
+
+def _values(batch: List[Dict], source: Source) -> List:
+    if source is None:
+        return batch
+    return list(map(_getter(source), batch))
+
+
+def _count(column: List, gids: List[int], values: List, new: int):
+    column.extend([0] * new)
+    for gid, count in Counter(gids).items():
+        column[gid] += count
+
+
+def _sum(column: List, gids: List[int], values: List, new: int):
+    column.extend([0] * new)
+    for gid, value in zip(gids, values):
+        column[gid] += value
+
+
+def _first(column: List, gids: List[int], values: List, new: int):
+    if not new:
+        return
+    # Later assignments win, so walk the batch backwards
+    firsts = dict(zip(reversed(gids), reversed(values)))
+    start = len(column)
+    column.extend(firsts[gid] for gid in range(start, start + new))
+
+
+def _max(column: List, gids: List[int], values: List, new: int):
+    column.extend([None] * new)
+    for gid, value in zip(gids, values):
+        if value is None:
+            continue
+        current = column[gid]
+        if current is None or value > current:
+            column[gid] = value
+
+
+def _min(column: List, gids: List[int], values: List, new: int):
+    column.extend([None] * new)
+    for gid, value in zip(gids, values):
+        if value is None:
+            continue
+        current = column[gid]
+        if current is None or value < current:
+            column[gid] = value
+
+
+def _any(column: List, gids: List[int], values: List, new: int):
+    column.extend([False] * new)
+    for gid in {gid for gid, value in zip(gids, values) if value}:
+        column[gid] = True
+
+
+def _distinct(column: List, gids: List[int], values: List, new: int):
+    column.extend(set() for _ in range(new))
+    for gid, value in zip(gids, values):
+        column[gid].add(value)
+
+
+AGGREGATES: Dict[str, Callable[[List, List[int], List, int], None]] = {
+    COUNT: _count,
+    SUM: _sum,
+    FIRST: _first,
+    MAX: _max,
+    MIN: _min,
+    ANY: _any,
+    DISTINCT: _distinct,
+}
+
+
+def _max_step(current, value):
+    if value is None or (current is not None and value <= current):
+        return current
+    return value
+
+
+def _min_step(current, value):
+    if value is None or (current is not None and value >= current):
+        return current
+    return value
+
+
+def _distinct_step(current: set, value) -> set:
+    current.add(value)
+    return current
+
+
+# Per record (init, step) versions of the aggregates for TopK
+STEPS: Dict[str, Tuple[Callable[[Any], Any], Callable[[Any, Any], Any]]] = {
+    COUNT: (lambda value: 1, lambda current, value: current + 1),
+    SUM: (lambda value: value, lambda current, value: current + value),
+    FIRST: (lambda value: value, lambda current, value: current),
+    MAX: (lambda value: value, _max_step),
+    MIN: (lambda value: value, _min_step),
+    ANY: (bool, lambda current, value: current or bool(value)),
+    DISTINCT: (lambda value: {value}, _distinct_step),
+}
@@ -1,17 +1,30 @@
 import fnmatch
 import ipaddress as ipaddr
+import bisect
 import json
 import re
+import sys
 import time
 from copy import deepcopy
 from dataclasses import dataclass
 from difflib import SequenceMatcher
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
-import yaml
 
 import spyctl.cli as cli
+from spyctl.cache_dict import CacheDict
 import spyctl.schemas_v2 as schemas
 import spyctl.spyctl_lib as lib
 
@@ -48,6 +61,11 @@ ADD_START = "+ "
 SUB_START = "- "
 LIST_MARKER = "- "
 DEFAULT_WHITESPACE = "  "
+WILDCARD_CACHE = CacheDict(cache_len=10000)
+# id(dict) -> (dict, digest) for objects merges treat as read-only
+FROZEN_HASHES = CacheDict(cache_len=1000)
+LINE_PREFIX_RUN = re.compile(r"(?: |- )*")
+NON_WHITESPACE_RUN = re.compile(r"\S*")
 NET_POL_FIELDS = {lib.INGRESS_FIELD, lib.EGRESS_FIELD}
 OR_FIELDS = {lib.TO_FIELD, lib.FROM_FIELD}
 
@@ -70,11 +88,18 @@ class MergeObject:
         disable_procs: str = None,
         disable_conns: str = None,
     ) -> None:
-        self.original_obj = deepcopy(obj_data)
-        self.obj_data = deepcopy(obj_data)
+        # The original object is treated as a read-only snapshot, the
+        # working copy is only created when something needs to write to it.
+        self.original_obj = obj_data
+        self.__obj_data: Optional[Dict] = None
+        self.__starting_yaml: Optional[str] = None
+        self.__spec_checksum: Optional[str] = None
+        # Set by merge functions when they change the data being merged
+        # into, lets us detect no-op merges without comparing copies.
+        self.dirty = False
+        self.spec_changed = False  # True if any merge changed the spec
         self.schemas = merge_schemas
         self.validation_fn = validation_fn
-        self.starting_yaml = yaml.dump(obj_data)
         self.merge_network = merge_network
         self.is_guardian = lib.is_guardian_obj(self.original_obj)
         self.irrelevant_objects: Dict[str, Set[str]] = (
@@ -87,41 +112,38 @@ class MergeObject:
         self.__parse_disable_procs_settings(disable_procs)
         self.__parse_disable_conns_settings(disable_conns)
 
+    @property
+    def obj_data(self) -> Dict:
+        """The working copy of the object being merged. Copied from
+        the original object on first access (copy-on-write)."""
+        if self.__obj_data is None:
+            self.__obj_data = deepcopy(self.original_obj)
+        return self.__obj_data
+
+    @property
+    def starting_yaml(self) -> str:
+        if self.__starting_yaml is None:
+            self.__starting_yaml = lib.yaml_dump(self.original_obj)
+        return self.__starting_yaml
+
+    @property
+    def spec_checksum(self) -> str:
+        """Checksum of the current spec, recomputed only after a merge
+        changes it."""
+        if self.__spec_checksum is None:
+            if self.__obj_data is None:
+                spec = self.original_obj.get(lib.SPEC_FIELD)
+                self.__spec_checksum = frozen_hash(spec)
+            else:
+                spec = self.__obj_data.get(lib.SPEC_FIELD)
+                self.__spec_checksum = lib.canonical_hash(spec)
+        return self.__spec_checksum
+
     def symmetric_merge(self, other: Dict, check_irrelevant=False):
-        global BASE_NODE_LIST, MERGING_NODE_LIST
-        BASE_NODE_LIST = None
-        MERGING_NODE_LIST = None
-        if (spec_cp := self.obj_data.get(lib.SPEC_FIELD)) and check_irrelevant:
-            spec_cp = deepcopy(self.obj_data[lib.SPEC_FIELD])
-        for schema in self.schemas:
-            data = self.obj_data.get(schema.field)
-            other_data = other.get(schema.field, {})
-            if (
-                not self.__merge_subfields(
-                    data, other_data, schema, symmetric=True
-                )
-                and schema.field in self.obj_data
-            ):
-                del self.obj_data[schema.field]
-        if spec_cp and check_irrelevant:
-            self.check_irrelevant_obj(spec_cp, other)
+        self.__merge(other, check_irrelevant, symmetric=True)
 
     def asymmetric_merge(self, other: Dict, check_irrelevant=False):
-        global BASE_NODE_LIST, MERGING_NODE_LIST
-        BASE_NODE_LIST = None
-        MERGING_NODE_LIST = None
-        if (spec_cp := self.obj_data.get(lib.SPEC_FIELD)) and check_irrelevant:
-            spec_cp = deepcopy(self.obj_data[lib.SPEC_FIELD])
-        for schema in self.schemas:
-            data = self.obj_data.get(schema.field)
-            other_data = other.get(schema.field, {})
-            if (
-                not self.__merge_subfields(data, other_data, schema)
-                and schema.field in self.obj_data
-            ):
-                del self.obj_data[schema.field]
-        if spec_cp and check_irrelevant:
-            self.check_irrelevant_obj(spec_cp, other)
+        self.__merge(other, check_irrelevant, symmetric=False)
 
     def is_valid_obj(self) -> bool:
         try:
@@ -131,7 +153,12 @@ class MergeObject:
             cli.try_log(f"Merge created invalid object. {' '.join(e.args)}")
             return False
 
-    def check_irrelevant_obj(self, spec_cp: Dict, other: Dict):
+    def mark_dirty(self):
+        """Called by merge functions when they change the data they are
+        merging into."""
+        self.dirty = True
+
+    def check_irrelevant_obj(self, spec_changed: bool, other: Dict):
         checksum_or_id = self.__get_checksum_or_id(other)
         other_kind = other[lib.KIND_FIELD]
         if (
@@ -139,7 +166,7 @@ class MergeObject:
             and checksum_or_id in self.relevant_objects[other_kind]
         ):
             return
-        if self.obj_data[lib.SPEC_FIELD] == spec_cp:
+        if not spec_changed:
             self.irrelevant_objects.setdefault(other_kind, set())
             self.irrelevant_objects[other_kind].add(checksum_or_id)
         else:
@@ -174,7 +201,9 @@ class MergeObject:
         if diff_object and self.is_guardian:
             return guardian_object_diff(self.original_obj, self.obj_data)
         else:
-            original_yaml: str = yaml.dump(self.original_obj, sort_keys=False)
+            original_yaml: str = lib.yaml_dump(
+                self.original_obj, sort_keys=False
+            )
             yaml_lines = original_yaml.splitlines()
             diff_all_fields(self.original_obj, self.obj_data, yaml_lines)
             if full_diff:
@@ -221,6 +250,13 @@ class MergeObject:
                     summary.append("...")
                 return "\n".join(summary)
 
+    def get_patch(self) -> List[Dict]:
+        """RFC 6902 JSON Patch from the original object to the merged
+        object, computed without rendering yaml."""
+        if self.__obj_data is None:
+            return []
+        return json_patch_diff(self.original_obj, self.__obj_data)
+
     def get_obj_data(self):
         return self.obj_data
 
@@ -232,6 +268,33 @@ class MergeObject:
             else:
                 meta[lib.LATEST_TIMESTAMP_FIELD] = time.time()
 
+    def __merge(self, other: Dict, check_irrelevant: bool, symmetric: bool):
+        global BASE_NODE_LIST, MERGING_NODE_LIST
+        BASE_NODE_LIST = None
+        MERGING_NODE_LIST = None
+        had_spec = bool(self.obj_data.get(lib.SPEC_FIELD))
+        spec_changed = False
+        for schema in self.schemas:
+            self.dirty = False
+            data = self.obj_data.get(schema.field)
+            other_data = other.get(schema.field, {})
+            if (
+                not self.__merge_subfields(
+                    data, other_data, schema, symmetric=symmetric
+                )
+                and schema.field in self.obj_data
+            ):
+                del self.obj_data[schema.field]
+                self.dirty = True
+            if schema.field == lib.SPEC_FIELD and self.dirty:
+                spec_changed = True
+        self.dirty = False
+        if spec_changed:
+            self.spec_changed = True
+            self.__spec_checksum = None
+        if had_spec and check_irrelevant:
+            self.check_irrelevant_obj(spec_changed, other)
+
     def __merge_subfields(
         self,
         data: Optional[Dict],
@@ -249,7 +312,10 @@ class MergeObject:
             )
             if result is None and data and field in data:
                 del data[field]
+                self.dirty = True
             elif result is not None:
+                if f_data is None:
+                    self.dirty = True
                 data[field] = result
         for field, sub_schema in schema.sub_schemas.items():
             if field != sub_schema.field:
@@ -268,9 +334,11 @@ class MergeObject:
                 ) and sub_schema.is_selector:
                     if field in data:
                         del data[field]
+                        self.dirty = True
                     continue
                 elif f_data is None:
                     data[field] = f_other_data
+                    self.dirty = True
                 elif f_other_data is None:
                     continue
                 else:
@@ -281,6 +349,7 @@ class MergeObject:
                         and field in data
                     ):
                         del data[field]
+                        self.dirty = True
             else:
                 if f_data is None or f_other_data is None:
                     continue
@@ -292,6 +361,7 @@ class MergeObject:
                         and field in data
                     ):
                         del data[field]
+                        self.dirty = True
         # Clear any fields not found in the schema
         valid_fields = set(schema.merge_functions).union(
             set(schema.sub_schemas)
@@ -299,6 +369,7 @@ class MergeObject:
         if data:
             for field in set(data) - valid_fields:
                 del data[field]
+                self.dirty = True
         if schema.values_required and not data:
             return False
         else:
@@ -392,7 +463,132 @@ class MergeSchema:
         self.is_selector = is_selector
 
 
+def frozen_hash(obj: Any) -> str:
+    """Canonical hash of an object that will not be modified, such as
+    the original object of a merge or an object being merged in.
+    Digests are cached so hashing the same object again is free.
+    """
+    return lib.canonical_hash(obj, FROZEN_HASHES)
+
+
+def canonical_checksum(obj: Dict) -> str:
+    """Checksum identifying the mergeable content of an object. Uses the
+    checksum provided by the backend when available, otherwise one is
+    computed from the spec.
+    """
+    metadata = obj.get(lib.METADATA_FIELD, {})
+    checksum = metadata.get(lib.CHECKSUM_FIELD)
+    if not checksum:
+        checksum = frozen_hash(obj.get(lib.SPEC_FIELD))
+    return checksum
+
+
+def dedup_merge_objects(
+    objs: Iterable[Dict],
+) -> Generator[Dict, None, None]:
+    """Lazily skips objects whose content was already seen in a stream
+    of objects to be merged. Fingerprints and deviations often repeat
+    across machines and time blocks. A duplicate is still yielded when
+    its latest timestamp is greater than any seen so far for its content
+    because that is the only metadata the merge takes from the
+    with-object; merging it again leaves the spec untouched.
+
+    Objects without a backend checksum are only duplicates of objects
+    with the same uid, because MergeObject.check_irrelevant_obj records
+    their relevance by uid and each uid must reach it.
+
+    Args:
+        objs (Iterable[Dict]): Objects to be merged into a target, may be
+            a generator.
+
+    Yields:
+        Dict: The objects that still have something to contribute, in
+            order of arrival.
+    """
+    seen: Dict[Tuple, Any] = {}
+    for obj in objs:
+        metadata = obj.get(lib.METADATA_FIELD, {})
+        uid = None
+        if not metadata.get(lib.CHECKSUM_FIELD):
+            uid = metadata.get(lib.METADATA_UID_FIELD)
+        key = (
+            obj.get(lib.KIND_FIELD),
+            metadata.get(lib.METADATA_TYPE_FIELD),
+            metadata.get("policy_uid"),
+            canonical_checksum(obj),
+            uid,
+        )
+        new_ts = metadata.get(lib.LATEST_TIMESTAMP_FIELD)
+        if key not in seen:
+            seen[key] = new_ts
+            yield obj
+            continue
+        curr_ts = seen[key]
+        if new_ts is not None and (curr_ts is None or new_ts > curr_ts):
+            seen[key] = new_ts
+            yield obj
+
+
+class MergeMemo:
+    """Persistent memo of merge relevance outcomes keyed by
+    (spec checksum, input checksum). An input that was irrelevant to a
+    given spec will always be irrelevant to it so the merge can be
+    skipped entirely.
+    """
+
+    DEFAULT_CACHE_LEN = 100000
+
+    def __init__(self, path: Path, cache_len=DEFAULT_CACHE_LEN) -> None:
+        self.path = path
+        self.modified = False
+        self.memo = CacheDict(cache_len=cache_len)
+        try:
+            with open(path) as f:
+                self.memo.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def get(self, spec_checksum: str, checksum: str) -> Optional[bool]:
+        return self.memo.get(f"{spec_checksum}:{checksum}")
+
+    def set(self, spec_checksum: str, checksum: str, relevant: bool):
+        self.memo[f"{spec_checksum}:{checksum}"] = relevant
+        self.modified = True
+
+    def save(self):
+        if not self.modified:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self.memo, f)
+            self.modified = False
+        except OSError as e:
+            cli.try_log(f"Unable to save merge memo. {e}")
+
+
+def intern_str(value):
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
 class ProcessNode:
+    # Merges can hold a very large number of nodes, so they keep only
+    # the parsed fields and rebuild dicts on demand.
+    __slots__ = (
+        "name",
+        "id",
+        "merged_id",
+        "exes",
+        "eusers",
+        "own_eusers",
+        "node_list",
+        "parent",
+        "children",
+        "listening_sockets",
+    )
+
     def __init__(
         self,
         node_list: "ProcessNodeList",
@@ -400,36 +596,91 @@ class ProcessNode:
         eusers=[],
         parent=None,
     ) -> None:
-        self.node = node_data.copy()
-        self.name = node_data[lib.NAME_FIELD]
-        self.id = node_data[lib.ID_FIELD]
+        self.name = intern_str(node_data[lib.NAME_FIELD])
+        self.id = intern_str(node_data[lib.ID_FIELD])
         self.merged_id = None  # New id if merged
-        self.exes: List[str] = node_data[lib.EXE_FIELD]
-        self.eusers: List[str] = self.node.get(lib.EUSER_FIELD, eusers)
+        self.exes: List[str] = [
+            intern_str(exe) for exe in node_data[lib.EXE_FIELD]
+        ]
+        # Nodes without their own eusers share their parent's list
+        self.own_eusers = lib.EUSER_FIELD in node_data
+        if self.own_eusers:
+            self.eusers: List[str] = [
+                intern_str(euser) for euser in node_data[lib.EUSER_FIELD]
+            ]
+        else:
+            self.eusers = eusers
         self.node_list = node_list
         self.parent = parent
         self.children = []
         self.listening_sockets: List["PortRange"] = []
-        self.__parse_listening_sockets()
-        if lib.CHILDREN_FIELD in self.node:
+        self.__parse_listening_sockets(node_data)
+        if lib.CHILDREN_FIELD in node_data:
             self.children = [
-                child[lib.ID_FIELD] for child in self.node[lib.CHILDREN_FIELD]
+                intern_str(child[lib.ID_FIELD])
+                for child in node_data[lib.CHILDREN_FIELD]
+            ]
+
+    @classmethod
+    def copy_node(
+        cls,
+        node_list: "ProcessNodeList",
+        other_node: "ProcessNode",
+        eusers=[],
+        parent=None,
+    ) -> "ProcessNode":
+        """Make a node for node_list from a node of another list. The
+        copy shares the exes and eusers of the other node. Its children
+        are left for the caller to add."""
+        rv = cls.__new__(cls)
+        rv.name = other_node.name
+        rv.id = other_node.id
+        rv.merged_id = None
+        rv.exes = other_node.exes
+        rv.own_eusers = other_node.own_eusers
+        rv.eusers = other_node.eusers if other_node.own_eusers else eusers
+        rv.node_list = node_list
+        rv.parent = parent
+        rv.children = []
+        rv.listening_sockets = other_node.listening_sockets.copy()
+        return rv
+
+    def get_node_data(self) -> Dict:
+        """The fields of this node as a process node dict, without
+        children."""
+        rv = {
+            lib.NAME_FIELD: self.name,
+            lib.EXE_FIELD: self.exes,
+            lib.ID_FIELD: self.id,
+        }
+        if self.own_eusers:
+            rv[lib.EUSER_FIELD] = self.eusers
+        if self.listening_sockets:
+            rv[lib.LISTENING_SOCKETS] = [
+                sock.as_dict() for sock in self.listening_sockets
             ]
+        return rv
 
-    def symmetrical_merge(self, other_node: "ProcessNode"):
-        self.name = make_wildcard([self.name, other_node.name])
-        self.__merge_exes(other_node.exes)
-        self.__merge_eusers(other_node.eusers)
-        self.__merge_listening_socks(other_node.listening_sockets)
+    def symmetrical_merge(self, other_node: "ProcessNode") -> bool:
+        """Returns True if this node was changed by the merge."""
+        name = make_wildcard([self.name, other_node.name])
+        changed = name != self.name
+        self.name = name
+        changed |= self.__merge_exes(other_node.exes)
+        changed |= self.__merge_eusers(other_node.eusers)
+        changed |= self.__merge_listening_socks(other_node.listening_sockets)
         other_node.merged_id = self.id
+        return changed
 
-    def asymmetrical_merge(self, other_node: "ProcessNode"):
+    def asymmetrical_merge(self, other_node: "ProcessNode") -> bool:
+        """Returns True if this node was changed by the merge."""
         if not fnmatch.fnmatch(other_node.name, self.name):
             raise InvalidMergeError("Bug detected, name mismatch in merge.")
-        self.__merge_exes(other_node.exes)
-        self.__merge_eusers(other_node.eusers)
-        self.__merge_listening_socks(other_node.listening_sockets)
+        changed = self.__merge_exes(other_node.exes)
+        changed |= self.__merge_eusers(other_node.eusers)
+        changed |= self.__merge_listening_socks(other_node.listening_sockets)
         other_node.merged_id = self.id
+        return changed
 
     def as_dict(self, parent_eusers: List[str] = None) -> Dict:
         rv = {}
@@ -468,8 +719,8 @@ class ProcessNode:
             return True
         return False
 
-    def __parse_listening_sockets(self):
-        socket_list = self.node.get(lib.LISTENING_SOCKETS)
+    def __parse_listening_sockets(self, node_data: Dict):
+        socket_list = node_data.get(lib.LISTENING_SOCKETS)
         if socket_list:
             for sock in socket_list:
                 port = sock[lib.PORT_FIELD]
@@ -560,7 +811,8 @@ class ProcessNode:
                 return False
         return True
 
-    def __merge_exes(self, other_exes: List[str]):
+    def __merge_exes(self, other_exes: List[str]) -> bool:
+        changed = False
         for other_exe in other_exes:
             match = False
             if other_exe not in self.exes:
@@ -570,11 +822,16 @@ class ProcessNode:
                         break
                 if not match:
                     self.exes.append(other_exe)
+                    changed = True
+        return changed
 
-    def __merge_eusers(self, other_eusers: List[str]):
+    def __merge_eusers(self, other_eusers: List[str]) -> bool:
+        changed = False
         for other_euser in other_eusers:
             if other_euser not in self.eusers:
                 self.eusers.append(other_euser)
+                changed = True
+        return changed
 
     def __contains_socket(self, o_sock: "PortRange"):
         for sock in self.listening_sockets:
@@ -582,10 +839,13 @@ class ProcessNode:
                 return True
         return False
 
-    def __merge_listening_socks(self, other_socks: List["PortRange"]):
+    def __merge_listening_socks(self, other_socks: List["PortRange"]) -> bool:
+        changed = False
         for o_sock in other_socks:
             if not self.__contains_socket(o_sock):
                 self.listening_sockets.append(o_sock)
+                changed = True
+        return changed
 
 
 class ProcessNodeList:
@@ -606,7 +866,9 @@ class ProcessNodeList:
     def get_node(self, id: str) -> Optional[ProcessNode]:
         return self.proc_nodes.get(id)
 
-    def symmetrical_merge(self, other_list: "ProcessNodeList"):
+    def symmetrical_merge(self, other_list: "ProcessNodeList") -> bool:
+        """Returns True if this node list was changed by the merge."""
+        changed = False
         for other_node in other_list.roots:
             match = False
             for node in self.roots:
@@ -616,12 +878,16 @@ class ProcessNodeList:
                     match = True
                     break
             if match:
-                node.symmetrical_merge(other_node)
-                self.__symmetrical_merge_helper(node, other_node)
+                changed |= node.symmetrical_merge(other_node)
+                changed |= self.__symmetrical_merge_helper(node, other_node)
             else:
                 self.__add_merged_root(other_node)
+                changed = True
+        return changed
 
-    def asymmetrical_merge(self, other_list: "ProcessNodeList"):
+    def asymmetrical_merge(self, other_list: "ProcessNodeList") -> bool:
+        """Returns True if this node list was changed by the merge."""
+        changed = False
         for other_node in other_list.roots:
             match = False
             for node in self.roots:
@@ -629,10 +895,12 @@ class ProcessNodeList:
                     match = True
                     break
             if match:
-                node.asymmetrical_merge(other_node)
-                self.__asymmetrical_merge_helper(node, other_node)
+                changed |= node.asymmetrical_merge(other_node)
+                changed |= self.__asymmetrical_merge_helper(node, other_node)
             else:
                 self.__add_merged_root(other_node)
+                changed = True
+        return changed
 
     def get_data(self) -> List[Dict]:
         rv = []
@@ -656,7 +924,8 @@ class ProcessNodeList:
 
     def __symmetrical_merge_helper(
         self, node: ProcessNode, other_node: ProcessNode
-    ):
+    ) -> bool:
+        changed = False
         for o_child_id in other_node.children:
             match = False
             o_child_node = other_node.node_list.get_node(o_child_id)
@@ -672,14 +941,19 @@ class ProcessNodeList:
                     match = True
                     break
             if match:
-                child_node.symmetrical_merge(o_child_node)
-                self.__symmetrical_merge_helper(child_node, o_child_node)
+                changed |= child_node.symmetrical_merge(o_child_node)
+                changed |= self.__symmetrical_merge_helper(
+                    child_node, o_child_node
+                )
             else:
                 self.__add_merged_subtree(o_child_node, node)
+                changed = True
+        return changed
 
     def __asymmetrical_merge_helper(
         self, node: ProcessNode, other_node: ProcessNode
-    ):
+    ) -> bool:
+        changed = False
         for o_child_id in other_node.children:
             match = False
             o_child_node = other_node.node_list.get_node(o_child_id)
@@ -693,11 +967,14 @@ class ProcessNodeList:
                     match = True
                     break
             if match:
-                child_node.asymmetrical_merge(o_child_node)
-                self.__asymmetrical_merge_helper(child_node, o_child_node)
+                changed |= child_node.asymmetrical_merge(o_child_node)
+                changed |= self.__asymmetrical_merge_helper(
+                    child_node, o_child_node
+                )
             else:
                 self.__add_merged_subtree(o_child_node, node)
-        pass
+                changed = True
+        return changed
 
     def __add_node(
         self, node_data: Dict, eusers=[], parent=None
@@ -712,13 +989,12 @@ class ProcessNodeList:
                     " policy"
                 )
             node = BASE_NODE_LIST.get_node(id)
-            node_data = node.node.copy()
-            node_data.pop(lib.CHILDREN_FIELD, None)
+            node_data = node.get_node_data()
             if children:
                 node_data[lib.CHILDREN_FIELD] = children
             while node.parent:
                 parent = BASE_NODE_LIST.get_node(node.parent)
-                parent_data = parent.node.copy()
+                parent_data = parent.get_node_data()
                 parent_data[lib.CHILDREN_FIELD] = [node_data]
                 node_data = parent_data
                 node = parent
@@ -759,7 +1035,7 @@ class ProcessNodeList:
     def __add_merged_node(
         self, other_node: ProcessNode, eusers=[], parent=None
     ) -> ProcessNode:
-        proc_node = ProcessNode(self, other_node.node, eusers, parent)
+        proc_node = ProcessNode.copy_node(self, other_node, eusers, parent)
         if proc_node.id in self.ids:
             new_id = self.__unique_id(proc_node.id)
             proc_node.id = new_id
@@ -768,18 +1044,14 @@ class ProcessNodeList:
         self.proc_name_index.setdefault(proc_node.name, [])
         self.proc_name_index[proc_node.name].append(proc_node.id)
         self.ids.add(proc_node.id)
-        if lib.CHILDREN_FIELD in proc_node.node:
-            new_children_ids = []
-            for child_data in proc_node.node.get(lib.CHILDREN_FIELD):
-                child_id = child_data[lib.ID_FIELD]
-                child_node = other_node.node_list.get_node(child_id)
-                if not child_node:
-                    raise InvalidMergeError("Bug, node list missing ID")
-                added_child = self.__add_merged_node(
-                    child_node, proc_node.eusers, proc_node.id
-                )
-                new_children_ids.append(added_child.id)
-            proc_node.children = new_children_ids
+        for child_id in other_node.children:
+            child_node = other_node.node_list.get_node(child_id)
+            if not child_node:
+                raise InvalidMergeError("Bug, node list missing ID")
+            added_child = self.__add_merged_node(
+                child_node, proc_node.eusers, proc_node.id
+            )
+            proc_node.children.append(added_child.id)
         return proc_node
 
 
@@ -788,23 +1060,62 @@ class InvalidNetworkNode(Exception):
 
 
 class IPBlock:
+    # Networks are stored as (version, network address int, prefixlen)
+    __slots__ = ("version", "address", "prefixlen", "except_blocks")
+
     def __init__(
         self,
         ip_network: Union[ipaddr.IPv4Network, ipaddr.IPv6Network],
         except_networks: List = None,
     ) -> None:
-        self.network = ip_network
-        self.except_networks = except_networks
         if except_networks is not None:
             for net in except_networks:
                 if not ip_network.supernet_of(net):
                     raise InvalidNetworkNode(
                         "Except block must be completely within cidr network"
                     )
+        self.version = ip_network.version
+        self.address = int(ip_network.network_address)
+        self.prefixlen = ip_network.prefixlen
+        self.except_blocks: Optional[Tuple[Tuple[int, int], ...]] = None
+        if except_networks is not None:
+            self.except_blocks = tuple(
+                (int(net.network_address), net.prefixlen)
+                for net in except_networks
+            )
+
+    @property
+    def network(self) -> Union[ipaddr.IPv4Network, ipaddr.IPv6Network]:
+        return self.__make_network(self.address, self.prefixlen)
+
+    @property
+    def except_networks(self) -> Optional[List]:
+        if self.except_blocks is None:
+            return None
+        return [
+            self.__make_network(address, prefixlen)
+            for address, prefixlen in self.except_blocks
+        ]
+
+    @property
+    def sort_key(self) -> Tuple[int, int]:
+        # Same order as sorting the ipaddress networks
+        return self.address, self.prefixlen
+
+    def __make_network(self, address: int, prefixlen: int):
+        if self.version == 4:
+            return ipaddr.IPv4Network((address, prefixlen))
+        return ipaddr.IPv6Network((address, prefixlen))
+
+    def __supernet_of(self, address, prefixlen, other: "IPBlock") -> bool:
+        if prefixlen > other.prefixlen:
+            return False
+        shift = (32 if self.version == 4 else 128) - prefixlen
+        return address >> shift == other.address >> shift
 
     def as_dict(self) -> Dict:
         ipblock_dict = {lib.CIDR_FIELD: str(self.network)}
-        if self.except_networks:
+        if self.except_blocks:
             ipblock_dict[lib.EXCEPT_FIELD] = [
                 str(net) for net in self.except_networks
             ]
@@ -813,34 +1124,48 @@ class IPBlock:
 
     def __contains__(self, other):
         if isinstance(other, IPBlock):
-            if self.except_networks is not None:
-                for net in self.except_networks:
-                    try:
-                        if net.supernet_of(other.network):
-                            return False
-                    except TypeError:
-                        # Occurs when comparing ipv4 with ipv6
-                        continue
-            try:
-                if self.network.supernet_of(other.network):
-                    return True
-            except TypeError:
+            if self.version != other.version:
+                # Comparing ipv4 with ipv6
                 return False
+            if self.except_blocks is not None:
+                for address, prefixlen in self.except_blocks:
+                    if self.__supernet_of(address, prefixlen, other):
+                        return False
+            if self.__supernet_of(self.address, self.prefixlen, other):
+                return True
         return False
 
     def __eq__(self, __o: object) -> bool:
         if not isinstance(__o, IPBlock):
             return False
         return (
-            self.network == __o.network
-            and self.except_networks == __o.except_networks
+            self.version == __o.version
+            and self.address == __o.address
+            and self.prefixlen == __o.prefixlen
+            and self.except_blocks == __o.except_blocks
         )
 
 
+# Protocols are stored on port ranges as small ints
+PROTO_CODES: Dict[str, int] = {}
+PROTO_NAMES: List[str] = []
+
+
+def proto_code(proto: str) -> int:
+    code = PROTO_CODES.get(proto)
+    if code is None:
+        code = len(PROTO_NAMES)
+        PROTO_NAMES.append(proto)
+        PROTO_CODES[proto] = code
+    return code
+
+
 class PortRange:
+    __slots__ = ("port", "proto_code", "endport")
+
     def __init__(self, port: int, proto: str, endport: int = None) -> None:
         self.port = port
-        self.proto = proto
+        self.proto_code = proto_code(proto)
         self.endport = endport if endport is not None else self.port
         if self.endport < self.port:
             raise InvalidNetworkNode(
@@ -848,6 +1173,10 @@ class PortRange:
                 f" to {lib.PORT_FIELD} value."
             )
 
+    @property
+    def proto(self) -> str:
+        return PROTO_NAMES[self.proto_code]
+
     def as_dict(self) -> Dict:
         rv = {lib.PROTO_FIELD: self.proto, lib.PORT_FIELD: self.port}
         if self.endport != self.port:
@@ -859,13 +1188,24 @@ class PortRange:
             if (
                 self.port <= other.port <= self.endport
                 and self.port <= other.endport <= self.endport
-                and self.proto == other.proto
+                and self.proto_code == other.proto_code
             ):
                 return True
         return False
 
 
 class NetworkNode:
+    __slots__ = (
+        "ip_blocks",
+        "proc_node_list",
+        "dns_names",
+        "port_ranges",
+        "processes",
+        "node_list",
+        "anded_blocks",
+        "type",
+    )
+
     def __init__(
         self,
         node_list: "NetworkNodeList",
@@ -876,7 +1216,10 @@ class NetworkNode:
         self.proc_node_list = proc_node_list
         self.dns_names = []
         self.port_ranges: List[PortRange] = []
-        self.processes = node_data.get(lib.PROCESSES_FIELD, [])
+        self.processes = [
+            intern_str(proc_id)
+            for proc_id in node_data.get(lib.PROCESSES_FIELD, [])
+        ]
         self.node_list = node_list
         # Anded blocks are not supported
         self.anded_blocks = []
@@ -895,29 +1238,34 @@ class NetworkNode:
     def symmetrical_merge(
         self,
         other_node: "NetworkNode",
-    ):
-        self.__merge_ip_blocks(
+    ) -> bool:
+        """Returns True if this node was changed by the merge."""
+        changed = self.__merge_ip_blocks(
             other_node.ip_blocks,
             symmetrical=True,
         )
-        self.__merge_dns_names(
+        changed |= self.__merge_dns_names(
             other_node.dns_names,
             symmetrical=True,
         )
-        self.__merge_process_ids(other_node.processes)
+        changed |= self.__merge_process_ids(other_node.processes)
+        return changed
 
-    def asymmetrical_merge(self, other_node: "NetworkNode"):
-        self.__merge_ip_blocks(
+    def asymmetrical_merge(self, other_node: "NetworkNode") -> bool:
+        """Returns True if this node was changed by the merge."""
+        changed = self.__merge_ip_blocks(
             other_node.ip_blocks,
             symmetrical=False,
         )
-        self.__merge_dns_names(
+        changed |= self.__merge_dns_names(
             other_node.dns_names,
             symmetrical=False,
         )
-        self.__merge_process_ids(other_node.processes)
+        changed |= self.__merge_process_ids(other_node.processes)
+        return changed
 
-    def internal_merge(self):
+    def internal_merge(self) -> bool:
+        """Returns True if any blocks or dns names were removed."""
         if self.node_list.ignore_procs:
             self.proc_node_list = []
         new_blocks = []
@@ -932,6 +1280,7 @@ class NetworkNode:
             if any([block in ob for ob in self.ip_blocks[next_index:]]):
                 continue
             new_blocks.append(block)
+        changed = len(new_blocks) != len(self.ip_blocks)
         self.ip_blocks = new_blocks
         dns_names = set()
         for dns_name in self.dns_names:
@@ -940,7 +1289,9 @@ class NetworkNode:
             if self.node_list.ignore_public and lib.is_public_dns(dns_name):
                 continue
             dns_names.add(dns_name)
+        changed |= len(dns_names) != len(self.dns_names)
         self.dns_names = list(dns_names)
+        return changed
 
     def as_dict(self) -> Optional[Dict]:
         or_field_string = (
@@ -950,19 +1301,11 @@ class NetworkNode:
         dns_names = [
             {lib.DNS_SELECTOR_FIELD: [name]} for name in sorted(self.dns_names)
         ]
-        ipv4_blocks = [
-            b
-            for b in self.ip_blocks
-            if isinstance(b.network, ipaddr.IPv4Network)
-        ]
-        ipv4_blocks.sort(key=lambda x: x.network)
+        ipv4_blocks = [b for b in self.ip_blocks if b.version == 4]
+        ipv4_blocks.sort(key=lambda x: x.sort_key)
         ipv4_blocks = [b.as_dict() for b in ipv4_blocks]
-        ipv6_blocks = [
-            b
-            for b in self.ip_blocks
-            if isinstance(b.network, ipaddr.IPv6Network)
-        ]
-        ipv6_blocks.sort(key=lambda x: x.network)
+        ipv6_blocks = [b for b in self.ip_blocks if b.version == 6]
+        ipv6_blocks.sort(key=lambda x: x.sort_key)
         ipv6_blocks = [b.as_dict() for b in ipv6_blocks]
         or_blocks = dns_names + ipv4_blocks + ipv6_blocks
         if not or_blocks:
@@ -1036,7 +1379,7 @@ class NetworkNode:
                     self.ip_blocks.append(block)
             elif lib.DNS_SELECTOR_FIELD in block:
                 for dns_name in block[lib.DNS_SELECTOR_FIELD]:
-                    self.dns_names.append(dns_name)
+                    self.dns_names.append(intern_str(dns_name))
 
     def __parse_port_block(self, port_block: List[Dict]):
         for port in port_block:
@@ -1048,18 +1391,21 @@ class NetworkNode:
                 )
             )
 
-    def __merge_process_ids(self, other_processes: List[str]):
+    def __merge_process_ids(self, other_processes: List[str]) -> bool:
         if self.node_list.ignore_procs:
+            changed = len(self.processes) > 0
             self.processes = []
-            return
+            return changed
+        changed = not set(other_processes).issubset(self.processes)
         self.processes.extend(other_processes)
         self.processes = sorted(list(set(self.processes)))
+        return changed
 
     def __merge_ip_block(
         self,
         other_ip_block: IPBlock,
         symmetrical=False,
-    ):
+    ) -> bool:
         if symmetrical:
             match = False
             for i, ip_block in enumerate(self.ip_blocks):
@@ -1068,10 +1414,10 @@ class NetworkNode:
                     break
                 elif ip_block in other_ip_block:
                     self.ip_blocks[i] = other_ip_block
-                    match = True
-                    break
+                    return True
             if not match:
                 self.ip_blocks.append(other_ip_block)
+                return True
         else:
             match = False
             for ip_block in self.ip_blocks:
@@ -1080,12 +1426,15 @@ class NetworkNode:
                     break
             if not match:
                 self.ip_blocks.append(other_ip_block)
+                return True
+        return False
 
     def __merge_ip_blocks(
         self,
         other_ip_blocks: List[IPBlock],
         symmetrical=False,
-    ):
+    ) -> bool:
+        changed = False
         for o_ip_block in other_ip_blocks:
             if self.node_list.ignore_private and o_ip_block.network.is_private:
                 continue
@@ -1094,13 +1443,14 @@ class NetworkNode:
                 and not o_ip_block.network.is_private
             ):
                 continue
-            self.__merge_ip_block(o_ip_block, symmetrical)
+            changed |= self.__merge_ip_block(o_ip_block, symmetrical)
+        return changed
 
     def __merge_dns_name(
         self,
         other_dns_name: str,
         symmetrical=False,
-    ):
+    ) -> bool:
         if symmetrical:
             match = False
             for i, dns_name in enumerate(self.dns_names):
@@ -1108,11 +1458,11 @@ class NetworkNode:
                     match = True
                     break
                 elif fnmatch.fnmatch(dns_name, other_dns_name):
-                    match = True
                     self.dns_names[i] = other_dns_name
-                    break
+                    return True
             if not match:
                 self.dns_names.append(other_dns_name)
+                return True
         else:
             match = False
             for dns_name in self.dns_names:
@@ -1121,12 +1471,15 @@ class NetworkNode:
                     break
             if not match:
                 self.dns_names.append(other_dns_name)
+                return True
+        return False
 
     def __merge_dns_names(
         self,
         other_dns_names: List[str],
         symmetrical=False,
-    ):
+    ) -> bool:
+        changed = False
         for o_dns_name in other_dns_names:
             if self.node_list.ignore_private and lib.is_private_dns(
                 o_dns_name
@@ -1134,7 +1487,8 @@ class NetworkNode:
                 continue
             if self.node_list.ignore_public and lib.is_public_dns(o_dns_name):
                 continue
-            self.__merge_dns_name(o_dns_name, symmetrical)
+            changed |= self.__merge_dns_name(o_dns_name, symmetrical)
+        return changed
 
     def __find_proc_node(
         self, proc_id, node_list: ProcessNodeList
@@ -1287,28 +1641,36 @@ class NetworkNodeList:
     def symmetrical_merge(
         self,
         other_list: "NetworkNodeList",
-    ):
+    ) -> bool:
+        """Returns True if this node list was changed by the merge."""
+        changed = False
         for other_node in other_list.nodes:
-            self.__symmetrical_merge_helper(other_node)
+            changed |= self.__symmetrical_merge_helper(other_node)
+        return changed
 
     def asymmetrical_merge(
         self,
         other_list: "NetworkNodeList",
-    ):
+    ) -> bool:
+        """Returns True if this node list was changed by the merge."""
+        changed = False
         for other_node in other_list.nodes:
-            self.__asymmetrical_merge_helper(other_node)
+            changed |= self.__asymmetrical_merge_helper(other_node)
+        return changed
 
     def internal_merge(
         self,
-    ):
+    ) -> bool:
+        """Returns True if any nodes were combined or trimmed."""
         if len(self.nodes) <= 1:
             if len(self.nodes) == 1:
-                self.nodes[0].internal_merge()
-            return
+                return self.nodes[0].internal_merge()
+            return False
+        changed = False
         skip_index = set()
         new_nodes = []
         for i, node in enumerate(self.nodes):
-            node.internal_merge()
+            changed |= node.internal_merge()
             if i in skip_index:
                 continue
             if i == len(self.nodes) - 1:
@@ -1320,7 +1682,9 @@ class NetworkNodeList:
                 if other_node in node or node in other_node:
                     node.symmetrical_merge(other_node)
                     skip_index.add(j + x)
+        changed |= len(new_nodes) != len(self.nodes)
         self.nodes = new_nodes
+        return changed
 
     def get_data(self) -> List[Dict]:
         rv = []
@@ -1334,33 +1698,39 @@ class NetworkNodeList:
         new_node = NetworkNode(self, node_data, self.proc_node_list)
         self.nodes.append(new_node)
 
-    def __symmetrical_merge_helper(self, other_node: "NetworkNode"):
+    def __symmetrical_merge_helper(self, other_node: "NetworkNode") -> bool:
         match = False
+        changed = False
         cvt_other_node = other_node.converted
         for i, node in enumerate(self.nodes):
             if cvt_other_node in node:
                 match = True
-                node.symmetrical_merge(cvt_other_node)
+                changed |= node.symmetrical_merge(cvt_other_node)
                 break
             elif node in cvt_other_node:
-                node.symmetrical_merge(cvt_other_node)
+                changed |= node.symmetrical_merge(cvt_other_node)
                 match = True
         if not match:
             self.nodes.append(cvt_other_node)
+            changed = True
+        return changed
 
     def __asymmetrical_merge_helper(
         self,
         other_node: "NetworkNode",
-    ):
+    ) -> bool:
         match = False
+        changed = False
         cvt_other_node = other_node.converted
         for i, node in enumerate(self.nodes):
             if cvt_other_node in node:
                 match = True
-                node.asymmetrical_merge(cvt_other_node)
+                changed |= node.asymmetrical_merge(cvt_other_node)
                 break
         if not match:
             self.nodes.append(cvt_other_node)
+            changed = True
+        return changed
 
 
 def merge_proc_policies(
@@ -1373,15 +1743,19 @@ def merge_proc_policies(
     if mo.disable_procs:
         BASE_NODE_LIST = ProcessNodeList([])
         MERGING_NODE_LIST = ProcessNodeList([])
+        if proc_data:
+            mo.mark_dirty()
         return []
     if BASE_NODE_LIST is None:
         BASE_NODE_LIST = ProcessNodeList(proc_data)
     MERGING_NODE_LIST = ProcessNodeList(other_proc_data)
     result = []
     if symmetric:
-        BASE_NODE_LIST.symmetrical_merge(MERGING_NODE_LIST)
+        changed = BASE_NODE_LIST.symmetrical_merge(MERGING_NODE_LIST)
     else:
-        BASE_NODE_LIST.asymmetrical_merge(MERGING_NODE_LIST)
+        changed = BASE_NODE_LIST.asymmetrical_merge(MERGING_NODE_LIST)
+    if changed:
+        mo.mark_dirty()
     result = BASE_NODE_LIST.get_data()
     return result
 
@@ -1393,6 +1767,8 @@ def merge_ingress_or_egress(
     symmetric: bool,
 ):
     if mo.disable_conns == lib.DISABLE_CONNS_ALL:
+        if base_data:
+            mo.mark_dirty()
         return []
     disable_private = mo.disable_private_conns == lib.DISABLE_CONNS_ALL
     disable_public = mo.disable_public_conns == lib.DISABLE_CONNS_ALL
@@ -1416,6 +1792,8 @@ def merge_ingress_or_egress(
         return []
     if direction == lib.EGRESS_FIELD:
         if mo.disable_conns == lib.DISABLE_CONNS_EGRESS:
+            if base_data:
+                mo.mark_dirty()
             return []
         if mo.disable_private_conns == lib.DISABLE_CONNS_EGRESS:
             net_node_list.ignore_private = True
@@ -1425,6 +1803,8 @@ def merge_ingress_or_egress(
             other_node_list.ignore_public = True
     else:
         if mo.disable_conns == lib.DISABLE_CONNS_INGRESS:
+            if base_data:
+                mo.mark_dirty()
             return []
         if mo.disable_private_conns == lib.DISABLE_CONNS_INGRESS:
             net_node_list.ignore_private = True
@@ -1432,14 +1812,17 @@ def merge_ingress_or_egress(
         if mo.disable_public_conns == lib.DISABLE_CONNS_INGRESS:
             net_node_list.ignore_public = True
             other_node_list.ignore_public = True
-    net_node_list.internal_merge()
+    changed = net_node_list.internal_merge()
     other_node_list.internal_merge()
     if symmetric:
-        net_node_list.symmetrical_merge(other_node_list)
+        changed |= net_node_list.symmetrical_merge(other_node_list)
     else:
-        net_node_list.asymmetrical_merge(other_node_list)
-    net_node_list.internal_merge()
+        changed |= net_node_list.asymmetrical_merge(other_node_list)
+    changed |= net_node_list.internal_merge()
     result = net_node_list.get_data()
+    # Nodes left without any blocks are dropped from the result
+    if changed or len(result) != len(base_data):
+        mo.mark_dirty()
     return result
 
 
@@ -1453,6 +1836,8 @@ def common_keys_merge(
             continue
         if value == other_data.get(key):
             result[key] = value
+    if len(result) != len(base_data):
+        mo.mark_dirty()
     if len(result) > 0:
         return result
     return None
@@ -1480,6 +1865,8 @@ def wildcard_merge(
                 result = None
         else:
             result = None
+    if result != base_str:
+        mo.mark_dirty()
     return result
 
 
@@ -1488,6 +1875,8 @@ def all_eq_merge(mo: MergeObject, base_str: str, other_str: str, _):
         result = base_str
     else:
         result = None
+        if base_str is not None:
+            mo.mark_dirty()
     return result
 
 
@@ -1508,6 +1897,8 @@ def greatest_value_merge(
         result = base_val
     else:
         result = other_val
+    if result != base_val:
+        mo.mark_dirty()
     return result
 
 
@@ -1518,10 +1909,15 @@ def string_list_merge(
     _,
 ):
     if isinstance(base_value, str):
+        # Converting a single string to a list is a change in itself
+        mo.mark_dirty()
         base_value = [base_value]
     if isinstance(other_value, str):
         other_value = [other_value]
-    string_set = set(base_value).union(set(other_value))
+    base_set = set(base_value)
+    string_set = base_set.union(set(other_value))
+    if len(string_set) != len(base_set):
+        mo.mark_dirty()
     return sorted(string_set)
 
 
@@ -1545,6 +1941,7 @@ def unique_dict_list_merge(
         if item in base_value:
             continue
         rv.append(item)
+        mo.mark_dirty()
     return rv
 
 
@@ -1666,48 +2063,155 @@ TRACE_SUPPRESSION_SPEC_MERGE_SCHEMA = MergeSchema(
 )
 
 
-def make_wildcard(strs: List[str]):
+def make_wildcard(strs: List[str]) -> Optional[str]:
+    """Build a wildcard string matching every string in strs, using the
+    longest substring they all share. Returns None if the shared
+    substring is shorter than 3 characters.
+
+    Results are cached by input, the same names tend to be compared
+    over and over while merging fingerprints.
+    """
+    key = tuple(strs)
+    if key in WILDCARD_CACHE:
+        return WILDCARD_CACHE[key]
+    rv = __make_wildcard(strs)
+    WILDCARD_CACHE[key] = rv
+    return rv
+
+
+def __make_wildcard(strs: List[str]) -> Optional[str]:
     if len(strs) == 1:
         return strs[0]
-    cmp_str = strs[0]
+    original_str = strs[0]
     if len(set(strs)) == 1:
-        return cmp_str
-    # Simple string match didn't work so lets see if there is a
-    # better match (takes more computation)
-    original_str = sub_str = strs[0]
-    first_char = original_str[0]
-    last_char = original_str[-1]
-    for name in strs[1:]:
-        if first_char != name[0]:
-            first_char = None
-        if last_char != name[-1]:
-            last_char = None
-        name = name.strip("*")
-        match = SequenceMatcher(None, sub_str, name).find_longest_match(
-            0, len(sub_str), 0, len(name)
-        )
-        match_si = match.a
-        match_ei = match.a + match.size
-        sub_str = sub_str[match_si:match_ei]
-        if len(sub_str) < 3:
-            break
+        return original_str
+    others = [name.strip("*") for name in strs[1:]]
+    sub_str = longest_common_substring(original_str, others)
     if len(sub_str) < 3:
-        ret = None
-    elif not (match.b == 0 and original_str.startswith(sub_str)) and not (
-        match.b + match.size == len(name) and original_str.endswith(sub_str)
-    ):
+        return None
+    # The first occurrence of the substring in each of the other strings
+    # decides if it is a prefix or suffix of all of them.
+    match_indexes = [name.find(sub_str) for name in others]
+    is_prefix = original_str.startswith(sub_str) and all(
+        index == 0 for index in match_indexes
+    )
+    is_suffix = original_str.endswith(sub_str) and all(
+        index + len(sub_str) == len(name)
+        for index, name in zip(match_indexes, others)
+    )
+    if not is_prefix and not is_suffix:
         ret = "*" + sub_str + "*"
-    elif not (match.b == 0 and original_str.startswith(sub_str)):
+    elif not is_prefix:
         ret = "*" + sub_str
-    elif not (
-        match.b + match.size == len(name) and original_str.endswith(sub_str)
-    ):
+    elif not is_suffix:
         ret = sub_str + "*"
     else:
         cli.err_exit(f"Bug detected in wildcard logic. Input:" f" '{strs}'.")
     return ret
 
 
+def longest_common_substring(string: str, others: List[str]) -> str:
+    """Find the longest substring of string that is in all of others.
+
+    Uses a suffix automaton so the cost is linear in the total length
+    of the input. Ties go to the substring that starts earliest in
+    string.
+    """
+    if len(others) == 1:
+        # Walk string through the automaton of the other string, the
+        # first longest match is the earliest one in string.
+        trans, link, length, _ = __suffix_automaton(others[0])
+        best_len = best_end = 0
+        state = match_len = 0
+        for i, char in enumerate(string):
+            while state and char not in trans[state]:
+                state = link[state]
+                match_len = length[state]
+            if char in trans[state]:
+                state = trans[state][char]
+                match_len += 1
+            if match_len > best_len:
+                best_len = match_len
+                best_end = i
+        start, end = best_end - best_len + 1, best_end + 1
+        return string[start:end]
+    # Walk each of the other strings through the automaton of string,
+    # keeping the shortest match seen at each state across all of them.
+    trans, link, length, first_end = __suffix_automaton(string)
+    by_length = sorted(range(1, len(trans)), key=lambda x: -length[x])
+    common = length.copy()
+    for other in others:
+        matched = [0] * len(trans)
+        state = match_len = 0
+        for char in other:
+            while state and char not in trans[state]:
+                state = link[state]
+                match_len = length[state]
+            if char in trans[state]:
+                state = trans[state][char]
+                match_len += 1
+            if match_len > matched[state]:
+                matched[state] = match_len
+        # Longest states first so matches propagate up the suffix links
+        for state in by_length:
+            if matched[state]:
+                matched[link[state]] = length[link[state]]
+            if matched[state] < common[state]:
+                common[state] = matched[state]
+    best_len = 0
+    best_end = -1
+    for state in range(1, len(trans)):
+        if common[state] > best_len or (
+            common[state] == best_len and first_end[state] < best_end
+        ):
+            best_len = common[state]
+            best_end = first_end[state]
+    if best_len == 0:
+        return ""
+    start, end = best_end - best_len + 1, best_end + 1
+    return string[start:end]
+
+
+def __suffix_automaton(
+    string: str,
+) -> Tuple[List[Dict[str, int]], List[int], List[int], List[int]]:
+    """Build the suffix automaton of string. Returns the transitions,
+    suffix links, longest lengths, and the end index of the first
+    occurrence in string of each state."""
+    trans: List[Dict[str, int]] = [{}]
+    link = [-1]
+    length = [0]
+    first_end = [-1]
+    last = 0
+    for i, char in enumerate(string):
+        cur = len(trans)
+        trans.append({})
+        link.append(0)
+        length.append(length[last] + 1)
+        first_end.append(i)
+        state = last
+        while state != -1 and char not in trans[state]:
+            trans[state][char] = cur
+            state = link[state]
+        if state != -1:
+            next_state = trans[state][char]
+            if length[state] + 1 == length[next_state]:
+                link[cur] = next_state
+            else:
+                clone = len(trans)
+                trans.append(trans[next_state].copy())
+                link.append(link[next_state])
+                length.append(length[state] + 1)
+                first_end.append(first_end[next_state])
+                while state != -1 and trans[state].get(char) == next_state:
+                    trans[state][char] = clone
+                    state = link[state]
+                link[next_state] = clone
+                link[cur] = clone
+        last = cur
+    return trans, link, length, first_end
+
+
 def make_orig_line(line: str) -> str:
     return DEFAULT_WHITESPACE + line
 
@@ -1837,11 +2341,126 @@ def un_defer_diffs(
         diff.deferred = False
 
 
+class YamlLineIndex:
+    """Index over the lines of a yaml dump used by the diff engine.
+
+    Answers the same questions as the line-by-line regex scans in
+    find_obj_indexes, find_ancestor_indexes, and find_item_ending_index
+    with bisect lookups, so a diff only walks the yaml lines once.
+    """
+
+    def __init__(self, yaml_lines: List[str]):
+        # (line prefix, field) -> line indexes of "<prefix><field>:" lines
+        # where the prefix is the leading run of indents and list markers
+        self.field_lines: Dict[Tuple[str, str], List[int]] = {}
+        # whitespace length -> line indexes of "<whitespace><key>:" lines
+        self.key_lines: Dict[int, List[int]] = {}
+        # list item prefix -> line indexes of lines starting with it
+        self.item_lines: Dict[str, List[int]] = {}
+        for i, line in enumerate(yaml_lines):
+            prefix_end = 0
+            while True:
+                if line.startswith(" ", prefix_end):
+                    prefix_end += 1
+                elif line.startswith(LIST_MARKER, prefix_end):
+                    prefix_end += len(LIST_MARKER)
+                    self.item_lines.setdefault(line[:prefix_end], []).append(
+                        i
+                    )
+                else:
+                    break
+            colon = line.find(":", prefix_end)
+            if colon > prefix_end:
+                self.field_lines.setdefault(
+                    (line[:prefix_end], line[prefix_end:colon]), []
+                ).append(i)
+            whitespace_length = len(line) - len(line.lstrip(" "))
+            token = NON_WHITESPACE_RUN.match(line, whitespace_length).group()
+            if token.find(":", 1) != -1:
+                self.key_lines.setdefault(whitespace_length, []).append(i)
+
+    @staticmethod
+    def can_index(field, prefix: str = None) -> bool:
+        if not isinstance(field, str) or not field:
+            return False
+        if field[0] in " -" or ":" in field or re.escape(field) != field:
+            return False
+        if prefix and not LINE_PREFIX_RUN.fullmatch(prefix):
+            return False
+        return True
+
+    @staticmethod
+    def __first_in_range(
+        indexes: Optional[List[int]], starting_index: int, ending_index: int
+    ) -> Optional[int]:
+        if not indexes:
+            return None
+        i = bisect.bisect_left(indexes, starting_index)
+        if i < len(indexes) and indexes[i] < ending_index:
+            return indexes[i]
+        return None
+
+    def find_field(
+        self, prefixes: List[str], field: str, starting_index, ending_index
+    ) -> Optional[int]:
+        rv = None
+        for prefix in prefixes:
+            index = self.__first_in_range(
+                self.field_lines.get((prefix, field)),
+                starting_index,
+                ending_index,
+            )
+            if index is not None and (rv is None or index < rv):
+                rv = index
+        return rv
+
+    def find_key(
+        self, whitespace_length: int, starting_index, ending_index
+    ) -> Optional[int]:
+        return self.__first_in_range(
+            self.key_lines.get(whitespace_length),
+            starting_index,
+            ending_index,
+        )
+
+    def find_item(
+        self, item_prefix: str, starting_index, ending_index
+    ) -> Optional[int]:
+        return self.__first_in_range(
+            self.item_lines.get(item_prefix), starting_index, ending_index
+        )
+
+
 def find_ancestor_indexes(
-    yaml_lines, field, whitespace_length, starting_index, ending_index=None
+    yaml_lines,
+    field,
+    whitespace_length,
+    starting_index,
+    ending_index=None,
+    line_index: YamlLineIndex = None,
 ) -> Optional[Tuple[int, int]]:
     if ending_index is None:
         ending_index = len(yaml_lines)
+    if line_index and line_index.can_index(field):
+        prefixes = [
+            " " * whitespace_length,
+            " " * max(whitespace_length - len(DEFAULT_WHITESPACE), 0)
+            + LIST_MARKER,
+        ]
+        index = line_index.find_field(
+            prefixes, field, starting_index, ending_index
+        )
+        if index is None:
+            return None
+        i = index - starting_index
+        starting_index = index + 1
+        if i + 1 != ending_index:
+            end = line_index.find_key(
+                whitespace_length, starting_index + i + 1, ending_index
+            )
+            if end is not None:
+                ending_index = end
+        return starting_index, ending_index
     pat = re.compile(rf"^ {{{whitespace_length}}}{field}:")
     pat2 = re.compile(
         rf"^ {{{max(whitespace_length - len(DEFAULT_WHITESPACE), 0)}}}"
@@ -1874,7 +2493,24 @@ def find_obj_indexes(
     ending_index: int,
     whitespace_length: int,
     obj_prefix: int = None,
+    line_index: YamlLineIndex = None,
 ) -> Optional[Tuple[int, int]]:
+    if line_index and line_index.can_index(field, obj_prefix):
+        prefixes = [" " * whitespace_length]
+        if obj_prefix:
+            prefixes.append(obj_prefix)
+        index = line_index.find_field(
+            prefixes, field, starting_index, ending_index
+        )
+        if index is None:
+            return None
+        if index - starting_index + 1 != ending_index:
+            end = line_index.find_key(
+                whitespace_length, index + 1, ending_index
+            )
+            if end is not None:
+                ending_index = end
+        return index, ending_index
     pat = re.compile(rf"^ {{{whitespace_length}}}{field}:")
     pat2 = False
     if obj_prefix:
@@ -1946,11 +2582,24 @@ def unify_diffs(
 
 
 def find_item_ending_index(
-    item_si: int, list_ei: int, yaml_lines: List[str], item_prefix: str
+    item_si: int,
+    list_ei: int,
+    yaml_lines: List[str],
+    item_prefix: str,
+    line_index: YamlLineIndex = None,
 ):
     item_ei = list_ei
     if item_ei - item_si <= 0:
         raise Exception("Found bug, list ei must be greater than item si")
+    elif (
+        item_ei - item_si > 1
+        and line_index
+        and item_prefix.endswith(LIST_MARKER)
+        and LINE_PREFIX_RUN.fullmatch(item_prefix)
+    ):
+        index = line_index.find_item(item_prefix, item_si + 1, list_ei)
+        if index is not None:
+            item_ei = index
     elif item_ei - item_si > 1:
         si = item_si + 1
         for i, line in enumerate(yaml_lines[si:list_ei]):
@@ -1994,6 +2643,7 @@ def diff_all_fields(
         ancestor_fields,
         starting_index,
         ending_index,
+        line_index=YamlLineIndex(yaml_lines),
     )
     new_lines = []
     for diff in diffs:
@@ -2002,10 +2652,7 @@ def diff_all_fields(
             new_lines.extend(diff.add_lines)
         else:
             new_lines.extend(diff.orig_lines)
-        pass
-    del yaml_lines[starting_index:ending_index]
-    for i, new_line in enumerate(new_lines):
-        yaml_lines.insert(i + starting_index, new_line)
+    yaml_lines[starting_index:ending_index] = new_lines
 
 
 def dict_diffs(
@@ -2016,6 +2663,7 @@ def dict_diffs(
     starting_index: int,
     ending_index: int,
     object_prefix: str = None,
+    line_index: YamlLineIndex = None,
 ) -> List[Union[DiffLines, OriginalLines]]:
     diffs = []
     fields = set(original_data).union(set(other_data))
@@ -2036,6 +2684,7 @@ def dict_diffs(
                 ending_index,
                 whitespace_length,
                 obj_prefix=object_prefix,
+                line_index=line_index,
             )
             if indexes is None:
                 raise Exception("Found bug! Unable to locate obj")
@@ -2067,6 +2716,7 @@ def dict_diffs(
                     obj_si,
                     obj_ei,
                     ancestor_fields + [field],
+                    line_index,
                 )
 
                 if field == lib.PROC_POLICY_FIELD:
@@ -2093,10 +2743,11 @@ def dict_diffs(
                         ancestor_fields + [field],
                         obj_si,
                         obj_ei,
+                        line_index=line_index,
                     )
                 )
             else:
-                diff_yaml = yaml.dump(
+                diff_yaml = lib.yaml_dump(
                     {field: other_data[field]}, sort_keys=False
                 )
                 add_lines = [
@@ -2117,6 +2768,7 @@ def dict_diffs(
                 ending_index,
                 whitespace_length,
                 obj_prefix=object_prefix,
+                line_index=line_index,
             )
             if indexes is None:
                 raise Exception("Found bug! Unable to locate obj")
@@ -2140,7 +2792,7 @@ def dict_diffs(
                 and lib.PROC_POLICY_FIELD in ancestor_fields
             ):
                 deferred = True
-            diff_yaml: str = yaml.dump(
+            diff_yaml: str = lib.yaml_dump(
                 {field: other_data[field]}, sort_keys=False
             )
             add_lines = [
@@ -2167,6 +2819,7 @@ def list_diffs(
     starting_index: int,
     ending_index: int,
     ancestor_fields: List[str] = [],
+    line_index: YamlLineIndex = None,
 ):
     diffs = []
     parent_index = starting_index
@@ -2177,6 +2830,7 @@ def list_diffs(
         whitespace_length,
         starting_index,
         ending_index,
+        line_index,
     )
     if indexes is None:
         raise Exception("Found bug! Unable to locate ancestor obj")
@@ -2197,38 +2851,21 @@ def list_diffs(
             )
         )
         seen = set()
+        other_nodes = {}
+        for other_node in other_data:
+            other_nodes.setdefault(other_node["id"], other_node)
         for proc_node in original_data:
             item_ei = find_item_ending_index(
-                item_si, ending_index, yaml_lines, item_prefix
+                item_si,
+                ending_index,
+                yaml_lines,
+                item_prefix,
+                line_index,
             )
             proc_id = proc_node["id"]
             seen.add(proc_id)
-            id_match = False
-            for other_node in other_data:
-                if other_node["id"] == proc_id:
-                    id_match = True
-                    if proc_node == other_node:
-                        orig_lines = [
-                            make_orig_line(o_line)
-                            for o_line in yaml_lines[item_si:item_ei]
-                        ]
-                        diffs.append(
-                            OriginalLines(item_si, item_ei, orig_lines)
-                        )
-                    else:
-                        diffs.extend(
-                            dict_diffs(
-                                proc_node,
-                                other_node,
-                                yaml_lines,
-                                ancestor_fields,
-                                item_si,
-                                item_ei,
-                                item_prefix,
-                            )
-                        )
-                    break
-            if not id_match:
+            other_node = other_nodes.get(proc_id)
+            if other_node is None:
                 # proc node missing in new version
                 sub_lines = [
                     make_sub_line(o_line)
@@ -2242,13 +2879,32 @@ def list_diffs(
                         [],
                     )
                 )
+            elif proc_node == other_node:
+                orig_lines = [
+                    make_orig_line(o_line)
+                    for o_line in yaml_lines[item_si:item_ei]
+                ]
+                diffs.append(OriginalLines(item_si, item_ei, orig_lines))
+            else:
+                diffs.extend(
+                    dict_diffs(
+                        proc_node,
+                        other_node,
+                        yaml_lines,
+                        ancestor_fields,
+                        item_si,
+                        item_ei,
+                        item_prefix,
+                        line_index,
+                    )
+                )
             item_si = item_ei
         for other_node in other_data:
             # See if there are any completely new processes
             proc_id = other_node["id"]
             if proc_id in seen:
                 continue
-            diff_yaml = yaml.dump([other_node], sort_keys=False)
+            diff_yaml = lib.yaml_dump([other_node], sort_keys=False)
             add_lines = [
                 DEFAULT_WHITESPACE * (len(ancestor_fields) - 1) + new_line
                 for new_line in diff_yaml.splitlines()
@@ -2275,7 +2931,11 @@ def list_diffs(
         )
         for orig_item, other_item in zip(original_data, other_data):
             item_ei = find_item_ending_index(
-                item_si, ending_index, yaml_lines, item_prefix
+                item_si,
+                ending_index,
+                yaml_lines,
+                item_prefix,
+                line_index,
             )
             if isinstance(orig_item, dict):
                 diffs.extend(
@@ -2287,6 +2947,7 @@ def list_diffs(
                         starting_index=item_si,
                         ending_index=item_ei,
                         object_prefix=item_prefix,
+                        line_index=line_index,
                     )
                 )
             else:
@@ -2294,7 +2955,9 @@ def list_diffs(
             item_si = item_ei
         if length_diff > 0:
             orig_data_len = len(original_data)
-            diff_yaml = yaml.dump(other_data[orig_data_len:], sort_keys=False)
+            diff_yaml = lib.yaml_dump(
+                other_data[orig_data_len:], sort_keys=False
+            )
             add_lines = [
                 DEFAULT_WHITESPACE * (len(ancestor_fields) - 1) + new_line
                 for new_line in diff_yaml.splitlines()
@@ -2312,7 +2975,11 @@ def list_diffs(
             other_data_len = len(other_data)
             for orig_item in original_data[other_data_len:]:
                 item_ei = find_item_ending_index(
-                    item_si, ending_index, yaml_lines, item_prefix
+                    item_si,
+                    ending_index,
+                    yaml_lines,
+                    item_prefix,
+                    line_index,
                 )
                 sub_lines = [
                     make_sub_line(o_line)
@@ -2339,7 +3006,11 @@ def list_diffs(
         other_or_blocks = other_data.copy()
         for or_block in original_data:
             item_ei = find_item_ending_index(
-                item_si, ending_index, yaml_lines, item_prefix
+                item_si,
+                ending_index,
+                yaml_lines,
+                item_prefix,
+                line_index,
             )
             found_match = False
             for i, other_block in enumerate(other_or_blocks):
@@ -2374,7 +3045,7 @@ def list_diffs(
                 )
             item_si = item_ei
         for other_block in other_or_blocks:
-            diff_yaml = yaml.dump([other_block], sort_keys=False)
+            diff_yaml = lib.yaml_dump([other_block], sort_keys=False)
             add_lines = [
                 DEFAULT_WHITESPACE * (len(ancestor_fields) - 1) + new_line
                 for new_line in diff_yaml.splitlines()
@@ -2397,7 +3068,7 @@ def list_diffs(
                 [make_add_line(yaml_lines[parent_index])],
             )
         )
-        diff_yaml: str = yaml.dump(other_data, sort_keys=False)
+        diff_yaml: str = lib.yaml_dump(other_data, sort_keys=False)
         add_lines = [
             DEFAULT_WHITESPACE * (len(ancestor_fields) - 1) + new_line
             for new_line in diff_yaml.splitlines()
@@ -2646,3 +3317,177 @@ def guardian_network_diff(original_spec, other_spec):
     )
     guardian_net_node_diff(other_egress, orig_egress, rv[lib.EGRESS_FIELD])
     return rv
+
+
+# JSON Patch (RFC 6902) diffs
+PATCH_OP_ADD = "add"
+PATCH_OP_REMOVE = "remove"
+PATCH_OP_REPLACE = "replace"
+PATCH_OP_MOVE = "move"
+
+
+def json_patch_diff(original_data: Dict, other_data: Dict) -> List[Dict]:
+    """
+    Calculate the difference between two objects as a RFC 6902 JSON
+    Patch. The patch is computed directly on the data, no yaml is
+    rendered. List items that have an id or checksum are matched by that
+    key, other lists are compared by position (or by sequence matching
+    for lists of scalars).
+
+    Args:
+        original_data (Dict): The original object.
+        other_data (Dict): The other object to compare with.
+
+    Returns:
+        List[Dict]: The patch operations that turn original_data into
+            other_data when applied in order.
+    """
+    rv = []
+    __patch_diff(original_data, other_data, "", rv)
+    return rv
+
+
+def __patch_path(path: str, key) -> str:
+    key = str(key).replace("~", "~0").replace("/", "~1")
+    return f"{path}/{key}"
+
+
+def __patch_diff(orig, other, path: str, ops: List[Dict]):
+    # Containers are always walked, == would treat 1, 1.0 and True
+    # inside them as equal
+    if isinstance(orig, dict) and isinstance(other, dict):
+        __patch_dict_diff(orig, other, path, ops)
+    elif isinstance(orig, list) and isinstance(other, list):
+        __patch_list_diff(orig, other, path, ops)
+    elif type(orig) is not type(other) or orig != other:
+        ops.append({"op": PATCH_OP_REPLACE, "path": path, "value": other})
+
+
+def __patch_dict_diff(orig: Dict, other: Dict, path: str, ops: List[Dict]):
+    for key, value in orig.items():
+        key_path = __patch_path(path, key)
+        if key not in other:
+            ops.append({"op": PATCH_OP_REMOVE, "path": key_path})
+        else:
+            __patch_diff(value, other[key], key_path, ops)
+    for key, value in other.items():
+        if key not in orig:
+            ops.append(
+                {
+                    "op": PATCH_OP_ADD,
+                    "path": __patch_path(path, key),
+                    "value": value,
+                }
+            )
+
+
+def __patch_item_key(item) -> Optional[str]:
+    if not isinstance(item, dict):
+        return None
+    if lib.ID_FIELD in item:
+        return item[lib.ID_FIELD]
+    metadata = item.get(lib.METADATA_FIELD)
+    if isinstance(metadata, dict):
+        return metadata.get(lib.CHECKSUM_FIELD)
+    return None
+
+
+def __patch_item_keys(items: List) -> Optional[List[str]]:
+    rv = []
+    for item in items:
+        key = __patch_item_key(item)
+        if key is None:
+            return None
+        rv.append(key)
+    if len(set(rv)) != len(rv):
+        return None
+    return rv
+
+
+def __patch_list_diff(orig: List, other: List, path: str, ops: List[Dict]):
+    orig_keys = __patch_item_keys(orig)
+    other_keys = __patch_item_keys(other) if orig_keys is not None else None
+    if orig_keys is not None and other_keys is not None:
+        __patch_keyed_list_diff(
+            orig, other, orig_keys, other_keys, path, ops
+        )
+    elif all(
+        item is None or isinstance(item, (str, int, float, bool))
+        for item in orig + other
+    ):
+        __patch_scalar_list_diff(orig, other, path, ops)
+    else:
+        for i, (orig_item, other_item) in enumerate(zip(orig, other)):
+            __patch_diff(orig_item, other_item, __patch_path(path, i), ops)
+        for i in range(len(orig) - 1, len(other) - 1, -1):
+            ops.append({"op": PATCH_OP_REMOVE, "path": __patch_path(path, i)})
+        for i in range(len(orig), len(other)):
+            ops.append(
+                {
+                    "op": PATCH_OP_ADD,
+                    "path": __patch_path(path, i),
+                    "value": other[i],
+                }
+            )
+
+
+def __patch_keyed_list_diff(
+    orig: List[Dict],
+    other: List[Dict],
+    orig_keys: List[str],
+    other_keys: List[str],
+    path: str,
+    ops: List[Dict],
+):
+    orig_items = dict(zip(orig_keys, orig))
+    other_key_set = set(other_keys)
+    # Remove from the back so earlier indexes stay valid
+    for i in range(len(orig_keys) - 1, -1, -1):
+        if orig_keys[i] not in other_key_set:
+            ops.append({"op": PATCH_OP_REMOVE, "path": __patch_path(path, i)})
+    current = [key for key in orig_keys if key in other_key_set]
+    for i, key in enumerate(other_keys):
+        item_path = __patch_path(path, i)
+        if key not in orig_items:
+            ops.append(
+                {"op": PATCH_OP_ADD, "path": item_path, "value": other[i]}
+            )
+            current.insert(i, key)
+            continue
+        if current[i] != key:
+            from_index = current.index(key, i)
+            ops.append(
+                {
+                    "op": PATCH_OP_MOVE,
+                    "from": __patch_path(path, from_index),
+                    "path": item_path,
+                }
+            )
+            current.insert(i, current.pop(from_index))
+        __patch_diff(orig_items[key], other[i], item_path, ops)
+
+
+def __patch_scalar_list_diff(
+    orig: List, other: List, path: str, ops: List[Dict]
+):
+    # Typed so that 1, 1.0 and True don't match each other
+    matcher = SequenceMatcher(
+        None,
+        [(type(item), item) for item in orig],
+        [(type(item), item) for item in other],
+        autojunk=False,
+    )
+    # Work from the back so earlier indexes stay valid
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == "equal":
+            continue
+        for i in range(i2 - 1, i1 - 1, -1):
+            ops.append({"op": PATCH_OP_REMOVE, "path": __patch_path(path, i)})
+        for offset, j in enumerate(range(j1, j2)):
+            ops.append(
+                {
+                    "op": PATCH_OP_ADD,
+                    "path": __patch_path(path, i1 + offset),
+                    "value": other[j],
+                }
+            )
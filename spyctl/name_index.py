@@ -0,0 +1,138 @@
+"""A local index of resource names for shell completion.
+
+Completing a policy, cluster or machine name would otherwise need api
+calls. Instead `spyctl get` records the names and uids it lists, per
+context, in ~/.spyctl/.completion_index and completion answers from that
+file. Context and apisecret names are completed from the config files,
+see configs.load_config.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import click
+from click.shell_completion import CompletionItem
+
+import spyctl.config.configs as cfgs
+import spyctl.spyctl_lib as lib
+
+INDEX_FILENAME = ".completion_index"
+# Names kept per resource and context
+MAX_NAMES = 5000
+
+# Indexed resources, and the fields of their records that are indexed
+CLUSTERS = "clusters"
+MACHINES = "machines"
+POLICIES = "policies"
+INDEXED_FIELDS = {
+    CLUSTERS: [lib.NAME_FIELD, lib.METADATA_UID_FIELD],
+    MACHINES: [lib.HOSTNAME_FIELD, lib.ID_FIELD],
+    POLICIES: [
+        [lib.METADATA_FIELD, lib.METADATA_NAME_FIELD],
+        [lib.METADATA_FIELD, lib.METADATA_UID_FIELD],
+    ],
+}
+RESOURCE_KINDS = [
+    (lib.CLUSTERS_RESOURCE, CLUSTERS),
+    (lib.MACHINES_RESOURCE, MACHINES),
+    (lib.POLICIES_RESOURCE, POLICIES),
+]
+
+
+def index_path() -> Path:
+    return Path.joinpath(cfgs.GLOBAL_CONFIG_DIR, INDEX_FILENAME)
+
+
+def load_index() -> Dict[str, Dict[str, List[str]]]:
+    """context name -> {resource kind -> names}"""
+    try:
+        with index_path().open() as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def get_names(kind: str, context: str) -> List[str]:
+    names = load_index().get(context, {}).get(kind)
+    return names if isinstance(names, list) else []
+
+
+def set_names(kind: str, context: str, records: Iterable[Dict]):
+    """Replaces the indexed names of a resource with those of records,
+    a complete listing of the resource in the context."""
+    __store(kind, context, [n for rec in records for n in __names(kind, rec)])
+
+
+def collect(kind: str, context: str, records: Iterable[Dict]) -> Iterator:
+    """Passes records through, like set_names once all of them have been
+    consumed."""
+    names = []
+    for record in records:
+        names.extend(__names(kind, record))
+        yield record
+    __store(kind, context, names)
+
+
+def complete_name_or_id(
+    ctx: click.Context, param: click.Parameter, incomplete: str
+) -> List[CompletionItem]:
+    """shell_complete for the name_or_id argument of commands that also
+    take a resource argument."""
+    kind = __resource_kind(ctx.params.get("resource"))
+    if kind is None:
+        return []
+    cfgs.load_config(silent=True)
+    config = cfgs.get_loaded_config()
+    if not config or not config.current_context:
+        return []
+    return [
+        CompletionItem(name)
+        for name in get_names(kind, config.current_context)
+        if name.startswith(incomplete)
+    ]
+
+
+def __resource_kind(resource: Optional[str]) -> Optional[str]:
+    if not resource:
+        return None
+    for aliases, kind in RESOURCE_KINDS:
+        if aliases == resource:
+            return kind
+    return None
+
+
+def __names(kind: str, record: Dict) -> List[str]:
+    rv = []
+    for field in INDEXED_FIELDS[kind]:
+        value = record
+        for key in [field] if isinstance(field, str) else field:
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, str) and value:
+            rv.append(value)
+    return rv
+
+
+def __store(kind: str, context: str, names: List[str]):
+    names = sorted(set(names))[:MAX_NAMES]
+    index = load_index()
+    entries = index.setdefault(context, {})
+    if entries.get(kind) == names:
+        return
+    entries[kind] = names
+    __write_index(index)
+
+
+def __write_index(index: Dict):
+    # Written to a temporary file first so concurrent runs never read a
+    # partial index
+    path = index_path()
+    tmp_path = Path(f"{path}.{os.getpid()}")
+    try:
+        with tmp_path.open("w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
@@ -1,5 +1,6 @@
 from typing import List, Tuple, Dict
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
 from tabulate import tabulate
 import spyctl.spyctl_lib as lib
@@ -13,11 +14,18 @@ def clusterrole_output_summary(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
 ) -> str:
-    data = []
-    for clusterrole in api.get_clusterrole(
+    clusterroles = api.get_clusterrole(
         *ctx.get_api_data(), clusters, time, pipeline, limit_mem
-    ):
+    )
+    if stream:
+        cli.show_table_stream(
+            map(clusterrole_summary_data, clusterroles), SUMMARY_HEADERS
+        )
+        return ""
+    data = []
+    for clusterrole in clusterroles:
         data.append(clusterrole_summary_data(clusterrole))
     rv = tabulate(
         sorted(data, key=lambda x: [x[0], x[3]]),
@@ -1,5 +1,6 @@
 from typing import List, Tuple, Dict
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
 from tabulate import tabulate
 import spyctl.spyctl_lib as lib
@@ -20,11 +21,18 @@ def clusterrolebinding_output_summary(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
 ) -> str:
-    data = []
-    for crb in api.get_clusterrolebinding(
+    crbs = api.get_clusterrolebinding(
         *ctx.get_api_data(), clusters, time, pipeline, limit_mem
-    ):
+    )
+    if stream:
+        cli.show_table_stream(
+            map(clusterrolebinding_summary_data, crbs), SUMMARY_HEADERS
+        )
+        return ""
+    data = []
+    for crb in crbs:
         data.append(clusterrolebinding_summary_data(crb))
     rv = tabulate(
         sorted(data, key=lambda x: [x[0], x[4]]),
@@ -1,14 +1,21 @@
+import functools
 import ipaddress
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple, Union
 
 import zulu
 from tabulate import tabulate
 
 import spyctl.config.configs as cfg
+import spyctl.group_by as grp
 import spyctl.spyctl_lib as lib
 import spyctl.api as api
 
 NOT_AVAILABLE = lib.NOT_AVAILABLE
+IP_CACHE_SIZE = 65536
+# Octets in the order their decimal strings sort, and each octet's rank
+RANKED_OCTETS = sorted(range(256), key=str)
+OCTET_RANKS = [RANKED_OCTETS.index(octet) for octet in range(256)]
+IPV6_ORDER = 1 << 128
 
 SUMMARY_HEADERS = [
     "DESTINATION_IP",
@@ -20,52 +27,60 @@ SUMMARY_HEADERS = [
 ]
 
 
-class ConnectionGroup:
-    def __init__(self) -> None:
-        self.ref_conn = None
-        self.latest_timestamp = NOT_AVAILABLE
-        self.count = 0
-        self.ip = None
-
-    def add_conn(self, conn: Dict):
-        self.__update_latest_timestamp(conn.get("time"))
-        if self.ref_conn is None:
-            self.ref_conn = conn
-        self.count += 1
-        ip = ipaddress.ip_address(conn["remote_ip"])
-        if self.ip is None:
-            self.ip = ip.exploded
-        else:
-            self.ip = _loose_abbrev_ips(self.ip, ip.exploded)
-
-    def __update_latest_timestamp(self, timestamp):
-        if timestamp is None:
-            return
-        if self.latest_timestamp == NOT_AVAILABLE:
-            self.latest_timestamp = timestamp
-        elif timestamp > self.latest_timestamp:
-            self.latest_timestamp = timestamp
-
-    def summary_data(self, ignore_ips) -> List[str]:
-        timestamp = NOT_AVAILABLE
-        if self.latest_timestamp != NOT_AVAILABLE:
-            timestamp = str(
-                zulu.Zulu.fromtimestamp(self.latest_timestamp).format(
-                    "YYYY-MM-ddTHH:mm:ss"
-                )
+def group_connections(
+    connections: Iterable[Dict],
+    ignore_ips=False,
+    top: int = None,
+    top_by=grp.TOP_BY_COUNT,
+) -> Union[grp.GroupBy, grp.TopK]:
+    aggregates = dict(
+        ref_conn=(grp.FIRST, None),
+        latest_timestamp=(grp.MAX, "time"),
+        count=(grp.COUNT, None),
+    )
+    if not ignore_ips:
+        # The group's IPs share the prefix common to the lowest and highest
+        aggregates.update(
+            low_ip=(grp.MIN, _ip_order),
+            high_ip=(grp.MAX, _ip_order),
+        )
+    return grp.group(
+        connections,
+        lambda conn: _key(conn, ignore_ips),
+        top,
+        top_by,
+        latest="time",
+        **aggregates,
+    )
+
+
+def connection_group_summary_data(
+    group: Dict, ignore_ips, error: int = 0
+) -> List[str]:
+    timestamp = NOT_AVAILABLE
+    if group["latest_timestamp"] is not None:
+        timestamp = str(
+            zulu.Zulu.fromtimestamp(group["latest_timestamp"]).format(
+                "YYYY-MM-ddTHH:mm:ss"
             )
-        rv = [
-            # self.ref_conn["remote_ip"],
-            # self.ref_conn["remote_port"],
-            _shorten_v6(self.ip),
-            self.ref_conn["direction"],
-            self.ref_conn["proc_name"],
-            str(self.count),
-            timestamp,
-        ]
-        if ignore_ips:
-            rv = rv[1:]
-        return rv
+        )
+    ref_conn = group["ref_conn"]
+    rv = [
+        # ref_conn["remote_ip"],
+        # ref_conn["remote_port"],
+        None,
+        ref_conn["direction"],
+        ref_conn["proc_name"],
+        grp.count_range(group["count"], error),
+        timestamp,
+    ]
+    if ignore_ips:
+        rv = rv[1:]
+    else:
+        rv[0] = _shorten_v6(
+            _abbrev_ip_range(group["low_ip"], group["high_ip"])
+        )
+    return rv
 
 
 def conn_summary_output(
@@ -75,29 +90,36 @@ def conn_summary_output(
     ignore_ips=False,
     pipeline=None,
     limit_mem=False,
+    top: int = None,
+    top_by=grp.TOP_BY_COUNT,
 ) -> str:
-    groups: Dict[str, ConnectionGroup] = {}
-    for conn in api.get_connections(
-        *ctx.get_api_data(),
-        muids,
-        time,
-        limit_mem=limit_mem,
-        pipeline=pipeline,
-    ):
-        key = _key(conn, ignore_ips)
-        if key not in groups:
-            groups[key] = ConnectionGroup()
-        groups[key].add_conn(conn)
-    data = []
-    for group in groups.values():
-        data.append(group.summary_data(ignore_ips))
-    sort_key = (
-        (lambda x: [x[0], x[1]])
-        if ignore_ips
-        else (lambda x: [x[1], x[0], x[2]])
+    groups = group_connections(
+        api.get_connections(
+            *ctx.get_api_data(),
+            muids,
+            time,
+            limit_mem=limit_mem,
+            pipeline=pipeline,
+        ),
+        ignore_ips,
+        top,
+        top_by,
     )
+    data = []
+    for key, group in groups.items():
+        data.append(
+            connection_group_summary_data(group, ignore_ips, groups.error(key))
+        )
+    if not top:
+        data.sort(
+            key=(
+                (lambda x: [x[0], x[1]])
+                if ignore_ips
+                else (lambda x: [x[1], x[0], x[2]])
+            )
+        )
     output = tabulate(
-        sorted(data, key=sort_key),
+        data,
         headers=SUMMARY_HEADERS,
         tablefmt="plain",
     )
@@ -110,24 +132,68 @@ def _key(connection: Dict, ignore_ips):
             connection["direction"],
             connection["proc_name"],
         )
-    ip = ipaddress.ip_address(connection["remote_ip"])
-    # just like the unnecessary complexity of this summary
-    ip_str = ip.exploded
-    found = 0
-    for i, char in enumerate(ip_str):
-        if not char.isdigit():
-            found += 1
-            if found == 2:
-                ip_str = ip_str[: i + 1]
-                break
+    version, prefix, _ = _packed_ip(connection["remote_ip"])
     return (
-        ip.version,
-        ip_str,
+        version,
+        prefix,
         connection["direction"],
         connection["proc_name"],
     )
 
 
+def _ip_order(connection: Dict) -> int:
+    return _packed_ip(connection["remote_ip"])[2]
+
+
+@functools.lru_cache(maxsize=IP_CACHE_SIZE)
+def _packed_ip(ip_str: str) -> Tuple[int, Tuple[int, int], int]:
+    """Packs an ip address into (version, prefix, order key) integers.
+
+    The prefix is the bucket the summary groups ips by: for ipv4 the
+    first two octets, for ipv6 the exploded form up to its second
+    non-digit character, as (nibbles, leading bits). The order key sorts
+    ips of the same version the way their exploded strings sort, so the
+    lowest and highest keys of a group bound its common prefix.
+    """
+    ip = ipaddress.ip_address(ip_str)
+    packed = int(ip)
+    if ip.version == 4:
+        order = 0
+        for octet in packed.to_bytes(4, "big"):
+            order = order << 8 | OCTET_RANKS[octet]
+        return 4, (2, packed >> 16), order
+    # Nibbles in the prefix, the exploded form has a ':' every 4 nibbles
+    found = 0
+    nibbles = 0
+    while found < 2:
+        if (packed >> (124 - 4 * nibbles)) & 0xF > 9:
+            found += 1
+        nibbles += 1
+        if found < 2 and nibbles % 4 == 0:
+            found += 1
+    return 6, (nibbles, packed >> (128 - 4 * nibbles)), IPV6_ORDER | packed
+
+
+def _abbrev_ip_range(low: int, high: int) -> str:
+    """Renders the ips between two order keys the way folding
+    _loose_abbrev_ips over their exploded strings would."""
+    if not low & IPV6_ORDER:
+        return _loose_abbrev_ips(_ipv4_from_order(low), _ipv4_from_order(high))
+    exploded = ipaddress.IPv6Address(low & ~IPV6_ORDER).exploded
+    diff = low ^ high
+    if not diff:
+        return exploded
+    # The first differing nibble, from the xor's leading zeros
+    nibble = (128 - diff.bit_length()) // 4
+    return exploded[: nibble + nibble // 4] + "*"
+
+
+def _ipv4_from_order(order: int) -> str:
+    return ".".join(
+        str(RANKED_OCTETS[rank]) for rank in order.to_bytes(4, "big")
+    )
+
+
 def _loose_abbrev_ips(ip1, ip2):
     if ip1 == ip2:
         return ip1
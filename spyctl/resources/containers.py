@@ -1,9 +1,10 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 from tabulate import tabulate
 
 import spyctl.api as api
 import spyctl.config.configs as cfg
+import spyctl.group_by as grp
 import spyctl.spyctl_lib as lib
 
 SUMMARY_HEADERS = [
@@ -16,42 +17,31 @@ SUMMARY_HEADERS = [
 ]
 
 
-class ContainerGroup:
-    def __init__(self) -> None:
-        self.latest_timestamp = lib.NOT_AVAILABLE
-        self.count = 0
-        self.image = None
-        self.image_id = None
-        self.namespace = None
-        self.cluster = None
+def group_containers(containers: Iterable[Dict]) -> grp.GroupBy:
+    return grp.GroupBy(
+        __key,
+        ref_cont=(grp.FIRST, None),
+        latest_timestamp=(grp.MAX, "time"),
+        count=(grp.COUNT, None),
+    ).update(containers)
 
-    def add_container(self, cont: Dict):
-        self.__update_latest_timestamp(cont.get("time"))
-        self.count += 1
-        if not self.image:
-            self.image = cont["image"]
-            self.image_id = cont["image_id"]
-            self.namespace = cont.get("pod_namespace")
-            self.cluster = cont.get("clustername") or cont.get("cluster_uid")
 
-    def summary_data(self) -> List[str]:
-        rv = [
-            self.image,
-            self.image_id,
-            lib.epoch_to_zulu(self.latest_timestamp),
-            self.count,
-            self.namespace or lib.NOT_AVAILABLE,
-            self.cluster or lib.NOT_AVAILABLE,
-        ]
-        return rv
-
-    def __update_latest_timestamp(self, timestamp):
-        if timestamp is None:
-            return
-        if self.latest_timestamp == lib.NOT_AVAILABLE:
-            self.latest_timestamp = timestamp
-        elif timestamp > self.latest_timestamp:
-            self.latest_timestamp = timestamp
+def cont_group_summary_data(group: Dict) -> List[str]:
+    ref_cont = group["ref_cont"]
+    latest_timestamp = group["latest_timestamp"]
+    if latest_timestamp is None:
+        latest_timestamp = lib.NOT_AVAILABLE
+    rv = [
+        ref_cont["image"],
+        ref_cont["image_id"],
+        lib.epoch_to_zulu(latest_timestamp),
+        group["count"],
+        ref_cont.get("pod_namespace") or lib.NOT_AVAILABLE,
+        ref_cont.get("clustername")
+        or ref_cont.get("cluster_uid")
+        or lib.NOT_AVAILABLE,
+    ]
+    return rv
 
 
 def cont_summary_output(
@@ -61,21 +51,18 @@ def cont_summary_output(
     pipeline=None,
     limit_mem=False,
 ):
-    cont_groups: Dict[str, ContainerGroup] = {}
-    for container in api.get_containers(
-        *ctx.get_api_data(),
-        muids,
-        time,
-        pipeline=pipeline,
-        limit_mem=limit_mem,
-    ):
-        key = __key(container)
-        if key not in cont_groups:
-            cont_groups[key] = ContainerGroup()
-        cont_groups[key].add_container(container)
+    groups = group_containers(
+        api.get_containers(
+            *ctx.get_api_data(),
+            muids,
+            time,
+            pipeline=pipeline,
+            limit_mem=limit_mem,
+        )
+    )
     data = []
-    for group in cont_groups.values():
-        data.append(group.summary_data())
+    for _, group in groups.items():
+        data.append(cont_group_summary_data(group))
     data.sort(key=lambda x: (x[5], x[0], x[1], x[4]))
     rv = tabulate(
         data,
@@ -1,5 +1,6 @@
 from typing import List, Tuple, Dict
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
 import spyctl.spyctl_lib as lib
 from tabulate import tabulate
@@ -23,11 +24,19 @@ def daemonsets_output_summary(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
 ) -> str:
-    data = []
-    for daemonset in api.get_daemonsets(
+    daemonsets = api.get_daemonsets(
         *ctx.get_api_data(), clusters, time, pipeline, limit_mem
-    ):
+    )
+    if stream:
+        print("\n" "D/C/R = desired/current/ready pod replicas" "\n")
+        cli.show_table_stream(
+            map(daemonsets_summary_data, daemonsets), SUMMARY_HEADERS
+        )
+        return ""
+    data = []
+    for daemonset in daemonsets:
         data.append(daemonsets_summary_data(daemonset))
     rv = tabulate(
         sorted(data, key=lambda x: [x[5]]),
@@ -3,6 +3,7 @@ from typing import Dict, List, Tuple
 from tabulate import tabulate
 
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
 import spyctl.spyctl_lib as lib
 
@@ -42,15 +43,22 @@ def deployments_stream_summary_output(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
 ) -> str:
-    data = []
-    for deployment in api.get_deployments(
+    deployments = api.get_deployments(
         *ctx.get_api_data(),
         clusters,
         time,
         limit_mem=limit_mem,
         pipeline=pipeline,
-    ):
+    )
+    if stream:
+        cli.show_table_stream(
+            map(deployment_summary_data, deployments), SUMMARY_HEADERS
+        )
+        return ""
+    data = []
+    for deployment in deployments:
         data.append(deployment_summary_data(deployment))
     rv = tabulate(
         sorted(data, key=lambda x: [x[6], x[0]]),
@@ -1,10 +1,14 @@
-from typing import Dict, List
+from pathlib import Path
+from typing import Dict, List, Optional
 
 import spyctl.api as api
 import spyctl.config.configs as cfg
+import spyctl.merge_lib as m_lib
 import spyctl.resources.api_filters as _af
 import spyctl.spyctl_lib as lib
 
+RELEVANCE_CACHE = Path.joinpath(cfg.GLOBAL_CONFIG_DIR, ".relevance_cache")
+
 
 def get_unique_deviations(uid, st, et, full_rec=False) -> List[Dict]:
     pipeline = _af.Deviations.generate_pipeline()
@@ -35,17 +39,14 @@ def get_deviations_stream(
     raw_data=False,
     include_irrelevant=False,
     policies={},
+    relevance_cache=False,
 ):
-    import spyctl.commands.merge as merge
-
     policy_uids = {
-        policy[lib.METADATA_FIELD].get(
-            lib.METADATA_UID_FIELD
-        ): merge.get_merge_object(
-            lib.POL_KIND, policy, True, "check_deviations"
-        )
+        policy[lib.METADATA_FIELD].get(lib.METADATA_UID_FIELD): policy
         for policy in policies
-    }  # policy uid -> merge object
+    }  # policy uid -> policy
+    merge_objects = {}  # policy uid -> merge object, built on first use
+    memo = m_lib.MergeMemo(RELEVANCE_CACHE) if relevance_cache else None
     emit_processed = {}  # tracks if we should emit a deviation
     unique_deviations = {}  # For unique deviations (not raw)
     dev_list = []  # For all deviations (not raw)
@@ -72,11 +73,8 @@ def get_deviations_stream(
         elif unique:
             # We want only unique relevant deviations
             if key not in emit_processed:
-                m_obj = policy_uids[pol_uid]
-                m_obj.asymmetric_merge(
-                    deviation[lib.DEVIATION_FIELD], check_irrelevant=True
-                )
-                if m_obj.is_relevant_obj(lib.DEVIATION_KIND, checksum):
+                m_obj = __get_merge_object(merge_objects, policy_uids, pol_uid)
+                if __is_relevant(m_obj, deviation, checksum, memo):
                     emit_processed[key] = True
                     unique_deviations[key] = deviation
                 else:
@@ -90,20 +88,19 @@ def get_deviations_stream(
         else:
             # We want all relevant deviations
             if key not in emit_processed:
-                m_obj = policy_uids[pol_uid]
-                m_obj.asymmetric_merge(
-                    deviation[lib.DEVIATION_FIELD], check_irrelevant=True
+                m_obj = __get_merge_object(merge_objects, policy_uids, pol_uid)
+                emit_processed[key] = __is_relevant(
+                    m_obj, deviation, checksum, memo
                 )
-                if m_obj.is_relevant_obj(lib.DEVIATION_KIND, checksum):
-                    emit_processed[key] = True
-                else:
-                    emit_processed[key] = False
             if emit_processed[key]:
                 if raw_data:
                     yield deviation
                 else:
                     dev_list.append(deviation)
 
+    if memo is not None:
+        memo.save()
+
     # If we got to this point we want unique relevant deviations
     # or all deviations in a format suitable for merging/diffing
     if unique and unique_deviations:
@@ -116,6 +113,42 @@ def get_deviations_stream(
         yield __build_items_output(dev_list)
 
 
+def __get_merge_object(merge_objects: Dict, policy_uids: Dict, pol_uid: str):
+    """Only build merge objects for policies that actually receive
+    deviations, most policies in an org will not need one."""
+    import spyctl.commands.merge as merge
+
+    m_obj = merge_objects.get(pol_uid)
+    if m_obj is None:
+        m_obj = merge.get_merge_object(
+            lib.POL_KIND, policy_uids[pol_uid], True, "check_deviations"
+        )
+        merge_objects[pol_uid] = m_obj
+    return m_obj
+
+
+def __is_relevant(
+    m_obj: m_lib.MergeObject,
+    deviation: Dict,
+    checksum: str,
+    memo: Optional[m_lib.MergeMemo],
+) -> bool:
+    """Merges the deviation into the policy and checks if it changed
+    anything. Deviations already known to be irrelevant to the current
+    spec are skipped without merging."""
+    if memo is not None:
+        spec_checksum = m_obj.spec_checksum
+        if memo.get(spec_checksum, checksum) is False:
+            return False
+    m_obj.asymmetric_merge(
+        deviation[lib.DEVIATION_FIELD], check_irrelevant=True
+    )
+    relevant = m_obj.is_relevant_obj(lib.DEVIATION_KIND, checksum)
+    if memo is not None:
+        memo.set(spec_checksum, checksum, relevant)
+    return relevant
+
+
 def __set_checksum(deviation: Dict) -> Dict:
     deviation[lib.DEVIATION_FIELD][lib.METADATA_FIELD][lib.CHECKSUM_FIELD] = (
         deviation.get(lib.CHECKSUM_FIELD)
@@ -8,6 +8,7 @@ import spyctl.cli as cli
 import spyctl.spyctl_lib as lib
 import spyctl.merge_lib as m_lib
 import spyctl.filter_resource as filt
+import spyctl.group_by as grp
 from dataclasses import dataclass, field
 import spyctl.config.configs as cfg
 import spyctl.api as api
@@ -472,39 +473,41 @@ def __cont_fprint_summary(
                 f"Invalid sort by field: {col}. Options are: \n\t"
                 f"{avail_headers}"
             )
+    groups = grp.GroupBy(
+        lambda fprint: (
+            ContainerSumData.extract_image_name_and_tag(
+                fprint[lib.IMAGE_FIELD]
+            ),
+            fprint["image_id"],
+            *[filt.get_field_value(f, fprint) for f in group_by],
+        ),
+        ref_fprint=(grp.FIRST, None),
+        latest_timestamp=(grp.MAX, "time"),
+        covered_count=(grp.SUM, __covered),
+        count=(grp.COUNT, None),
+        images=(grp.DISTINCT, lib.IMAGE_FIELD),
+    ).update(
+        fprint
+        for fprint in fingerprints
+        if fprint[lib.METADATA_FIELD][lib.METADATA_TYPE_FIELD]
+        == FPRINT_TYPE_CONT
+    )
     container_data: Dict[Tuple, ContainerSumData] = {}
-    for fprint in fingerprints:
-        image_name_and_tag = ContainerSumData.extract_image_name_and_tag(
-            fprint[lib.IMAGE_FIELD]
+    for key, group in groups.items():
+        ref_fprint = group["ref_fprint"]
+        container_data[key] = ContainerSumData(
+            key[0],
+            ref_fprint["image_id"],
+            group["latest_timestamp"],
+            group["covered_count"],
+            group["count"],
+            additional_fields={
+                field: filt.get_field_value(field, ref_fprint)
+                for field in group_by
+            },
         )
-        image_id = fprint["image_id"]
-        key = [image_name_and_tag, image_id]
-        for f in group_by:
-            key.append(filt.get_field_value(f, fprint))
-        key = tuple(key)
-        if (
-            fprint[lib.METADATA_FIELD][lib.METADATA_TYPE_FIELD]
-            == FPRINT_TYPE_CONT
-        ):
-            if key not in container_data:
-                container_data[key] = ContainerSumData(
-                    image_name_and_tag,
-                    fprint["image_id"],
-                    fprint["time"],
-                    1 if fprint.get("covered_by_policy") else 0,
-                    1,
-                    additional_fields={
-                        field: filt.get_field_value(field, fprint)
-                        for field in group_by
-                    },
-                )
-                container_data[key].update_image(fprint[lib.IMAGE_FIELD])
-            else:
-                container_data[key].update_image(fprint[lib.IMAGE_FIELD])
-                container_data[key].update_latest_timestamp(fprint["time"])
-                container_data[key].count += 1
-                if fprint.get("covered_by_policy"):
-                    container_data[key].covered_count += 1
+        for image in group["images"]:
+            container_data[key].update_image(image)
     if wide:
         row_data = [data.get_wide_data() for data in container_data.values()]
     else:
@@ -556,27 +559,29 @@ def __svc_fprint_summary(
                 f"{avail_headers}"
             )
 
-    service_data: Dict[Tuple, ServiceSumData] = {}
-
     grp_by_fields = [lib.CGROUP_FIELD] + group_by
-    for fprint in fingerprints:
-        key = tuple([filt.get_field_value(f, fprint) for f in grp_by_fields])
-        if key not in service_data:
-            service_data[key] = ServiceSumData(
-                fprint[lib.CGROUP_FIELD],
-                fprint["time"],
-                1 if fprint.get("covered_by_policy") else 0,
-                1,
-                {
-                    field: filt.get_field_value(field, fprint)
-                    for field in group_by
-                },
-            )
-        else:
-            service_data[key].update_latest_timestamp(fprint["time"])
-            service_data[key].count += 1
-            if fprint.get("covered_by_policy"):
-                service_data[key].covered_count += 1
+    groups = grp.GroupBy(
+        lambda fprint: tuple(
+            [filt.get_field_value(f, fprint) for f in grp_by_fields]
+        ),
+        ref_fprint=(grp.FIRST, None),
+        latest_timestamp=(grp.MAX, "time"),
+        covered_count=(grp.SUM, __covered),
+        count=(grp.COUNT, None),
+    ).update(fingerprints)
+    service_data: Dict[Tuple, ServiceSumData] = {}
+    for key, group in groups.items():
+        ref_fprint = group["ref_fprint"]
+        service_data[key] = ServiceSumData(
+            ref_fprint[lib.CGROUP_FIELD],
+            group["latest_timestamp"],
+            group["covered_count"],
+            group["count"],
+            {
+                field: filt.get_field_value(field, ref_fprint)
+                for field in group_by
+            },
+        )
 
     if wide:
         row_data = [data.get_wide_data() for data in service_data.values()]
@@ -598,6 +603,10 @@ def __svc_fprint_summary(
     return service_tbl
 
 
+def __covered(fprint: Dict) -> int:
+    return 1 if fprint.get("covered_by_policy") else 0
+
+
 def fprint_grp_output_wide(
     fingerprint_groups: Tuple,
     coverage=False,
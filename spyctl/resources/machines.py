@@ -3,7 +3,9 @@ from typing import Dict, List, Tuple
 from tabulate import tabulate
 
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
+import spyctl.name_index as names
 import spyctl.spyctl_lib as lib
 
 SUMMARY_HEADERS = ["NAME", "UID", "OS", "CLOUD_TYPE", "AGE", "CLUSTER"]
@@ -15,11 +17,21 @@ def machines_summary_output(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
+    index_names=False,
 ) -> str:
-    data = []
-    for machine in api.get_machines(
+    machines = api.get_machines(
         *ctx.get_api_data(), muids, time, pipeline, limit_mem
-    ):
+    )
+    if index_names:
+        machines = names.collect(names.MACHINES, ctx.name, machines)
+    if stream:
+        cli.show_table_stream(
+            map(__machine_summary_data, machines), SUMMARY_HEADERS
+        )
+        return ""
+    data = []
+    for machine in machines:
         data.append(__machine_summary_data(machine))
     data.sort(key=lambda x: [x[0], lib.to_timestamp(x[3])])
     return tabulate(data, SUMMARY_HEADERS, tablefmt="plain")
@@ -5,6 +5,7 @@ from tabulate import tabulate
 import spyctl.config.configs as cfg
 import spyctl.spyctl_lib as lib
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.resources.api_filters as _af
 import spyctl.filter_resource as filt
 
@@ -17,17 +18,21 @@ def namespace_summary_output(
     clusters: List[str],
     time: Tuple[float, float],
     pipeline=None,
+    stream=False,
 ) -> str:
-    data = []
     field_names = _af.Namespaces.get_name_or_uid_fields()
-    for namespace in api.get_namespaces(
+    namespaces = api.get_namespaces(
         *ctx.get_api_data(), clusters, time, pipeline
-    ):
-        ns = [namespace]
-        if name_or_uid:
-            ns = filt.filter_obj(ns, field_names, name_or_uid)
-        if ns:
-            data.append(__namespace_data(namespace))
+    )
+    if name_or_uid:
+        match = filt.compile_filter_obj(field_names, name_or_uid)
+        namespaces = filter(match, namespaces)
+    if stream:
+        cli.show_table_stream(
+            map(__namespace_data, namespaces), SUMMARY_HEADERS
+        )
+        return ""
+    data = [__namespace_data(namespace) for namespace in namespaces]
     data.sort(key=lambda x: (x[3], x[0]))
     return tabulate(
         data,
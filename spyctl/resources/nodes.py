@@ -3,6 +3,7 @@ from typing import Dict, List, Tuple
 from tabulate import tabulate
 
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
 import spyctl.spyctl_lib as lib
 
@@ -22,11 +23,16 @@ def nodes_output_summary(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
 ) -> str:
-    data = []
-    for node in api.get_nodes(
+    nodes = api.get_nodes(
         *ctx.get_api_data(), clusters, time, pipeline, limit_mem
-    ):
+    )
+    if stream:
+        cli.show_table_stream(map(__node_summary_data, nodes), SUMMARY_HEADERS)
+        return ""
+    data = []
+    for node in nodes:
         data.append(__node_summary_data(node))
     rv = tabulate(
         sorted(data, key=lambda x: [x[4], x[1], x[2], x[0]]),
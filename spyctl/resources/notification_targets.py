@@ -3,7 +3,6 @@ from copy import deepcopy
 from dataclasses import dataclass
 from typing import Dict, Optional
 
-import yaml
 from tabulate import tabulate
 
 import spyctl.api as api
@@ -260,7 +259,7 @@ class NotificationTarget:
 
     @property
     def dst_yaml(self):
-        return yaml.dump(self.tgt_data)
+        return lib.yaml_dump(self.tgt_data)
 
 
 def targets_summary_output(targets: Dict):
@@ -3,6 +3,7 @@ from typing import Dict, List, Tuple
 from tabulate import tabulate
 
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
 import spyctl.spyctl_lib as lib
 
@@ -24,11 +25,16 @@ def pods_output_summary(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
 ) -> str:
-    data = []
-    for pod in api.get_pods(
+    pods = api.get_pods(
         *ctx.get_api_data(), clusters, time, pipeline, limit_mem
-    ):
+    )
+    if stream:
+        cli.show_table_stream(map(__pod_summary_data, pods), SUMMARY_HEADERs)
+        return ""
+    data = []
+    for pod in pods:
         data.append(__pod_summary_data(pod))
     output = tabulate(
         sorted(data, key=lambda x: [x[7], x[6], x[0]]),
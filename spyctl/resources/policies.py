@@ -232,14 +232,10 @@ def matching_fingerprints_summary(
             limit_mem=limit_mem,
         )
     )
+    fprint_index = filt.FingerprintIndex(fingerprints)
     for policy in policies:
         filters = lib.selectors_to_filters(policy)
-        if filt.filter_fingerprints(
-            fingerprints,
-            use_context_filters=False,
-            suppress_warning=True,
-            **filters,
-        ):
+        if fprint_index.matching(**filters):
             has_matching.append(policy)
         else:
             no_matching.append(policy)
@@ -273,6 +269,7 @@ def policies_summary_output(
     dev_name_or_uid=None,
     dev_filters={},
     include_irrelevant=False,
+    relevance_cache=False,
 ):
     output_list = []
     if get_deviations_count:
@@ -296,6 +293,7 @@ def policies_summary_output(
             dev_name_or_uid,
             dev_filters=dev_filters,
             include_irrelevant=include_irrelevant,
+            relevance_cache=relevance_cache,
         )
     for policy in policies:
         data.append(
@@ -379,8 +377,8 @@ def get_deviation_counts(
     dev_name_or_uid=None,
     dev_filters={},
     include_irrelevant=False,
+    relevance_cache=False,
 ) -> Dict:
-    import spyctl.commands.merge as merge
     import spyctl.resources.deviations as spyctl_dev
 
     if not suppress_msg:
@@ -390,14 +388,10 @@ def get_deviation_counts(
         )
     rv: Dict[str, List[Set, int]] = {}
     ctx = cfg.get_current_context()
-    policy_uids = {
-        policy[lib.METADATA_FIELD].get(
-            lib.METADATA_UID_FIELD
-        ): merge.get_merge_object(
-            lib.POL_KIND, policy, True, "check_deviations"
-        )
+    policy_uids = [
+        policy[lib.METADATA_FIELD].get(lib.METADATA_UID_FIELD)
         for policy in policies
-    }  # policy uid -> merge object
+    ]
     # checksum_filters: List[Tuple[str, str]] = []
     # if not include_irrelevant:
     #     # Here we retrieve unique deviations for each policy
@@ -410,7 +404,7 @@ def get_deviation_counts(
     )
     for deviation in spyctl_dev.get_deviations_stream(
         ctx,
-        list(policy_uids),
+        policy_uids,
         time,
         pipeline,
         True,
@@ -418,6 +412,7 @@ def get_deviation_counts(
         raw_data=True,
         policies=policies,
         include_irrelevant=include_irrelevant,
+        relevance_cache=relevance_cache,
     ):
         checksum = deviation[lib.CHECKSUM_FIELD]
         pol_uid = deviation["policy_uid"]
@@ -1,10 +1,11 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple, Union
 
 import zulu
 from tabulate import tabulate
 
 import spyctl.api as api
 import spyctl.config.configs as cfg
+import spyctl.group_by as grp
 import spyctl.spyctl_lib as lib
 
 NOT_AVAILABLE = lib.NOT_AVAILABLE
@@ -17,47 +18,43 @@ SUMMARY_HEADERS = [
 ]
 
 
-class ProcessGroup:
-    def __init__(self, multiple_exes) -> None:
-        self.ref_proc = None
-        self.latest_timestamp = NOT_AVAILABLE
-        self.count = 0
-        self.root = False
-        self.multiple_exes = multiple_exes
-
-    def add_proc(self, proc: Dict):
-        self.__update_latest_timestamp(proc.get("create_time"))
-        if self.ref_proc is None:
-            self.ref_proc = proc
-        if proc.get("euid") == 0:
-            self.root = True
-        self.count += 1
+def group_processes(
+    processes: Iterable[Dict], top: int = None, top_by=grp.TOP_BY_COUNT
+) -> Union[grp.GroupBy, grp.TopK]:
+    return grp.group(
+        processes,
+        _key,
+        top,
+        top_by,
+        latest="create_time",
+        ref_proc=(grp.FIRST, None),
+        latest_timestamp=(grp.MAX, "create_time"),
+        lowest_euid=(grp.MIN, "euid"),
+        count=(grp.COUNT, None),
+    )
 
-    def __update_latest_timestamp(self, timestamp):
-        if timestamp is None:
-            return
-        if self.latest_timestamp == NOT_AVAILABLE:
-            self.latest_timestamp = timestamp
-        elif timestamp > self.latest_timestamp:
-            self.latest_timestamp = timestamp
 
-    def summary_data(self) -> List[str]:
-        timestamp = NOT_AVAILABLE
-        if self.latest_timestamp != NOT_AVAILABLE:
-            timestamp = str(
-                zulu.Zulu.fromtimestamp(self.latest_timestamp).format(
-                    "YYYY-MM-ddTHH:mm:ss"
-                )
+def process_group_summary_data(
+    key: Tuple, group: Dict, error: int = 0
+) -> List[str]:
+    multiple_exes, _ = key
+    timestamp = NOT_AVAILABLE
+    if group["latest_timestamp"] is not None:
+        timestamp = str(
+            zulu.Zulu.fromtimestamp(group["latest_timestamp"]).format(
+                "YYYY-MM-ddTHH:mm:ss"
             )
-        exe = "MULTIPLE" if self.multiple_exes else self.ref_proc["exe"]
-        rv = [
-            self.ref_proc["name"],
-            exe,
-            "YES" if self.root else "NO",
-            str(self.count),
-            timestamp,
-        ]
-        return rv
+        )
+    ref_proc = group["ref_proc"]
+    exe = "MULTIPLE" if multiple_exes else ref_proc["exe"]
+    rv = [
+        ref_proc["name"],
+        exe,
+        "YES" if group["lowest_euid"] == 0 else "NO",
+        grp.count_range(group["count"], error),
+        timestamp,
+    ]
+    return rv
 
 
 def processes_stream_output_summary(
@@ -66,23 +63,23 @@ def processes_stream_output_summary(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    top: int = None,
+    top_by=grp.TOP_BY_COUNT,
 ) -> str:
-    groups: Dict[Tuple, ProcessGroup] = {}
-    for proc in api.get_processes(
-        *ctx.get_api_data(), muids, time, pipeline, limit_mem
-    ):
-        multiple_exes, key = _key(proc)
-        if key not in groups:
-            groups[key] = ProcessGroup(multiple_exes)
-        groups[key].add_proc(proc)
+    groups = group_processes(
+        api.get_processes(
+            *ctx.get_api_data(), muids, time, pipeline, limit_mem
+        ),
+        top,
+        top_by,
+    )
     data = []
-    for group in groups.values():
-        data.append(group.summary_data())
+    for key, group in groups.items():
+        data.append(process_group_summary_data(key, group, groups.error(key)))
+    if not top:
+        data.sort(key=lambda x: [x[0], x[2], lib.to_timestamp(x[4])])
     rv = tabulate(
-        sorted(
-            data,
-            key=lambda x: [x[0], x[2], lib.to_timestamp(x[4])],
-        ),
+        data,
         headers=SUMMARY_HEADERS,
         tablefmt="plain",
     )
@@ -1,5 +1,6 @@
 from typing import List, Tuple, Dict
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
 from tabulate import tabulate
 import spyctl.spyctl_lib as lib
@@ -22,11 +23,19 @@ def replicaset_output_summary(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
 ) -> str:
-    data = []
-    for replicaset in api.get_replicaset(
+    replicasets = api.get_replicaset(
         *ctx.get_api_data(), clusters, time, pipeline, limit_mem
-    ):
+    )
+    if stream:
+        print("\n" "D/C/R = desired/current/ready pod replicas" "\n")
+        cli.show_table_stream(
+            map(replicaset_summary_data, replicasets), SUMMARY_HEADERS
+        )
+        return ""
+    data = []
+    for replicaset in replicasets:
         data.append(replicaset_summary_data(replicaset))
     rv = tabulate(
         sorted(data, key=lambda x: [x[2], x[5]]),
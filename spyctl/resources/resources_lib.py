@@ -1,20 +1,25 @@
-from typing import Dict, List
+from typing import Dict, Generator
 import spyctl.spyctl_lib as lib
 import spyctl.api as api
 import spyctl.resources.api_filters as _af
 import spyctl.config.configs as cfg
 
 
-def handle_input_data(data: Dict, ctx: cfg.Context = None) -> List[Dict]:
+def handle_input_data(
+    data: Dict, ctx: cfg.Context = None
+) -> Generator[Dict, None, None]:
+    """Lazily yields the objects contained in an input resource.
+    Fingerprint groups, UID lists, and items lists are expanded one
+    object at a time so large inputs never have to be held in memory.
+    """
     obj_kind = data.get(lib.KIND_FIELD)
     schema = data.get(lib.SCHEMA_FIELD)
-    rv = []
     if obj_kind == lib.POL_KIND:
-        rv.append(data)
+        yield data
     elif obj_kind == lib.BASELINE_KIND:
-        rv.append(data)
+        yield data
     elif obj_kind == lib.FPRINT_KIND:
-        rv.append(data)
+        yield data
     elif obj_kind == lib.DEVIATION_KIND or (
         schema
         and schema.startswith(
@@ -25,16 +30,15 @@ def handle_input_data(data: Dict, ctx: cfg.Context = None) -> List[Dict]:
         )
     ):
         if obj_kind is None:
-            rv.append(data["deviation"])
+            yield data["deviation"]
         else:
-            rv.append(data)
+            yield data
     elif obj_kind == lib.FPRINT_GROUP_KIND:
-        rv.extend(__handle_fprint_group_input(data))
+        yield from __handle_fprint_group_input(data)
     elif obj_kind == lib.UID_LIST_KIND:
-        rv.extend(__handle_uid_list_input(data, ctx))
+        yield from __handle_uid_list_input(data, ctx)
     elif lib.ITEMS_FIELD in data:
-        rv.extend(__handle_spyctl_items_input(data))
-    return rv
+        yield from __handle_spyctl_items_input(data)
 
 
 def __handle_fprint_group_input(data: Dict):
@@ -50,16 +54,11 @@ def __handle_uid_list_input(data: Dict, ctx: cfg.Context = None):
         data[lib.METADATA_FIELD][lib.METADATA_END_TIME_FIELD],
     )
     src = ctx.global_source
-    fprints = list(
-        api.get_fingerprints(
-            *ctx.get_api_data(), [src], time, pipeline=pipeline
-        )
+    return api.get_fingerprints(
+        *ctx.get_api_data(), [src], time, pipeline=pipeline
     )
-    return fprints
 
 
 def __handle_spyctl_items_input(data: Dict):
-    rv = []
     for item in data[lib.ITEMS_FIELD]:
-        rv.extend(handle_input_data(item))
-    return rv
+        yield from handle_input_data(item)
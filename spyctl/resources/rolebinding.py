@@ -1,5 +1,6 @@
 from typing import List, Tuple, Dict
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
 from tabulate import tabulate
 import spyctl.spyctl_lib as lib
@@ -21,11 +22,18 @@ def rolebinding_output_summary(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
 ) -> str:
-    data = []
-    for rolebinding in api.get_rolebinding(
+    rolebindings = api.get_rolebinding(
         *ctx.get_api_data(), clusters, time, pipeline, limit_mem
-    ):
+    )
+    if stream:
+        cli.show_table_stream(
+            map(rolebinding_summary_data, rolebindings), SUMMARY_HEADERS
+        )
+        return ""
+    data = []
+    for rolebinding in rolebindings:
         data.append(rolebinding_summary_data(rolebinding))
     rv = tabulate(
         sorted(data, key=lambda x: [x[0], x[4], x[5]]),
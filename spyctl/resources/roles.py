@@ -1,5 +1,6 @@
 from typing import List, Tuple, Dict
 import spyctl.api as api
+import spyctl.cli as cli
 import spyctl.config.configs as cfg
 from tabulate import tabulate
 import spyctl.spyctl_lib as lib
@@ -20,11 +21,16 @@ def role_output_summary(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    stream=False,
 ) -> str:
-    data = []
-    for role in api.get_role(
+    roles = api.get_role(
         *ctx.get_api_data(), clusters, time, pipeline, limit_mem
-    ):
+    )
+    if stream:
+        cli.show_table_stream(map(role_summary_data, roles), SUMMARY_HEADERS)
+        return ""
+    data = []
+    for role in roles:
         data.append(role_summary_data(role))
     rv = tabulate(
         sorted(data, key=lambda x: [x[0], x[3], x[4]]),
@@ -1,9 +1,10 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 from tabulate import tabulate
 import spyctl.spyctl_lib as lib
 import spyctl.config.configs as cfg
+import spyctl.group_by as grp
 import spyctl.api as api
-
+import spyctl.cli as cli
 
 SUMMARY_HEADERS = [
     "TRIGGER_NAME",
@@ -14,6 +15,13 @@ SUMMARY_HEADERS = [
     "STATUS",
     "AGE",
 ]
+TOP_HEADERS = [
+    "TRIGGER_NAME",
+    "ROOT_PROCESS",
+    "COUNT",
+    "MAX_SCORE",
+    "LATEST_TIMESTAMP",
+]
 WIDE_HEADERS = [
     "UID",
     "TRIGGER_NAME",
@@ -35,11 +43,22 @@ def spydertraces_stream_summary_output(
     time: Tuple[float, float],
     pipeline=None,
     limit_mem=False,
+    top: int = None,
+    top_by=grp.TOP_BY_COUNT,
+    stream=False,
 ) -> str:
-    data = []
-    for spydertrace in api.get_spydertraces(
+    spydertraces = api.get_spydertraces(
         *ctx.get_api_data(), muids, time, pipeline, limit_mem
-    ):
+    )
+    if top:
+        return spydertraces_top_output(spydertraces, top, top_by)
+    if stream:
+        cli.show_table_stream(
+            map(spydertrace_summary_data, spydertraces), SUMMARY_HEADERS
+        )
+        return ""
+    data = []
+    for spydertrace in spydertraces:
         data.append(spydertrace_summary_data(spydertrace))
     return tabulate(
         data,
@@ -48,6 +67,42 @@ def spydertraces_stream_summary_output(
     )
 
 
+def spydertraces_top_output(
+    spydertraces: Iterable[Dict], top: int, top_by=grp.TOP_BY_COUNT
+) -> str:
+    groups = grp.group(
+        spydertraces,
+        lambda trace: (
+            trace[lib.BE_TRIGGER_NAME],
+            trace[lib.BE_ROOT_PROC_NAME],
+        ),
+        top,
+        top_by,
+        latest=lib.VALID_FROM_FIELD,
+        count=(grp.COUNT, None),
+        max_score=(grp.MAX, lib.BE_SCORE),
+        latest_timestamp=(grp.MAX, lib.VALID_FROM_FIELD),
+    )
+    data = []
+    for key, group in groups.items():
+        timestamp = lib.NOT_AVAILABLE
+        if group["latest_timestamp"] is not None:
+            timestamp = lib.epoch_to_zulu(group["latest_timestamp"])
+        data.append(
+            [
+                *key,
+                grp.count_range(group["count"], groups.error(key)),
+                group["max_score"],
+                timestamp,
+            ]
+        )
+    return tabulate(
+        data,
+        headers=TOP_HEADERS,
+        tablefmt="plain",
+    )
+
+
 def spydertrace_summary_data(trace: Dict) -> List:
     rv = [
         trace[lib.BE_TRIGGER_NAME],
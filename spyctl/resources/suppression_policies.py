@@ -2,7 +2,6 @@ from typing import Dict, Tuple, Optional, List
 import spyctl.config.configs as cfg
 import spyctl.spyctl_lib as lib
 import json
-import yaml
 from tabulate import tabulate
 import zulu
 import spyctl.cli as cli
@@ -89,8 +88,8 @@ class TraceSuppressionPolicy:
     def policy_scope_string(self):
         ctx = cfg.get_current_context()
         rv = f"Organization UID: {ctx.org_uid}\n"
-        rv += yaml.dump({"selectors": self.selectors}, sort_keys=False)
-        rv += yaml.dump({"allowedFlags": self.flags})
+        rv += lib.yaml_dump({"selectors": self.selectors}, sort_keys=False)
+        rv += lib.yaml_dump({"allowedFlags": self.flags})
         return rv
 
     def as_dict(self) -> Dict:
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import hashlib
 import ipaddress
-from typing import Any, Dict, List, Optional, Union
+import itertools
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from typing_extensions import Literal
 
 from pydantic import (
@@ -16,32 +22,103 @@ from pydantic import (
 
 import spyctl.spyctl_lib as lib
 
+# Objects validated per worker task by validate_objects
+VALIDATE_CHUNK_SIZE = 200
+# Successful validations remembered, by checksum of the object
+VALIDATION_CACHE_SIZE = 10000
+
 
 def valid_object(
     data: Dict, verbose=True, allow_obj_list=True, interactive=False
 ) -> bool:
+    try:
+        error = __object_error(data, allow_obj_list)
+    except ValueError as e:
+        lib.err_exit(str(e))
+    if error is None:
+        return True
+    if verbose:
+        if interactive:
+            return error
+        else:
+            lib.try_log(error, is_warning=True)
+    return False
+
+
+def validate_objects(
+    objs: Iterable[Dict], jobs: int = 1, chunk_size: int = VALIDATE_CHUNK_SIZE
+) -> Iterator[Tuple[int, str]]:
+    """Validates a batch of objects, such as the documents of a large file
+    or a stream, yielding (index, error message) for each invalid object
+    in order.
+
+    Args:
+        objs (Iterable[Dict]): The objects to validate.
+        jobs (int, optional): Number of worker processes validating chunks
+            of objects in parallel. Defaults to 1, validating in this
+            process.
+        chunk_size (int, optional): Number of objects sent to a worker at
+            a time. Defaults to VALIDATE_CHUNK_SIZE.
+    """
+    chunks = __chunks(enumerate(objs), chunk_size)
+    if jobs <= 1:
+        for chunk in chunks:
+            yield from __chunk_errors(chunk)
+        return
+    with ProcessPoolExecutor(jobs) as executor:
+        # Only a few chunks per worker are in flight, so a stream is never
+        # read into memory all at once
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(__chunk_errors, chunk))
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def __object_error(data: Dict, allow_obj_list=True) -> Optional[str]:
+    """The validation error message for an object, None if it is valid.
+    Raises ValueError if the object cannot be validated at all."""
     kind = data.get(lib.KIND_FIELD)
-    if kind not in KIND_TO_SCHEMA:
+    is_list = kind not in KIND_TO_SCHEMA
+    if is_list:
         if lib.ITEMS_FIELD not in data:
-            lib.err_exit(
+            raise ValueError(
                 f"Unable to validate {kind!r}, no schema exists for objects of"
                 " that type."
             )
         elif not allow_obj_list:
-            lib.err_exit("Nested item lists are not allowed.")
-        try:
-            GuardianObjectListModel(**data)
-        except ValidationError as e:
-            if verbose:
-                if interactive:
-                    return str(e)
-                else:
-                    lib.try_log(str(e), is_warning=True)
-            return False
-        for item in data[lib.ITEMS_FIELD]:
-            if not valid_object(item, allow_obj_list=False):
-                return False
-        return True
+            raise ValueError("Nested item lists are not allowed.")
+    key = __cache_key(data)
+    if key is not None and key in __VALID_OBJECTS:
+        return None
+    if is_list:
+        error = __list_error(data)
+    else:
+        error = __model_error(kind, data)
+    if error is None and key is not None:
+        if len(__VALID_OBJECTS) >= VALIDATION_CACHE_SIZE:
+            __VALID_OBJECTS.clear()
+        __VALID_OBJECTS.add(key)
+    return error
+
+
+def __list_error(data: Dict) -> Optional[str]:
+    # The list model only checks the outline of the items, each one is
+    # then validated against the schema for its kind
+    try:
+        GuardianObjectListModel(**data)
+    except ValidationError as e:
+        return str(e)
+    for item in data[lib.ITEMS_FIELD]:
+        error = __object_error(item, allow_obj_list=False)
+        if error is not None:
+            return error
+    return None
+
+
+def __model_error(kind: str, data: Dict) -> Optional[str]:
     # Some validations depend on the type of the object in addition to the kind
     tmp_kind = (
         kind,
@@ -52,13 +129,51 @@ def valid_object(
     try:
         KIND_TO_SCHEMA[kind](**data)
     except ValidationError as e:
-        if verbose:
-            if interactive:
-                return str(e)
-            else:
-                lib.try_log(str(e), is_warning=True)
-        return False
-    return True
+        return str(e)
+    return None
+
+
+def __cache_key(data: Dict) -> Optional[Tuple[str, bytes]]:
+    # The schema version is part of the key, results never outlive a
+    # change to the models
+    try:
+        canonical = json.dumps(data, sort_keys=True, default=repr)
+    except (TypeError, ValueError):
+        return None
+    checksum = hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+    return SCHEMA_VERSION, checksum
+
+
+def __chunks(items: Iterable, size: int) -> Iterator[List]:
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def __chunk_errors(chunk: List[Tuple[int, Dict]]) -> List[Tuple[int, str]]:
+    rv = []
+    for i, obj in chunk:
+        if not isinstance(obj, dict):
+            rv.append((i, "Invalid object, expect dictionary."))
+            continue
+        try:
+            error = __object_error(obj)
+        except ValueError as e:
+            error = str(e)
+        if error is not None:
+            rv.append((i, error))
+    return rv
+
+
+def __schema_version() -> str:
+    try:
+        source = Path(__file__).read_bytes()
+    except OSError:
+        return ""
+    return hashlib.blake2b(source, digest_size=8).hexdigest()
 
 
 def valid_context(context_data: Dict, verbose=True):
@@ -89,6 +204,8 @@ def valid_notification_target(tgt_data: Dict, interactive=False):
 
 
 __PROC_IDS = {}
+__VALID_OBJECTS = set()
+SCHEMA_VERSION = __schema_version()
 
 # -----------------------------------------------------------------------------
 # Selectors -------------------------------------------------------------------
@@ -803,11 +920,23 @@ class GuardianObjectModel(BaseModel):
         extra = Extra.ignore
 
 
-class GuardianObjectListModel(BaseModel):
+class GuardianFingerprintGroupItemModel(BaseModel):
     api_version: str = Field(alias=lib.API_FIELD)
-    items: List[Union[GuardianObjectModel, GuardianFingerprintGroupModel]] = (
-        Field(alias=lib.ITEMS_FIELD)
+    kind: Literal[lib.FPRINT_GROUP_KIND] = (  # type: ignore
+        Field(alias=lib.KIND_FIELD)
     )
+    metadata: Dict = Field(alias=lib.METADATA_FIELD)
+    data: Dict
+
+    class Config:
+        extra = Extra.ignore
+
+
+class GuardianObjectListModel(BaseModel):
+    api_version: str = Field(alias=lib.API_FIELD)
+    items: List[
+        Union[GuardianObjectModel, GuardianFingerprintGroupItemModel]
+    ] = Field(alias=lib.ITEMS_FIELD)
 
 
 # -----------------------------------------------------------------------------
@@ -6,28 +6,34 @@ from pathlib import Path
 
 import click
 
-import spyctl.api as api
 import spyctl.cli as cli
-import spyctl.commands.create as c
-import spyctl.commands.diff as d
-import spyctl.commands.get as g
-import spyctl.commands.merge as m
-import spyctl.commands.show_schema as sh_s
-import spyctl.commands.suppress as sup
-import spyctl.commands.update as u
-import spyctl.commands.validate as v
-import spyctl.commands.export as x
-import spyctl.commands.spy_import as i
 import spyctl.config.configs as cfgs
 import spyctl.config.secrets as s
+import spyctl.group_by as grp
+import spyctl.name_index as names
 import spyctl.spyctl_lib as lib
-from spyctl.commands.apply import handle_apply
-from spyctl.commands.delete import handle_delete
-from spyctl.commands.describe import handle_describe
-from spyctl.commands.edit import handle_edit
-from spyctl.commands.logs import handle_logs
-from spyctl.commands.test_notification import handle_test_notification
-import spyctl.resources.api_filters as api_filters
+
+# The command implementations pull in the api, merge and resource
+# modules, so they are only loaded once a command that needs them runs
+api = lib.lazy_import("spyctl.api")
+api_filters = lib.lazy_import("spyctl.resources.api_filters")
+ap = lib.lazy_import("spyctl.commands.apply")
+c = lib.lazy_import("spyctl.commands.create")
+d = lib.lazy_import("spyctl.commands.diff")
+dmn = lib.lazy_import("spyctl.commands.daemon")
+dl = lib.lazy_import("spyctl.commands.delete")
+desc = lib.lazy_import("spyctl.commands.describe")
+ed = lib.lazy_import("spyctl.commands.edit")
+g = lib.lazy_import("spyctl.commands.get")
+i = lib.lazy_import("spyctl.commands.spy_import")
+lg = lib.lazy_import("spyctl.commands.logs")
+m = lib.lazy_import("spyctl.commands.merge")
+sh_s = lib.lazy_import("spyctl.commands.show_schema")
+sup = lib.lazy_import("spyctl.commands.suppress")
+tn = lib.lazy_import("spyctl.commands.test_notification")
+u = lib.lazy_import("spyctl.commands.update")
+v = lib.lazy_import("spyctl.commands.validate")
+x = lib.lazy_import("spyctl.commands.export")
 
 MAIN_EPILOG = (
     "\b\n"
@@ -73,12 +79,12 @@ def main(ctx: click.Context, debug=False):
     "--filename",
     help="Filename containing Spyderbat resource.",
     metavar="",
-    type=click.File(),
+    type=lib.File(),
     required=True,
 )
 def apply(filename):
     """Apply a configuration to a resource by file name."""
-    handle_apply(filename)
+    ap.handle_apply(filename)
 
 
 # ----------------------------------------------------------------- #
@@ -485,7 +491,7 @@ def create():
     " creates a baseline.",
     required=True,
     metavar="",
-    type=click.File(),
+    type=lib.File(),
 )
 @click.option(
     "-o",
@@ -595,7 +601,7 @@ def create_notif_route(name, target, template, output):
     " object, from which spyctl creates a Guardian Policy",
     metavar="",
     required=True,
-    type=click.File(),
+    type=lib.File(),
 )
 @click.option(
     "-o",
@@ -797,6 +803,57 @@ def create_suppression_policy(
     )
 
 
+# ----------------------------------------------------------------- #
+#                         Daemon Subcommand                         #
+# ----------------------------------------------------------------- #
+
+
+@main.group("daemon", cls=lib.CustomSubGroup, epilog=SUB_EPILOG)
+@click.help_option("-h", "--help", hidden=True)
+def daemon():
+    """Run spyctl commands from a resident daemon.
+
+    While the daemon is running, spyctl commands are run by it instead of
+    starting from scratch, reusing its loaded modules and config, its api
+    connections, and api responses fetched in the last few seconds. Set
+    SPYCTL_NO_DAEMON=1 to run a command without it.
+    """
+
+
+@daemon.command("start", cls=lib.CustomCommand, epilog=SUB_EPILOG)
+@click.help_option("-h", "--help", hidden=True)
+@click.option(
+    "--cache-ttl",
+    help="Seconds to reuse responses of api GET requests for, 0 disables"
+    " caching them.",
+    metavar="",
+    default=30,
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--foreground",
+    help="Run the daemon in this process instead of in the background.",
+    is_flag=True,
+)
+def daemon_start(cache_ttl, foreground):
+    """Start the daemon."""
+    dmn.handle_daemon_start(cache_ttl, foreground)
+
+
+@daemon.command("stop", cls=lib.CustomCommand, epilog=SUB_EPILOG)
+@click.help_option("-h", "--help", hidden=True)
+def daemon_stop():
+    """Stop the daemon."""
+    dmn.handle_daemon_stop()
+
+
+@daemon.command("status", cls=lib.CustomCommand, epilog=SUB_EPILOG)
+@click.help_option("-h", "--help", hidden=True)
+def daemon_status():
+    """Show whether the daemon is running."""
+    dmn.handle_daemon_status()
+
+
 # ----------------------------------------------------------------- #
 #                        Delete Subcommand                          #
 # ----------------------------------------------------------------- #
@@ -805,7 +862,11 @@ def create_suppression_policy(
 @main.command("delete", cls=lib.CustomCommand, epilog=SUB_EPILOG)
 @click.help_option("-h", "--help", hidden=True)
 @click.argument("resource", type=lib.DelResourcesParam())
-@click.argument("name_or_id", required=False)
+@click.argument(
+    "name_or_id",
+    required=False,
+    shell_complete=names.complete_name_or_id,
+)
 @click.option(
     "-y",
     "--yes",
@@ -818,7 +879,7 @@ def delete(resource, name_or_id, yes=False):
     """Delete resources by resource and name, or by resource and ids"""
     if yes:
         cli.set_yes_option()
-    handle_delete(resource, name_or_id)
+    dl.handle_delete(resource, name_or_id)
 
 
 # ----------------------------------------------------------------- #
@@ -827,17 +888,21 @@ def delete(resource, name_or_id, yes=False):
 @main.command("describe", cls=lib.CustomCommand)
 @click.help_option("-h", "--help", hidden=True)
 @click.argument("resource", type=lib.DescribeResourcesParam())
-@click.argument("name_or_id", required=False)
+@click.argument(
+    "name_or_id",
+    required=False,
+    shell_complete=names.complete_name_or_id,
+)
 @click.option(
     "-f",
     "--filename",
     help="File to diff with target.",
     metavar="",
-    type=click.File(),
+    type=lib.File(),
 )
 def describe(resource, name_or_id, filename=None):
     """Describe a Spyderbat resource"""
-    handle_describe(resource, name_or_id, filename)
+    desc.handle_describe(resource, name_or_id, filename)
 
 
 # ----------------------------------------------------------------- #
@@ -875,7 +940,7 @@ def describe(resource, name_or_id, filename=None):
     "with_file",
     help="File to diff with target.",
     metavar="",
-    type=click.File(),
+    type=lib.File(),
     cls=lib.MutuallyExclusiveOption,
     mutually_exclusive=["with_policy"],
 )
@@ -938,7 +1003,11 @@ def describe(resource, name_or_id, filename=None):
     "-o",
     "--output",
     default=lib.OUTPUT_DEFAULT,
-    type=click.Choice(lib.OUTPUT_CHOICES, case_sensitive=False),
+    type=click.Choice(
+        lib.OUTPUT_CHOICES + [lib.OUTPUT_PATCH], case_sensitive=False
+    ),
+    help="Output format of the diff. 'patch' outputs a RFC 6902 JSON Patch"
+    " from the target to the merged object.",
 )
 @click.option(
     "-y",
@@ -1072,7 +1141,11 @@ def diff(
 @main.command("edit", cls=lib.CustomCommand, epilog=SUB_EPILOG)
 @click.help_option("-h", "--help", hidden=True)
 @click.argument("resource", type=lib.EditResourcesParam(), required=False)
-@click.argument("name_or_id", required=False)
+@click.argument(
+    "name_or_id",
+    required=False,
+    shell_complete=names.complete_name_or_id,
+)
 @click.option(
     "-f",
     "--filename",
@@ -1092,7 +1165,7 @@ def edit(resource, name_or_id, filename, yes=False):
     """Edit resources by resource and name, or by resource and ids"""
     if yes:
         cli.set_yes_option()
-    handle_edit(resource, name_or_id, filename)
+    ed.handle_edit(resource, name_or_id, filename)
 
 
 # ----------------------------------------------------------------- #
@@ -1206,6 +1279,13 @@ class GetCommand(lib.ArgumentParametersCommand):
                     " exclude deviations that have already been merged into"
                     " the policy.",
                 ),
+                click.option(
+                    "--relevance-cache",
+                    is_flag=True,
+                    help="Remember which deviations were irrelevant to a"
+                    " policy so repeated runs can skip merges whose outcome"
+                    " is already known.",
+                ),
             ],
         },
         {
@@ -1304,6 +1384,58 @@ class GetCommand(lib.ArgumentParametersCommand):
                 ),
             ],
         },
+        {
+            "resource": [
+                lib.CONNECTIONS_RESOURCE,
+                lib.OPSFLAGS_RESOURCE,
+                lib.PROCESSES_RESOURCE,
+                lib.REDFLAGS_RESOURCE,
+                lib.SPYDERTRACE_RESOURCE,
+            ],
+            "args": [
+                click.option(
+                    "--top",
+                    help="Only show the N heaviest rows of the summary"
+                    " output. Memory stays bounded however many rows there"
+                    " are, so counts may be approximate and are then shown"
+                    " as a range.",
+                    type=click.IntRange(min=1),
+                    metavar="N",
+                ),
+                click.option(
+                    "--by",
+                    "top_by",
+                    help="What --top ranks rows by. Defaults to count.",
+                    type=click.Choice(grp.TOP_BY_CHOICES),
+                    default=grp.TOP_BY_COUNT,
+                ),
+            ],
+        },
+        {
+            "resource": [
+                lib.CLUSTERROLE_BINDING_RESOURCE,
+                lib.CLUSTERROLES_RESOURCE,
+                lib.DAEMONSET_RESOURCE,
+                lib.DEPLOYMENTS_RESOURCE,
+                lib.MACHINES_RESOURCE,
+                lib.NAMESPACES_RESOURCE,
+                lib.NODES_RESOURCE,
+                lib.PODS_RESOURCE,
+                lib.REPLICASET_RESOURCE,
+                lib.ROLEBINDING_RESOURCE,
+                lib.ROLES_RESOURCE,
+                lib.SPYDERTRACE_RESOURCE,
+            ],
+            "args": [
+                click.option(
+                    "--stream",
+                    is_flag=True,
+                    help="Print the rows of the summary output as they"
+                    " arrive instead of sorting them at the end. Column"
+                    " widths are fixed from the first rows.",
+                ),
+            ],
+        },
         {
             "resource": [lib.POLICIES_RESOURCE],
             "args": [
@@ -1356,7 +1488,11 @@ class GetCommand(lib.ArgumentParametersCommand):
 @main.command("get", cls=GetCommand, epilog=SUB_EPILOG)
 @click.help_option("-h", "--help", hidden=True)
 @click.argument("resource", type=lib.GetResourcesParam())
-@click.argument("name_or_id", required=False)
+@click.argument(
+    "name_or_id",
+    required=False,
+    shell_complete=names.complete_name_or_id,
+)
 @click.option(
     "--image",
     cfgs.IMG_FIELD,
@@ -1432,8 +1568,12 @@ class GetCommand(lib.ArgumentParametersCommand):
     "--output",
     default=lib.OUTPUT_DEFAULT,
     type=click.Choice(
-        lib.OUTPUT_CHOICES + [lib.OUTPUT_WIDE], case_sensitive=False
+        lib.OUTPUT_CHOICES + [lib.OUTPUT_WIDE] + lib.TABLE_OUTPUTS,
+        case_sensitive=False,
     ),
+    help="Output format. parquet, arrow and csv write the records as a"
+    " table, flattening nested fields into dotted column names. parquet"
+    " and arrow require pyarrow.",
 )
 @click.option(
     "-E",
@@ -1461,9 +1601,19 @@ class GetCommand(lib.ArgumentParametersCommand):
 )
 @click.option(
     "--ndjson",
-    help="If output is 'json' this outputs each json record on its own line",
+    help="If output is 'json' this outputs each json record on its own line."
+    " When orjson is installed (spyctl[fast]) the lines have no spaces"
+    " after separators, non-ASCII characters are not escaped, NaN is"
+    " written as null and exponents are written like 1e20.",
     is_flag=True,
 )
+@click.option(
+    "--export-to",
+    help="Write the output to this file instead of stdout. It is compressed"
+    " with gzip or zstd if the file name ends in .gz or .zst.",
+    type=click.Path(dir_okay=False),
+    metavar="PATH",
+)
 def get(
     resource,
     st,
@@ -1473,6 +1623,7 @@ def get(
     exact=False,
     name_or_id=None,
     latest=None,
+    export_to=None,
     **filters,
 ):
     """Display one or many Spyderbat Resources.
@@ -1527,6 +1678,9 @@ def get(
     \b
       # Get the latest fingerprints related to a policy yaml file
       spyctl get fingerprints -f policy.yaml --latest
+    \b
+      # Export the last week of connections to a compressed file
+      spyctl get connections -t 1w -o json --ndjson --export-to conns.json.gz
     \b
       # Get all the containers
       spyctl get containers
@@ -1553,17 +1707,18 @@ def get(
     filters = {
         key: value for key, value in filters.items() if value is not None
     }
-    g.handle_get(
-        resource,
-        name_or_id,
-        st,
-        et,
-        filename,
-        latest,
-        exact,
-        output,
-        **filters,
-    )
+    with cli.output_to_file(export_to):
+        g.handle_get(
+            resource,
+            name_or_id,
+            st,
+            et,
+            filename,
+            latest,
+            exact,
+            output,
+            **filters,
+        )
 
 
 # ----------------------------------------------------------------- #
@@ -1574,7 +1729,11 @@ def get(
 @main.command("logs", cls=lib.CustomCommand, epilog=SUB_EPILOG)
 @click.help_option("-h", "--help", hidden=True)
 @click.argument("resource", type=lib.LogsResourcesParam())
-@click.argument("name_or_id", required=False)
+@click.argument(
+    "name_or_id",
+    required=False,
+    shell_complete=names.complete_name_or_id,
+)
 @click.option(
     "-f",
     "--follow",
@@ -1640,7 +1799,7 @@ def logs(
     """Print the logs for a specified resource. Default behavior is to
     print out the logs for the last 24 hours.
     """
-    handle_logs(
+    lg.handle_logs(
         resource,
         name_or_id,
         follow,
@@ -1673,7 +1832,7 @@ def logs(
     "-p",
     "--policy",
     is_flag=False,
-    flag_value=m.ALL,
+    flag_value="all",
     default=None,
     help="Target policy name(s) or uid(s) of the merge. If supplied with no"
     " argument, set to 'all'.",
@@ -1688,7 +1847,7 @@ def logs(
     "with_file",
     help="File to merge into target.",
     metavar="",
-    type=click.File(),
+    type=lib.File(),
     cls=lib.MutuallyExclusiveOption,
     mutually_exclusive=["with_policy"],
 )
@@ -1701,7 +1860,7 @@ def logs(
     " target's metadata.",
     metavar="",
     is_flag=False,
-    flag_value=m.MATCHING,
+    flag_value="matching",
     cls=lib.MutuallyExclusiveOption,
     mutually_exclusive=["with_file"],
 )
@@ -2013,7 +2172,7 @@ def test_notification(targets):
     Testing a notification route will send a test notification to one or many
     targets it is configured with.
     """
-    handle_test_notification(targets)
+    tn.handle_test_notification(targets)
 
 
 # ----------------------------------------------------------------- #
@@ -2030,7 +2189,7 @@ def test_notification(targets):
     help="Target file to validate",
     metavar="",
     required=True,
-    type=click.File(),
+    type=lib.File(),
 )
 @click.option(
     "-a",
@@ -2040,17 +2199,27 @@ def test_notification(targets):
     hidden=True,
     is_flag=True,
 )
+@click.option(
+    "-j",
+    "--jobs",
+    help="Number of processes validating the objects of a list in"
+    " parallel.",
+    metavar="",
+    default=1,
+    type=click.IntRange(min=1),
+)
 @lib.colorization_option
-def validate(file, colorize, api):
+def validate(file, colorize, api, jobs):
     """Validate spyderbat resource and spyctl configuration files.
 
     \b
     example:
       spyctl validate -f my_baseline.yaml
+      spyctl validate -f policies.json --jobs 4
     """
     if not colorize:
         lib.disable_colorization()
-    v.handle_validate(file, api)
+    v.handle_validate(file, api, jobs)
 
 
 # ----------------------------------------------------------------- #
@@ -2087,7 +2256,7 @@ def export(resource, exact=False, name_or_id=None):
     "--filename",
     help="Filename containing policies to import.",
     metavar="",
-    type=click.File(),
+    type=lib.File(),
     required=True,
 )
 def spy_import(filename):
@@ -2112,7 +2281,7 @@ if __name__ == "__main__":
     help="Target file to print",
     metavar="",
     required=True,
-    type=click.File(),
+    type=lib.File(),
 )
 @click.option("-l", "--list-output", is_flag=True, default=False)
 @click.help_option("-h", "--help", hidden=True)
@@ -1,4 +1,6 @@
 import copy
+import gzip
+import importlib.util
 import inspect
 import io
 import json
@@ -10,7 +12,7 @@ import unicodedata
 from base64 import urlsafe_b64encode as b64url
 from datetime import timezone
 from fnmatch import fnmatch
-from hashlib import md5
+from hashlib import blake2b, md5
 from pathlib import Path
 from typing import IO, Any, Dict, Iterable, List, Optional, Tuple, Union
 from urllib.parse import urlparse
@@ -53,6 +55,32 @@ ERR_VAR = []
 USE_LOG_VARS = False
 
 
+def lazy_import(name: str):
+    """Import a module only once one of its attributes is used.
+
+    Keeps heavy modules (e.g. the api and command implementations) off
+    the startup path of commands that never touch them.
+
+    Args:
+        name (str): Full name of the module, e.g. "spyctl.api".
+
+    Returns:
+        ModuleType: The module, loaded on first attribute access.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
 def disable_colorization():
     global COLORIZE_OUTPUT, WARNING_COLOR, COLOR_END
     global ADD_COLOR, SUB_COLOR, NOTICE_COLOR
@@ -531,7 +559,31 @@ class ExportResourcesParam(click.ParamType):
         ]
 
 
-class FileList(click.File):
+class File(click.File):
+    """A click.File that decompresses .gz and .zst files when reading."""
+
+    def convert(
+        self,
+        value: Any,
+        param: Optional[click.Parameter],
+        ctx: Optional[click.Context],
+    ) -> Any:
+        if (
+            isinstance(value, str)
+            and "r" in self.mode
+            and uncompressed_name(value) != value
+        ):
+            try:
+                f = open_file(value, self.mode)
+            except OSError as e:
+                self.fail(f"'{value}': {e.strerror}", param, ctx)
+            if ctx is not None:
+                ctx.call_on_close(f.close)
+            return f
+        return super().convert(value, param, ctx)
+
+
+class FileList(File):
     def convert(
         self,
         value: Any,
@@ -1107,9 +1159,15 @@ OUTPUT_JSON = "json"
 OUTPUT_DEFAULT = "default"
 OUTPUT_RAW = "raw"
 OUTPUT_WIDE = "wide"
+OUTPUT_PATCH = "patch"  # RFC 6902 JSON Patch, used by diff
 # used internally when updating objects directly via the API
 OUTPUT_API = "api"
 OUTPUT_CHOICES = [OUTPUT_YAML, OUTPUT_JSON, OUTPUT_DEFAULT]
+# Columnar exports of record streams, see table_export.py
+OUTPUT_PARQUET = "parquet"
+OUTPUT_ARROW = "arrow"
+OUTPUT_CSV = "csv"
+TABLE_OUTPUTS = [OUTPUT_PARQUET, OUTPUT_ARROW, OUTPUT_CSV]
 OUTPUT_DEST_DEFAULT = "default"  # stdout
 OUTPUT_DEST_FILE = "file"
 OUTPUT_DEST_API = "api"
@@ -1217,24 +1275,36 @@ def walk_up_tree(
         most specific local file. List[-1] is the global
         file if one exists.
     """
+    return load_files(find_up_tree(global_path, local_path, cwd))
+
+
+def find_up_tree(
+    global_path: Path, local_path: Path, cwd: Path = None
+) -> List[Path]:
+    """Like walk_up_tree, but only finds the files without loading them.
+
+    Returns:
+        List[Path]: The existing files, the most specific local file
+        first and the global file last.
+    """
     rv = []
     if cwd is None:
         cwd = Path.cwd()
-    config_path = Path.joinpath(cwd, local_path)
-    if Path.is_file(config_path):
-        conf = load_file(config_path)
-        if conf is not None:
-            rv.append((config_path, conf))
-    for parent in cwd.parents:
+    for parent in [cwd, *cwd.parents]:
         config_path = Path.joinpath(parent, local_path)
         if Path.is_file(config_path):
-            conf = load_file(config_path)
-            if conf is not None:
-                rv.append((config_path, conf))
+            rv.append(config_path)
     if Path.is_file(global_path):
-        conf = load_file(global_path)
+        rv.append(global_path)
+    return rv
+
+
+def load_files(paths: List[Path]) -> List[Tuple[Path, Dict]]:
+    rv = []
+    for path in paths:
+        conf = load_file(path)
         if conf is not None:
-            rv.append((global_path, conf))
+            rv.append((path, conf))
     return rv
 
 
@@ -1242,7 +1312,7 @@ def load_file(path: Path):
     try:
         with path.open("r") as f:
             try:
-                file_data = yaml.load(f, yaml.Loader)
+                file_data = yaml.load(f, YamlLoader)
             except Exception:
                 try:
                     file_data = json.load(f)
@@ -1912,7 +1982,77 @@ def dict_raise_on_duplicates(ordered_pairs):
     return d
 
 
-class UniqueKeyLoader(yaml.SafeLoader):
+# libyaml (C) accelerated loaders, if PyYAML was built with it
+YamlLoader = getattr(yaml, "CLoader", yaml.Loader)
+YamlSafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+# Longest mapping key, and the characters of any string, that libyaml's
+# emitter is known to format exactly like PyYAML's
+LIBYAML_MAX_KEY_LEN = 64
+
+
+class YamlCDumper(getattr(yaml, "CDumper", yaml.Dumper)):
+    def ignore_aliases(self, data):
+        # Follow yaml.Dumper, which cli.py patches to never use aliases
+        return yaml.Dumper.ignore_aliases(self, data)
+
+
+def yaml_dump(data, stream=None, **kwargs):
+    """yaml.dump, using libyaml's emitter when it is available and would
+    give identical output.
+
+    libyaml folds long double-quoted strings and chooses between simple
+    and complex mapping keys differently, so data containing strings
+    that aren't printable ascii, or long or empty keys, is dumped by the
+    pure python emitter.
+    """
+    dumper = yaml.Dumper
+    if (
+        YamlCDumper is not yaml.Dumper
+        and set(kwargs) <= {"sort_keys"}
+        and isinstance(data, (dict, list))
+        and __libyaml_formats_like_python(data)
+    ):
+        dumper = YamlCDumper
+    return yaml.dump(data, stream, Dumper=dumper, **kwargs)
+
+
+def __libyaml_formats_like_python(data) -> bool:
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        obj_type = type(obj)
+        if obj_type is str:
+            if not (obj.isascii() and obj.isprintable()):
+                return False
+        elif obj_type is dict:
+            for key, value in obj.items():
+                if type(key) is str:
+                    if not (
+                        0 < len(key) <= LIBYAML_MAX_KEY_LEN
+                        and key.isascii()
+                        and key.isprintable()
+                    ):
+                        return False
+                else:
+                    stack.append(key)
+                stack.append(value)
+        elif obj_type is list:
+            stack.extend(obj)
+        elif obj_type not in (int, float, bool, type(None)):
+            return False
+    return True
+
+
+class UniqueKeyLoader(YamlSafeLoader):
+    def __init__(self, stream):
+        super().__init__(stream)
+        if not hasattr(self, "name"):
+            # libyaml's parser doesn't record what it is reading
+            if isinstance(stream, str):
+                self.name = "<unicode string>"
+            else:
+                self.name = getattr(stream, "name", "<file>")
+
     def construct_mapping(self, node, deep=False):
         mapping = set()
         for key_node, value_node in node.value:
@@ -1925,7 +2065,9 @@ class UniqueKeyLoader(yaml.SafeLoader):
         return super().construct_mapping(node, deep)
 
 
-def load_resource_file(file: Union[str, IO], validate_cmd: bool = False):
+def load_resource_file(
+    file: Union[str, IO], validate_cmd: bool = False, validate: bool = True
+):
     try:
         name, resrc_data = __load_yaml_file(file)
     except ValueError as e:
@@ -1934,7 +2076,7 @@ def load_resource_file(file: Union[str, IO], validate_cmd: bool = False):
             sys.exit(0)
         err_exit(" ".join(e.args))
     except Exception as e:
-        if file.name.endswith(".yaml"):
+        if uncompressed_name(file.name).endswith(".yaml"):
             err_exit("Error decoding yaml" + str(e.args))
         try:
             name, resrc_data = __load_json_file(file)
@@ -1951,9 +2093,9 @@ def load_resource_file(file: Union[str, IO], validate_cmd: bool = False):
         except Exception:
             err_exit("Unable to load resource file.")
     __validate_data_structure_on_load(resrc_data, validate_cmd)
-    if isinstance(resrc_data, dict):
+    if validate and isinstance(resrc_data, dict):
         __validate_resource_on_load(resrc_data, name, validate_cmd)
-    else:
+    elif validate:
         for i, data in enumerate(resrc_data):
             __validate_resource_on_load(data, name, validate_cmd, index=i)
     if isinstance(file, io.TextIOWrapper):
@@ -2020,6 +2162,76 @@ def __load_json_file(file: Union[str, IO]) -> Tuple[str, Any]:
     return name, resrc_data
 
 
+# Files with these extensions are transparently (de)compressed
+GZIP_EXT = ".gz"
+ZSTD_EXTS = (".zst", ".zstd")
+
+
+def uncompressed_name(name: str) -> str:
+    """The file name without its compression extension, if any."""
+    root, ext = os.path.splitext(name)
+    if ext.lower() in (GZIP_EXT, *ZSTD_EXTS):
+        return root
+    return name
+
+
+def open_file(path: str, mode: str = "r") -> IO:
+    """Opens a file, compressing or decompressing it with gzip or zstd
+    if its name ends in .gz or .zst.
+
+    Args:
+        path (str): Path of the file.
+        mode (str, optional): "r", "w" or "a", plus "b" for binary.
+            Defaults to "r".
+
+    Returns:
+        IO: A file object, text files are io.TextIOWrapper objects.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    binary = "b" in mode
+    mode = mode.replace("b", "").replace("t", "")
+    if ext == GZIP_EXT:
+        if binary:
+            return gzip.open(path, mode + "b")
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if ext in ZSTD_EXTS:
+        return __zstd_open(path, mode, binary)
+    if binary:
+        return open(path, mode + "b")
+    return open(path, mode, encoding="utf-8")
+
+
+def __zstd_open(path: str, mode: str, binary: bool) -> IO:
+    try:
+        # Python 3.14+
+        from compression import zstd
+
+        if binary:
+            return zstd.open(path, mode + "b")
+        return zstd.open(path, mode + "t", encoding="utf-8")
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        err_exit(
+            f"Unable to open '{path}', zstd files require zstandard. Install"
+            " it with 'pip install spyctl[zstd]'."
+        )
+    if mode != "r":
+        if binary:
+            return zstandard.open(path, mode + "b")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    # zstandard readers can't seek back to the start or report their
+    # name, and resource files are loaded whole anyway
+    with zstandard.open(path, "rb") as f:
+        buffer = io.BytesIO(f.read())
+    buffer.name = path
+    if binary:
+        return buffer
+    return io.TextIOWrapper(buffer, encoding="utf-8")
+
+
 def dictionary_mod(fn) -> Dict:
     def wrapper(obj_list, fields: Union[List[str], str] = None) -> Dict:
         ret = dict()
@@ -2142,6 +2354,93 @@ def make_checksum(dictionary: Dict) -> str:
     return hash.hexdigest()
 
 
+HASH_DIGEST_SIZE = 16
+
+
+def canonical_hash(obj: Any, cache: Dict = None, cache_depth=1) -> str:
+    """Canonical structural hash of a json-like object. The object is
+    streamed into the hash without building its json string, key order
+    does not matter, and values of different types never collide
+    (1, 1.0, True, and "1" all hash differently).
+
+    Every dict is hashed on its own and its digest is fed to its
+    parent, so the digests of subtrees that have not changed can be
+    reused without changing the result.
+
+    Args:
+        obj (Any): The object to hash, made of dicts, lists and scalars.
+        cache (Dict, optional): Maps id(dict) to a (dict, digest)
+            tuple. Only pass a cache for objects that will not be
+            modified afterwards. Defaults to None.
+        cache_depth (int, optional): Subtrees nested up to this depth
+            are stored in the cache. Defaults to 1.
+
+    Returns:
+        str: The hex digest of the object.
+    """
+    hash = blake2b(digest_size=HASH_DIGEST_SIZE)
+    __feed_hash(hash, obj, cache, cache_depth, 0)
+    return hash.hexdigest()
+
+
+def __feed_hash(hash, obj: Any, cache: Optional[Dict], cache_depth, depth):
+    obj_type = type(obj)
+    if obj_type is str:
+        data = obj.encode("utf-8")
+        hash.update(b"s%d:" % len(data))
+        hash.update(data)
+    elif obj_type is dict:
+        hash.update(__dict_digest(obj, cache, cache_depth, depth))
+    elif obj_type is list:
+        __feed_list_hash(hash, obj, cache, cache_depth, depth)
+    elif obj is None:
+        hash.update(b"n")
+    elif obj_type is bool:
+        hash.update(b"t" if obj else b"f")
+    elif obj_type is int:
+        hash.update(b"i%d;" % obj)
+    elif obj_type is float:
+        hash.update(b"d%r;" % obj)
+    elif isinstance(obj, dict):
+        hash.update(__dict_digest(obj, cache, cache_depth, depth))
+    elif isinstance(obj, (list, tuple)):
+        __feed_list_hash(hash, obj, cache, cache_depth, depth)
+    else:
+        # Anything else (e.g. dates loaded from yaml) hashes by repr
+        data = repr(obj).encode("utf-8")
+        hash.update(b"r%d:" % len(data))
+        hash.update(data)
+
+
+def __feed_list_hash(hash, obj, cache: Optional[Dict], cache_depth, depth):
+    hash.update(b"[%d:" % len(obj))
+    for value in obj:
+        # Strings are by far the most common value, handle them inline
+        if type(value) is str:
+            data = value.encode("utf-8")
+            hash.update(b"s%d:" % len(data))
+            hash.update(data)
+        else:
+            __feed_hash(hash, value, cache, cache_depth, depth + 1)
+
+
+def __dict_digest(obj, cache: Optional[Dict], cache_depth, depth) -> bytes:
+    use_cache = cache is not None and depth <= cache_depth
+    if use_cache:
+        cached = cache.get(id(obj))
+        # The cache holds a reference so the id can't be reused
+        if cached is not None and cached[0] is obj:
+            return cached[1]
+    hash = blake2b(b"{%d:" % len(obj), digest_size=HASH_DIGEST_SIZE)
+    for key in sorted(obj):
+        __feed_hash(hash, key, cache, cache_depth, depth + 1)
+        __feed_hash(hash, obj[key], cache, cache_depth, depth + 1)
+    digest = hash.digest()
+    if use_cache:
+        cache[id(obj)] = (obj, digest)
+    return digest
+
+
 def simple_glob_to_regex(input_str: str):
     rv = input_str.replace(".", "\\.")
     rv = rv.replace("^", "\\^")
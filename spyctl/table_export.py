@@ -0,0 +1,249 @@
+"""Columnar exports (parquet, arrow, csv) of record streams.
+
+Records are flattened into columns: nested fields become dotted column
+names (e.g. metadata.name) and lists are stored as json strings. Records
+are converted to columns a batch at a time and spooled to a temporary
+file, while the schema inferred from the first batch is widened by each
+later one (new columns, int to float, mixed types to string). Once the
+stream ends the spooled batches are written out as row groups of the
+final schema, so memory stays bounded by the batch size.
+
+Parquet and arrow output require pyarrow (pip install spyctl[arrow]).
+"""
+
+import csv
+import io
+import json
+import pickle
+import sys
+import tempfile
+from typing import IO, Any, Dict, List, Optional
+
+import spyctl.spyctl_lib as lib
+
+ROW_GROUP_SIZE = 10000
+
+# Column types, a column holding several of them is widened
+NULL = "null"
+BOOL = "bool"
+INT = "int"
+FLOAT = "float"
+STR = "str"
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+KINDS = {type(None): NULL, bool: BOOL, int: INT, float: FLOAT, str: STR}
+
+
+class TableWriter:
+    def __init__(
+        self,
+        output: str,
+        dest: Optional[IO[bytes]] = None,
+        row_group_size: int = ROW_GROUP_SIZE,
+    ):
+        """Writes a stream of records as a parquet file, an arrow IPC
+        file, or csv.
+
+        Args:
+            output (str): One of lib.TABLE_OUTPUTS.
+            dest (IO[bytes], optional): Binary file to write to. Defaults
+                to stdout.
+            row_group_size (int, optional): Number of records converted
+                and written at a time. Defaults to ROW_GROUP_SIZE.
+        """
+        if dest is None:
+            dest = sys.stdout.buffer
+        if output != lib.OUTPUT_CSV:
+            _import_pyarrow(output)
+            if dest.isatty():
+                lib.err_exit(
+                    f"Refusing to write '--output {output}' to a terminal,"
+                    " redirect it to a file instead."
+                )
+        self.output = output
+        self.dest = dest
+        self.row_group_size = row_group_size
+        self.rows: List[Dict[str, Any]] = []
+        self.schema: Dict[str, str] = {}
+        self.spool = None
+        self.closed = False
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.spool is not None:
+            self.spool.close()
+
+    def write(self, obj):
+        if not isinstance(obj, dict):
+            obj = {"value": obj}
+        row = {}
+        _flatten(obj, "", row)
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self.__spill()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.__spill()
+        if self.spool is None:
+            # No records, so no columns either. A parquet or arrow file
+            # with an empty schema is still written for readers to open
+            if self.output != lib.OUTPUT_CSV:
+                self.__write_arrow()
+                self.dest.flush()
+            return
+        self.spool.seek(0)
+        if self.output == lib.OUTPUT_CSV:
+            self.__write_csv()
+        else:
+            self.__write_arrow()
+        self.spool.close()
+        self.dest.flush()
+
+    def __spill(self):
+        rows = self.rows
+        if not rows:
+            return
+        names = dict.fromkeys(name for row in rows for name in row)
+        columns = {name: [row.get(name) for row in rows] for name in names}
+        schema = self.schema
+        for name, values in columns.items():
+            schema[name] = _widen(schema.get(name, NULL), _kind(values))
+        if self.spool is None:
+            self.spool = tempfile.TemporaryFile()
+        pickle.dump((len(rows), columns), self.spool, pickle.HIGHEST_PROTOCOL)
+        self.rows = []
+
+    def __batches(self):
+        # The spooled batches, conformed to the final schema
+        if self.spool is None:
+            return
+        while True:
+            try:
+                length, columns = pickle.load(self.spool)
+            except EOFError:
+                return
+            yield [
+                _conform(columns.get(name), length, kind)
+                for name, kind in self.schema.items()
+            ]
+
+    def __write_csv(self):
+        text = io.TextIOWrapper(self.dest, newline="", write_through=True)
+        try:
+            writer = csv.writer(text)
+            writer.writerow(self.schema)
+            # All columns as strings, so bools are written as json would
+            self.schema = dict.fromkeys(self.schema, STR)
+            for columns in self.__batches():
+                writer.writerows(zip(*columns))
+        finally:
+            text.detach()
+
+    def __write_arrow(self):
+        pa = _import_pyarrow(self.output)
+        schema = pa.schema(
+            [
+                (name, _arrow_type(pa, kind))
+                for name, kind in self.schema.items()
+            ]
+        )
+        if self.output == lib.OUTPUT_PARQUET:
+            import pyarrow.parquet as pq
+
+            writer = pq.ParquetWriter(self.dest, schema, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(self.dest, schema)
+        with writer:
+            for columns in self.__batches():
+                writer.write_batch(
+                    pa.RecordBatch.from_arrays(
+                        [
+                            pa.array(values, type=field.type)
+                            for values, field in zip(columns, schema)
+                        ],
+                        schema=schema,
+                    )
+                )
+
+
+def _import_pyarrow(output: str):
+    try:
+        import pyarrow
+    except ImportError:
+        lib.err_exit(
+            f"'--output {output}' requires pyarrow. Install it with"
+            " 'pip install spyctl[arrow]'."
+        )
+    return pyarrow
+
+
+def _flatten(obj: Dict, prefix: str, row: Dict[str, Any]):
+    for key, value in obj.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            _flatten(value, name + ".", row)
+        elif isinstance(value, (dict, list, tuple)):
+            row[name] = json.dumps(value)
+        else:
+            row[name] = value
+
+
+def _kind(values: List) -> str:
+    kind = NULL
+    for value_type in set(map(type, values)):
+        kind = _widen(kind, KINDS.get(value_type, STR))
+    if kind == INT and any(
+        value is not None and not INT64_MIN <= value <= INT64_MAX
+        for value in values
+    ):
+        # Too large for an int64 column
+        kind = STR
+    return kind
+
+
+def _widen(kind: str, other: str) -> str:
+    if kind == other or other == NULL:
+        return kind
+    if kind == NULL:
+        return other
+    if {kind, other} == {INT, FLOAT}:
+        return FLOAT
+    return STR
+
+
+def _conform(values: Optional[List], length: int, kind: str) -> List:
+    if values is None:
+        return [None] * length
+    if kind == FLOAT:
+        return [None if value is None else float(value) for value in values]
+    if kind == STR:
+        return [
+            value if value is None or type(value) is str else _str(value)
+            for value in values
+        ]
+    return values
+
+
+def _str(value) -> str:
+    if isinstance(value, bool):
+        return json.dumps(value)
+    return str(value)
+
+
+def _arrow_type(pa, kind: str):
+    return {
+        NULL: pa.null(),
+        BOOL: pa.bool_(),
+        INT: pa.int64(),
+        FLOAT: pa.float64(),
+        STR: pa.string(),
+    }[kind]
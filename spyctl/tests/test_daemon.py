@@ -0,0 +1,89 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+import spyctl.config.configs as cfgs
+import spyctl.daemon as dmn
+import spyctl.spyctl_lib as lib
+
+SPYCTL = [sys.executable, "-c", "from spyctl.daemon import run; run()"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs fork")
+def test_daemon():
+    # Short, the socket path must fit in 104 characters on macOS
+    home = Path(tempfile.mkdtemp(prefix="spy"))
+    env = dict(os.environ, HOME=str(home))
+    env.pop(dmn.NO_DAEMON_ENV, None)
+
+    def spyctl(*args, **kwargs):
+        return subprocess.run(
+            [*SPYCTL, *args],
+            env=env,
+            cwd=home,
+            capture_output=True,
+            text=True,
+            timeout=60,
+            **kwargs,
+        )
+
+    def write_config(current_context):
+        config = dict(cfgs.CONFIG_TEMPLATE)
+        config[lib.CONTEXTS_FIELD] = [
+            {
+                lib.CONTEXT_NAME_FIELD: name,
+                lib.SECRET_FIELD: "secret",
+                lib.CONTEXT_FIELD: {lib.ORG_FIELD: "org"},
+            }
+            for name in ["a", "b"]
+        ]
+        config[lib.CURR_CONTEXT_FIELD] = current_context
+        with (home / cfgs.APP_DIR / cfgs.CONFIG_FILENAME).open("w") as f:
+            lib.yaml_dump(config, f)
+
+    try:
+        (home / cfgs.APP_DIR / cfgs.SECRETS_DIR).mkdir(parents=True)
+        secrets_path = home / cfgs.APP_DIR / cfgs.SECRETS_DIR
+        secrets_path /= cfgs.SECRETS_FILENAME
+        with secrets_path.open("w") as f:
+            secret = {
+                lib.API_FIELD: lib.API_VERSION,
+                lib.KIND_FIELD: lib.SECRET_KIND,
+                lib.METADATA_FIELD: {lib.METADATA_NAME_FIELD: "secret"},
+                lib.STRING_DATA_FIELD: {
+                    lib.API_KEY_FIELD: "key",
+                    lib.API_URL_FIELD: "https://api.example.com",
+                },
+            }
+            lib.yaml_dump([secret], f)
+        write_config("a")
+        # No version check against pypi
+        (home / cfgs.APP_DIR / ".v_check_cache").write_text(str(time.time()))
+        local = spyctl("--version")
+        assert "not running" in spyctl("daemon", "status").stderr
+        started = spyctl("daemon", "start")
+        assert started.returncode == 0, started.stderr
+        try:
+            socket_path = home / cfgs.APP_DIR / dmn.SOCKET_FILENAME
+            assert socket_path.stat().st_mode & 0o777 == 0o600
+            forwarded = spyctl("--version")
+            assert forwarded.stdout == local.stdout
+            assert forwarded.returncode == local.returncode
+            assert spyctl("get").returncode == 2
+            # Commands see the config as it is when they run
+            assert spyctl("config", "current-context").stdout == "a\n"
+            write_config("b")
+            assert spyctl("config", "current-context").stdout == "b\n"
+            assert "4 commands run" in spyctl("daemon", "status").stderr
+        finally:
+            assert spyctl("daemon", "stop").returncode == 0
+        assert not socket_path.exists()
+        assert spyctl("--version").stdout == local.stdout
+    finally:
+        shutil.rmtree(home)
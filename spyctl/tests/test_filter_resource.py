@@ -0,0 +1,122 @@
+from copy import deepcopy
+from pathlib import Path
+
+import yaml
+
+import spyctl.config.configs as cfgs
+import spyctl.filter_resource as filt
+import spyctl.spyctl_lib as lib
+
+resources_dir = Path(__file__).parent / "test_resources"
+
+
+def load_fingerprints():
+    with open(resources_dir / "test_fprint_group.yaml") as f:
+        fprint_grp = yaml.load(f, yaml.Loader)
+    fprints = fprint_grp["data"]["fingerprints"]
+    other = deepcopy(fprints[1])
+    other[lib.SPEC_FIELD][lib.CONT_SELECTOR_FIELD][lib.IMAGE_FIELD] = "other"
+    other[lib.SPEC_FIELD][lib.POD_SELECTOR_FIELD][lib.MATCH_LABELS_FIELD][
+        "app"
+    ] = "other"
+    return fprints + [other]
+
+
+def test_iter_filter_fingerprints():
+    fprints = load_fingerprints()
+    cases = [
+        ({}, [0, 1, 2]),
+        ({lib.IMAGE_FIELD: "spyderbat-test"}, [0, 1]),
+        ({lib.IMAGE_FIELD: "spyder*"}, [0, 1]),
+        ({lib.IMAGEID_FIELD: "sha256:6e2e"}, [0, 1, 2]),
+        ({lib.POD_LABELS_FIELD: {"app": "other"}}, [2]),
+        (
+            {lib.NAMESPACE_LABELS_FIELD: {"kubernetes.io/metadata.name": "x"}},
+            [],
+        ),
+    ]
+    for filters, expected in cases:
+        # Accepts a stream and yields matches as they arrive
+        matches = filt.iter_filter_fingerprints(
+            iter(fprints), use_context_filters=False, **filters
+        )
+        assert list(matches) == [fprints[i] for i in expected]
+
+
+def test_filter_obj():
+    records = [
+        {"name": "web-1", "uid": "a", "meta": {"tags": ["prod", "blue"]}},
+        {"name": "db-1", "uid": "web", "meta": {"tags": ["dev"]}},
+        {"name": "api", "uid": "c", "meta": {}},
+        {"name": 5, "uid": "d"},
+    ]
+    cases = [
+        (["name"], "web*", [0]),
+        (["name", "uid"], "web*", [0, 1]),
+        (["name", "uid"], ["api", "c"], [2]),
+        (["name"], ["*-1"], [0, 1]),
+        (["meta.tags"], "dev", [1]),
+        ([["meta", "tags"]], "b*", [0]),
+        (["missing.field"], "*", []),
+        (["name"], "-all", [0, 1, 2, 3]),
+    ]
+    for fields, filters, expected in cases:
+        matched = filt.filter_obj(records, fields, filters)
+        assert matched == [records[i] for i in expected]
+        match = filt.compile_filter_obj(fields, filters)
+        assert [rec for rec in records if match(rec)] == matched
+
+
+def test_fingerprint_index():
+    fprints = load_fingerprints()
+    index = filt.FingerprintIndex(fprints)
+    filter_sets = [
+        {},
+        {lib.IMAGE_FIELD: "spyderbat-test"},
+        {lib.IMAGE_FIELD: "spyder*"},
+        {lib.IMAGE_FIELD: ["oth*", "x"]},
+        {lib.IMAGEID_FIELD: "sha256:6e2e"},
+        {lib.POD_LABELS_FIELD: {"app": "other"}},
+        {lib.IMAGE_FIELD: "other", lib.POD_LABELS_FIELD: {"app": "o*"}},
+        {lib.NAMESPACE_LABELS_FIELD: {"kubernetes.io/metadata.name": "x"}},
+    ]
+    for filters in filter_sets:
+        expected = filt.filter_fingerprints(
+            fprints,
+            use_context_filters=False,
+            suppress_warning=True,
+            **filters,
+        )
+        assert index.matching(**filters) == expected
+    for i in range(len(filter_sets)):
+        uncovered = fprints
+        for filters in filter_sets[i:]:
+            uncovered = filt.filter_fingerprints(
+                uncovered,
+                use_context_filters=False,
+                suppress_warning=True,
+                not_matching=True,
+                **filters,
+            )
+        assert index.not_matching_any(filter_sets[i:]) == uncovered
+
+
+def test_context_filters_resolved_once(monkeypatch):
+    class Context:
+        calls = 0
+
+        def get_filters(self):
+            self.calls += 1
+            return {lib.IMAGE_FIELD: "other"}
+
+    fprints = load_fingerprints()
+    ctx = Context()
+    monkeypatch.setattr(cfgs, "CURRENT_CONTEXT", ctx)
+    for _ in range(3):
+        assert filt.filter_fingerprints(fprints) == fprints[2:]
+    assert ctx.calls == 1
+    # A new command's context is resolved again
+    new_ctx = Context()
+    monkeypatch.setattr(cfgs, "CURRENT_CONTEXT", new_ctx)
+    assert filt.filter_fingerprints(fprints) == fprints[2:]
+    assert new_ctx.calls == 1
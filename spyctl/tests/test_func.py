@@ -1,8 +1,24 @@
+import csv
+import gzip
+import io
+import json
 import os
 from contextlib import redirect_stderr
+from pathlib import Path
 import time
 
+import click
+import pytest
+import yaml
+from tabulate import tabulate
+
+import spyctl.cli as cli
+import spyctl.config.configs as cfgs
+import spyctl.config.secrets as secrets
+import spyctl.name_index as names
+import spyctl.schemas_v2 as schemas
 import spyctl.spyctl_lib as lib
+import spyctl.table_export as tbl
 
 
 def test_label_only_key_inp():
@@ -110,3 +126,310 @@ def test_timeinp():
     capped_inp = lib.time_inp("09/16/2020", cap_one_day=True)
     one_day_ago = time.time() - 24 * 60 * 60
     assert abs(capped_inp - one_day_ago) < 1
+
+
+def test_canonical_hash():
+    obj = {"b": [1, "x", {"c": None}], "a": {"d": 1.5, "e": True}}
+    reordered = {"a": {"e": True, "d": 1.5}, "b": [1, "x", {"c": None}]}
+    assert lib.canonical_hash(obj) == lib.canonical_hash(reordered)
+    # Values of different types never collide
+    hashes = {lib.canonical_hash(v) for v in (1, 1.0, True, "1", [1], None)}
+    assert len(hashes) == 6
+    assert lib.canonical_hash(["a", "b"]) != lib.canonical_hash(["ab"])
+    # Cached subtree digests don't change the result
+    cache = {}
+    digest = lib.canonical_hash(obj, cache)
+    assert id(obj["a"]) in cache
+    assert lib.canonical_hash(obj, cache) == digest
+    assert lib.canonical_hash(obj["a"], cache) == lib.canonical_hash(obj["a"])
+
+
+def test_record_writer(capsys):
+    records = [{"a": 1, "b": [1, 2], "c": {"d": "e\nf"}}, {"a": 2}, {}]
+    cli.show_records(records, lib.OUTPUT_JSON)
+    assert capsys.readouterr().out == json.dumps(records, indent=2) + "\n"
+    # Written as json.dumps would, whether or not orjson is installed
+    numbers = [{"big": 1e20, "small": 1e-7, "nan": float("nan"), "s": "é"}]
+    cli.show_records(numbers, lib.OUTPUT_JSON)
+    assert capsys.readouterr().out == json.dumps(numbers, indent=2) + "\n"
+    cli.show_records(records[:1], lib.OUTPUT_JSON)
+    assert json.loads(capsys.readouterr().out) == records[:1]
+    cli.show_records([], lib.OUTPUT_JSON)
+    assert capsys.readouterr().out == "[]\n"
+    # Only a single named resource is written as a bare object
+    cli.show_records(records[:1], lib.OUTPUT_JSON, single=True)
+    assert json.loads(capsys.readouterr().out) == records[0]
+    cli.show_records(records, lib.OUTPUT_JSON, single=True)
+    assert json.loads(capsys.readouterr().out) == records
+    # Small buffer so the records are written in several batches
+    with cli.RecordWriter(lib.OUTPUT_JSON, ndjson=True, buffer_size=8) as w:
+        for record in records:
+            w.write(record)
+        w.write(records)
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in lines] == records + records
+    cli.show_records(records, lib.OUTPUT_YAML)
+    assert capsys.readouterr().out == "".join(
+        yaml.dump(record, sort_keys=False) + "\n" for record in records
+    )
+
+
+def test_show_table_stream(capsys):
+    headers = ["NAME", "COUNT", "STATUS"]
+    rows = [["proc-a", 3, "running"], ["b", 12, None], ["proc-c", 100, "x"]]
+    cli.show_table_stream(rows, headers)
+    assert capsys.readouterr().out == (
+        tabulate(rows, headers, tablefmt="plain") + "\n"
+    )
+    # Rows after the sample keep the sampled widths, wide cells overflow
+    cli.show_table_stream(rows + [["a-much-longer-name", 4, "ok"]], headers, 3)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[:4] == tabulate(rows, headers, tablefmt="plain").splitlines()
+    assert lines[4] == "a-much-longer-name        4  ok"
+    # Numbers are aligned on the decimal point, empty rows are kept
+    headers = ["NAME", "N", "SIZE", "NOTE"]
+    rows = [
+        ["a", 1, 1.25, "x"],
+        [None, None, None, None],
+        ["bb", 10, 10.5, None],
+        ["c", None, 3, "y"],
+        ["d", -2, 1e-7, None],
+    ]
+    cli.show_table_stream(rows, headers)
+    assert capsys.readouterr().out == (
+        tabulate(rows, headers, tablefmt="plain") + "\n"
+    )
+    cli.show_table_stream(rows + [["e", 100, 0.5, "z"]], headers, 5)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[:6] == tabulate(rows, headers, tablefmt="plain").split("\n")
+    assert lines[6] == "e       100   0.5    z"
+
+
+def test_table_writer_csv():
+    records = [
+        {"id": "a", "n": 1, "meta": {"name": "x"}, "args": ["-c"]},
+        {"id": "b", "n": 1.5, "ok": True},
+        {"id": "c", "n": None, "meta": {"name": "y", "uid": 3}},
+    ]
+    dest = io.BytesIO()
+    # Small row groups so the schema is widened across batches
+    with tbl.TableWriter(lib.OUTPUT_CSV, dest, row_group_size=2) as writer:
+        for record in records:
+            writer.write(record)
+    rows = list(csv.reader(io.StringIO(dest.getvalue().decode())))
+    assert rows == [
+        ["id", "n", "meta.name", "args", "ok", "meta.uid"],
+        ["a", "1", "x", '["-c"]', "", ""],
+        ["b", "1.5", "", "", "true", ""],
+        ["c", "", "y", "", "", "3"],
+    ]
+
+
+def test_table_writer_empty():
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    for output in [lib.OUTPUT_PARQUET, lib.OUTPUT_ARROW]:
+        dest = io.BytesIO()
+        with tbl.TableWriter(output, dest):
+            pass
+        dest.seek(0)
+        if output == lib.OUTPUT_PARQUET:
+            table = pq.read_table(dest)
+        else:
+            table = pa.ipc.open_file(dest).read_all()
+        assert table.num_rows == 0
+        assert table.num_columns == 0
+
+
+def test_compressed_files(tmp_path):
+    records = [{"id": i, "name": f"proc{i}"} for i in range(100)]
+    out_path = str(tmp_path / "procs.json.gz")
+    with cli.output_to_file(out_path):
+        cli.show_records(records, lib.OUTPUT_JSON, ndjson=True)
+    with gzip.open(out_path, "rt") as f:
+        assert [json.loads(line) for line in f] == records
+    policy_path = Path(__file__).parent / "test_resources" / "test_policy.yaml"
+    with open(policy_path) as f:
+        policy = yaml.safe_load(f)
+    gz_path = str(tmp_path / "policy.yaml.gz")
+    with lib.open_file(gz_path, "w") as f:
+        yaml.dump(policy, f)
+    policy_file = lib.File().convert(gz_path, None, None)
+    assert policy_file.name == gz_path
+    assert lib.load_resource_file(policy_file) == policy
+    policy_file.close()
+
+
+def test_yaml_dump_and_load():
+    objs = [
+        {"spec": {"exe": ["/bin/sh -c 'x: y'", "#"], "n": 1.5, "b": None}},
+        [{"": "empty key"}, {"k" * 100: "long key"}, "tab\tand ü"],
+        {"long": " ".join(["word"] * 60), "quotes": "'\"", "yes": "yes"},
+    ]
+    for obj in objs:
+        for sort_keys in (True, False):
+            assert lib.yaml_dump(obj, sort_keys=sort_keys) == yaml.dump(
+                obj, sort_keys=sort_keys
+            )
+            assert yaml.load(lib.yaml_dump(obj), lib.YamlLoader) == obj
+    with pytest.raises(ValueError, match="Duplicate key 'a'"):
+        yaml.load("a: 1\nb: 2\na: 3\n", lib.UniqueKeyLoader)
+
+
+def test_config_cache(tmp_path, monkeypatch):
+    config_dir = tmp_path / "home" / ".spyctl"
+    paths = {
+        "GLOBAL_CONFIG_DIR": config_dir,
+        "GLOBAL_CONFIG_PATH": config_dir / "config",
+        "GLOBAL_SECRETS_DIR": config_dir / ".secrets",
+        "GLOBAL_SECRETS_PATH": config_dir / ".secrets" / "secrets",
+        "CONFIG_CACHE_PATH": config_dir / ".config_cache",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(cfgs, name, path)
+    for name in ["LOADED_CONFIG", "LOADED_CONFIGS", "CURRENT_CONTEXT"]:
+        monkeypatch.setattr(cfgs, name, getattr(cfgs, name))
+    monkeypatch.setattr(cfgs, "TESTING", True)
+    monkeypatch.setattr(secrets, "SECRETS", None)
+    (tmp_path / "work").mkdir()
+    monkeypatch.chdir(tmp_path / "work")
+    calls = []
+    valid_object = cfgs.schemas.valid_object
+
+    def counting_valid_object(*args, **kwargs):
+        calls.append(args)
+        return valid_object(*args, **kwargs)
+
+    monkeypatch.setattr(cfgs.schemas, "valid_object", counting_valid_object)
+
+    def write_config(*names):
+        config = dict(cfgs.CONFIG_TEMPLATE)
+        config[lib.CONTEXTS_FIELD] = [
+            {
+                lib.CONTEXT_NAME_FIELD: name,
+                lib.SECRET_FIELD: "secret",
+                lib.CONTEXT_FIELD: {lib.ORG_FIELD: "org"},
+            }
+            for name in names
+        ]
+        config[lib.CURR_CONTEXT_FIELD] = names[0]
+        with paths["GLOBAL_CONFIG_PATH"].open("w") as f:
+            lib.yaml_dump(config, f)
+
+    cfgs.load_config()
+    with paths["GLOBAL_SECRETS_PATH"].open("w") as f:
+        secret = {
+            lib.API_FIELD: lib.API_VERSION,
+            lib.KIND_FIELD: lib.SECRET_KIND,
+            lib.METADATA_FIELD: {lib.METADATA_NAME_FIELD: "secret"},
+            lib.STRING_DATA_FIELD: {
+                lib.API_KEY_FIELD: "key",
+                lib.API_URL_FIELD: "https://api.example.com",
+            },
+        }
+        lib.yaml_dump([secret], f)
+    write_config("a")
+    calls.clear()
+    cfgs.load_config()
+    assert len(calls) == 2
+    assert paths["CONFIG_CACHE_PATH"].stat().st_mode & 0o777 == 0o600
+    # Nothing changed, so nothing is parsed or validated again
+    calls.clear()
+    cfgs.load_config()
+    assert not calls
+    assert list(cfgs.get_loaded_config().contexts) == ["a"]
+    assert cfgs.get_current_context().secret.name == "secret"
+    write_config("b", "a")
+    cfgs.load_config()
+    assert len(calls) == 2
+    assert list(cfgs.get_loaded_config().contexts) == ["b", "a"]
+    assert cfgs.get_current_context().name == "b"
+
+
+def test_name_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(cfgs, "GLOBAL_CONFIG_DIR", tmp_path)
+    policies = [
+        {"metadata": {"name": "web", "uid": "pol:1"}},
+        {"metadata": {"name": "db", "uid": "pol:2"}},
+    ]
+    names.set_names(names.POLICIES, "ctx", policies)
+    machines = [{"hostname": "host-a", "id": "mach:1"}]
+    # Names are only indexed once every record has been consumed
+    records = names.collect(names.MACHINES, "ctx", iter(machines))
+    assert next(records) == machines[0]
+    assert names.get_names(names.MACHINES, "ctx") == []
+    assert list(records) == []
+    assert names.get_names(names.MACHINES, "ctx") == ["host-a", "mach:1"]
+    assert names.get_names(names.POLICIES, "other") == []
+
+    class Config:
+        current_context = "ctx"
+
+    monkeypatch.setattr(cfgs, "load_config", lambda silent: None)
+    monkeypatch.setattr(cfgs, "get_loaded_config", Config)
+    ctx = click.Context(click.Command("get"))
+    ctx.params["resource"] = "policy"
+    completions = names.complete_name_or_id(ctx, None, "pol:")
+    assert [item.value for item in completions] == ["pol:1", "pol:2"]
+    ctx.params["resource"] = "pods"
+    assert names.complete_name_or_id(ctx, None, "") == []
+
+
+def test_validation_cache(monkeypatch):
+    resources = Path(__file__).parent / "test_resources"
+    policy, invalid, fprint_group = (
+        yaml.load((resources / name).read_text(), lib.YamlLoader)
+        for name in [
+            "test_policy.yaml",
+            "test_invalid_process_policy.yaml",
+            "test_fprint_group.yaml",
+        ]
+    )
+    policy_kind = lib.POL_KIND
+    fprint_group_kind = lib.FPRINT_GROUP_KIND
+    calls = []
+
+    def counting(kind):
+        model = schemas.KIND_TO_SCHEMA[kind]
+
+        def construct(**data):
+            calls.append(kind)
+            return model(**data)
+
+        return construct
+
+    monkeypatch.setattr(
+        schemas, "KIND_TO_SCHEMA", dict(schemas.KIND_TO_SCHEMA)
+    )
+    for kind in [policy_kind, fprint_group_kind]:
+        monkeypatch.setitem(schemas.KIND_TO_SCHEMA, kind, counting(kind))
+    monkeypatch.setattr(schemas, "__VALID_OBJECTS", set())
+
+    assert schemas.valid_object(policy)
+    assert schemas.valid_object(policy)
+    assert calls == [policy_kind]
+    # Invalid objects are validated, and their errors logged, every time
+    calls.clear()
+    assert not schemas.valid_object(invalid, verbose=False)
+    assert not schemas.valid_object(invalid, verbose=False)
+    assert calls == [policy_kind, policy_kind]
+    # Items of a list are validated by the list model only in outline
+    calls.clear()
+    obj_list = {
+        lib.API_FIELD: lib.API_VERSION,
+        lib.ITEMS_FIELD: [fprint_group, policy],
+    }
+    assert schemas.valid_object(obj_list)
+    assert calls == [fprint_group_kind]
+    # A changed object is validated again
+    calls.clear()
+    policy[lib.METADATA_FIELD][lib.METADATA_NAME_FIELD] = "changed"
+    assert schemas.valid_object(policy)
+    assert calls == [policy_kind]
+
+    objs = [policy, invalid, "policy", obj_list, invalid]
+    errors = list(schemas.validate_objects(objs, chunk_size=2))
+    assert [i for i, _ in errors] == [1, 2, 4]
+    assert errors[1][1] == "Invalid object, expect dictionary."
+    assert list(schemas.validate_objects(objs, jobs=2, chunk_size=2)) == errors
@@ -0,0 +1,110 @@
+import ipaddress
+
+import spyctl.group_by as grp
+import spyctl.resources.connections as spyctl_conns
+
+
+def test_group_by():
+    records = [
+        {"name": "a", "time": 3, "euid": 1000, "image": "x"},
+        {"name": "b", "time": None, "euid": 0, "image": "y"},
+        {"name": "a", "time": 5, "euid": 0, "image": "y"},
+        {"name": "a", "time": 1, "euid": 1000, "image": "x"},
+        {"name": "c", "time": 2, "euid": 1000, "image": "z"},
+    ]
+    # Small batches so groups span several of them
+    groups = grp.GroupBy(
+        "name",
+        batch_size=2,
+        ref=(grp.FIRST, None),
+        count=(grp.COUNT, None),
+        latest=(grp.MAX, "time"),
+        earliest=(grp.MIN, "time"),
+        root=(grp.ANY, lambda rec: rec["euid"] == 0),
+        images=(grp.DISTINCT, "image"),
+        total=(grp.SUM, "euid"),
+    ).update(iter(records[:4]))
+    groups.update(records[4:])
+    assert len(groups) == 3
+    rv = dict(groups.items())
+    assert list(rv) == ["a", "b", "c"]
+    assert rv["a"] == {
+        "ref": records[0],
+        "count": 3,
+        "latest": 5,
+        "earliest": 1,
+        "root": True,
+        "images": {"x", "y"},
+        "total": 2000,
+    }
+    assert rv["b"]["latest"] is None and rv["b"]["root"]
+    assert rv["c"]["ref"] is records[4] and not rv["c"]["root"]
+
+
+def test_group_connections():
+    conns = [
+        {"remote_ip": ip, "direction": "egress", "proc_name": "curl"}
+        for ip in ("10.0.1.5", "10.0.1.17", "10.1.2.1", "10.0.2.1")
+    ]
+    groups = spyctl_conns.group_connections(conns)
+    ips = [
+        spyctl_conns.connection_group_summary_data(group, False)[0]
+        for _, group in groups.items()
+    ]
+    assert ips == ["10.0.*", "10.1.2.1"]
+
+
+def test_connection_ip_ranges():
+    # Each set of ips lands in one group, rendered like folding
+    # _loose_abbrev_ips over their exploded forms
+    cases = [
+        ["10.0.1.5", "10.0.1.17", "10.0.1.9"],
+        ["10.0.1.1", "10.0.1.15", "10.0.1.2"],
+        ["10.0.100.1", "10.0.100.1"],
+        ["2001:db8::1", "2001:db8::1:0", "2001:db8::ff"],
+        ["fe80::1", "fe80::2"],
+    ]
+    for ips in cases:
+        conns = [
+            {"remote_ip": ip, "direction": "egress", "proc_name": "curl"}
+            for ip in ips
+        ]
+        expected = None
+        for ip in ips:
+            exploded = ipaddress.ip_address(ip).exploded
+            if expected is None:
+                expected = exploded
+            else:
+                expected = spyctl_conns._loose_abbrev_ips(expected, exploded)
+        groups = list(spyctl_conns.group_connections(conns).items())
+        assert len(groups) == 1
+        ip = spyctl_conns.connection_group_summary_data(groups[0][1], False)
+        assert ip[0] == spyctl_conns._shorten_v6(expected)
+
+
+def test_top_k():
+    # A heavy key among many light ones, with a bounded number of groups
+    keys = ["heavy" if i % 3 == 0 else f"light{i}" for i in range(300)]
+    records = [{"name": key, "time": i} for i, key in enumerate(keys)]
+    top = grp.group(records, "name", top=4, count=(grp.COUNT, None))
+    assert len(top) == 4
+    rv = list(top.items())
+    assert rv[0][0] == "heavy"
+    for key, group in rv:
+        true_count = keys.count(key)
+        assert group["count"] <= true_count
+        assert true_count <= group["count"] + top.error(key)
+    top = grp.group(
+        records,
+        "name",
+        top=2,
+        top_by=grp.TOP_BY_LATEST,
+        latest="time",
+        count=(grp.COUNT, None),
+        last_seen=(grp.MAX, "time"),
+    )
+    rv = list(top.items())
+    assert [key for key, _ in rv] == ["light299", "light298"]
+    assert rv[0][1]["last_seen"] == 299
+    assert grp.count_range(5, 0) == "5"
+    assert grp.count_range(5, 2) == "5..7"
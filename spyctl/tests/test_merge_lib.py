@@ -0,0 +1,225 @@
+import ipaddress
+from copy import deepcopy
+from pathlib import Path
+
+import yaml
+
+import spyctl.merge_lib as m_lib
+import spyctl.resources.baselines as b
+import spyctl.schemas_v2 as schemas
+import spyctl.spyctl_lib as lib
+
+resources_dir = Path(__file__).parent / "test_resources"
+
+
+def load_resource(name: str):
+    with open(resources_dir / name) as f:
+        return yaml.load(f, yaml.Loader)
+
+
+def test_merge_object_copy_on_write():
+    baseline = load_resource("test_baseline.yaml")
+    extra = load_resource("test_baseline_extra.yaml")
+    merge_obj = m_lib.MergeObject(
+        baseline, b.BASELINE_MERGE_SCHEMAS, schemas.valid_object
+    )
+    assert merge_obj.original_obj is baseline
+    assert merge_obj.starting_yaml == yaml.dump(baseline)
+    orig_yaml = yaml.dump(baseline)
+    merge_obj.asymmetric_merge(extra)
+    assert merge_obj.get_obj_data() is not baseline
+    assert yaml.dump(baseline) == orig_yaml
+
+
+def test_dedup_merge_objects():
+    fprints = load_resource("test_fprint_group.yaml")["data"]["fingerprints"]
+    newer = deepcopy(fprints[0])
+    newer[lib.METADATA_FIELD][lib.LATEST_TIMESTAMP_FIELD] += 100
+    older = deepcopy(fprints[1])
+    older[lib.METADATA_FIELD][lib.LATEST_TIMESTAMP_FIELD] -= 100
+    stream = iter(fprints + [newer, older])
+    unique = list(m_lib.dedup_merge_objects(stream))
+    assert len(unique) == 3
+    assert unique[0] is fprints[0]
+    assert unique[1] is fprints[1]
+    # Duplicates are only merged again to advance the latest timestamp
+    assert unique[2] is newer
+    # Without a checksum, relevance is recorded by uid so each is kept
+    other_uid = deepcopy(fprints[0])
+    other_uid[lib.METADATA_FIELD][lib.METADATA_UID_FIELD] = "other"
+    unique = list(m_lib.dedup_merge_objects([fprints[0], other_uid]))
+    assert unique == [fprints[0], other_uid]
+    with_checksum = deepcopy(other_uid)
+    with_checksum[lib.METADATA_FIELD][lib.CHECKSUM_FIELD] = "checksum"
+    duplicate = deepcopy(with_checksum)
+    duplicate[lib.METADATA_FIELD][lib.METADATA_UID_FIELD] = "dup"
+    unique = list(m_lib.dedup_merge_objects([with_checksum, duplicate]))
+    assert unique == [with_checksum]
+
+
+def test_merge_memo(tmp_path):
+    memo_path = tmp_path / "memo"
+    memo = m_lib.MergeMemo(memo_path)
+    assert memo.get("spec", "checksum") is None
+    memo.set("spec", "checksum", False)
+    memo.save()
+    memo = m_lib.MergeMemo(memo_path)
+    assert memo.get("spec", "checksum") is False
+
+
+def test_merge_dirty_tracking():
+    baseline = load_resource("test_baseline.yaml")
+    extra = load_resource("test_baseline_extra.yaml")
+    extra[lib.METADATA_FIELD][lib.CHECKSUM_FIELD] = "extra"
+    merge_obj = m_lib.MergeObject(
+        baseline, b.BASELINE_MERGE_SCHEMAS, schemas.valid_object
+    )
+    merge_obj.asymmetric_merge(extra, check_irrelevant=True)
+    assert merge_obj.spec_changed
+    assert merge_obj.is_relevant_obj(lib.BASELINE_KIND, "extra")
+    # Merging the same object again is a no-op
+    merge_obj.spec_changed = False
+    merge_obj.asymmetric_merge(extra)
+    assert not merge_obj.spec_changed
+    merge_obj = m_lib.MergeObject(
+        baseline, b.BASELINE_MERGE_SCHEMAS, schemas.valid_object
+    )
+    merge_obj.asymmetric_merge(baseline)
+    assert not merge_obj.spec_changed
+
+
+def test_yaml_line_index():
+    baseline = load_resource("test_baseline.yaml")
+    yaml_lines = yaml.dump(baseline, sort_keys=False).splitlines()
+    line_index = m_lib.YamlLineIndex(yaml_lines)
+    end = len(yaml_lines)
+    for field in ["spec", "processPolicy", "networkPolicy", "id", "exe"]:
+        for whitespace_length in range(0, 12, 2):
+            for prefix in [None, "  - ", "    - "]:
+                assert m_lib.find_obj_indexes(
+                    yaml_lines, field, 0, end, whitespace_length, prefix
+                ) == m_lib.find_obj_indexes(
+                    yaml_lines,
+                    field,
+                    0,
+                    end,
+                    whitespace_length,
+                    prefix,
+                    line_index,
+                )
+            assert m_lib.find_ancestor_indexes(
+                yaml_lines, field, whitespace_length, 0, end
+            ) == m_lib.find_ancestor_indexes(
+                yaml_lines, field, whitespace_length, 0, end, line_index
+            )
+    for item_si in range(end - 1):
+        for prefix in ["  - ", "    - ", "  - - "]:
+            assert m_lib.find_item_ending_index(
+                item_si, end, yaml_lines, prefix
+            ) == m_lib.find_item_ending_index(
+                item_si, end, yaml_lines, prefix, line_index
+            )
+
+
+def test_json_patch_diff():
+    orig = {
+        "spec": {
+            "processPolicy": [
+                {"id": "a", "exe": ["/bin/a"]},
+                {"id": "b", "exe": ["/bin/b"]},
+                {"id": "c", "exe": ["/bin/c"]},
+            ],
+            "labels": {"app/name": "x", "old": "y"},
+            "ports": [80, 443],
+        }
+    }
+    other = {
+        "spec": {
+            "processPolicy": [
+                {"id": "c", "exe": ["/bin/c"]},
+                {"id": "a", "exe": ["/bin/a", "/bin/a2"]},
+                {"id": "d", "exe": ["/bin/d"]},
+            ],
+            "labels": {"app/name": "z"},
+            "ports": [22, 80],
+        }
+    }
+    assert m_lib.json_patch_diff(orig, other) == [
+        {"op": "remove", "path": "/spec/processPolicy/1"},
+        {
+            "op": "move",
+            "from": "/spec/processPolicy/1",
+            "path": "/spec/processPolicy/0",
+        },
+        {
+            "op": "add",
+            "path": "/spec/processPolicy/1/exe/1",
+            "value": "/bin/a2",
+        },
+        {
+            "op": "add",
+            "path": "/spec/processPolicy/2",
+            "value": {"id": "d", "exe": ["/bin/d"]},
+        },
+        {"op": "replace", "path": "/spec/labels/app~1name", "value": "z"},
+        {"op": "remove", "path": "/spec/labels/old"},
+        {"op": "remove", "path": "/spec/ports/1"},
+        {"op": "add", "path": "/spec/ports/0", "value": 22},
+    ]
+    assert m_lib.json_patch_diff(orig, deepcopy(orig)) == []
+    # 1, 1.0 and True are different json values, however nested
+    orig = {"spec": {"x": 1, "y": "z", "l": [1, True, {"n": 0}]}}
+    other = {"spec": {"x": 1.0, "y": "z", "l": [1.0, 1, {"n": False}]}}
+    assert m_lib.json_patch_diff(orig, other) == [
+        {"op": "replace", "path": "/spec/x", "value": 1.0},
+        {"op": "replace", "path": "/spec/l/0", "value": 1.0},
+        {"op": "replace", "path": "/spec/l/1", "value": 1},
+        {"op": "replace", "path": "/spec/l/2/n", "value": False},
+    ]
+    assert m_lib.json_patch_diff({"p": [1, 2]}, {"p": [True, 2]}) == [
+        {"op": "remove", "path": "/p/0"},
+        {"op": "add", "path": "/p/0", "value": True},
+    ]
+
+
+def test_make_wildcard():
+    assert m_lib.make_wildcard(["nginx-abc12", "nginx-def34"]) == "nginx-*"
+    assert m_lib.make_wildcard(["abc-proxy", "def-proxy"]) == "*-proxy"
+    assert m_lib.make_wildcard(["a-kube-1", "b-kube-2"]) == "*-kube-*"
+    assert m_lib.make_wildcard(["abcdef", "uvwxyz"]) is None
+    assert m_lib.make_wildcard(["same", "same"]) == "same"
+    names = [f"payments-{i}-api" for i in range(100)]
+    assert m_lib.make_wildcard(names) == "payments-*"
+    assert (
+        m_lib.longest_common_substring("xxabcyyabcd", ["abcd", "zabcdz"])
+        == "abcd"
+    )
+
+
+def test_ip_block():
+    net = ipaddress.IPv4Network
+    block = m_lib.IPBlock(net("10.0.0.0/16"), [net("10.0.1.0/24")])
+    assert m_lib.IPBlock(net("10.0.2.0/24")) in block
+    assert m_lib.IPBlock(net("10.0.1.128/25")) not in block
+    assert m_lib.IPBlock(net("10.1.0.0/24")) not in block
+    assert m_lib.IPBlock(ipaddress.IPv6Network("::/0")) not in block
+    assert block.network == net("10.0.0.0/16")
+    assert block.as_dict() == {
+        lib.IP_BLOCK_FIELD: {
+            lib.CIDR_FIELD: "10.0.0.0/16",
+            lib.EXCEPT_FIELD: ["10.0.1.0/24"],
+        }
+    }
+    assert block == m_lib.IPBlock(net("10.0.0.0/16"), [net("10.0.1.0/24")])
+    assert block != m_lib.IPBlock(net("10.0.0.0/16"), [])
+
+
+def test_port_range():
+    port_range = m_lib.PortRange(8000, "TCP", 8080)
+    assert m_lib.PortRange(8001, "TCP") in port_range
+    assert m_lib.PortRange(8001, "UDP") not in port_range
+    assert port_range.as_dict() == {
+        lib.PROTO_FIELD: "TCP",
+        lib.PORT_FIELD: 8000,
+        lib.ENDPORT_FIELD: 8080,
+    }
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+# Cumulative time to import spyctl.spyctl, per python -X importtime,
+# at most this many times that of its click and yaml dependencies
+# measured in the same process. Timing noise affects both alike.
+IMPORT_TIME_RATIO = 8
+BASE_MODULES = ["click", "yaml"]
+# Only needed once a command runs, must not be imported at startup
+DEFERRED_MODULES = [
+    "pydantic",
+    "requests",
+    "tqdm",
+    "spyctl.merge_lib",
+    "spyctl.resources.policies",
+]
+
+
+def test_startup_imports():
+    code = (
+        f"import sys, {', '.join(BASE_MODULES)}, spyctl.spyctl;"
+        " print(*sys.modules)"
+    )
+    ratios = []
+    for _ in range(3):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        loaded = set(result.stdout.split())
+        assert not loaded.intersection(DEFERRED_MODULES)
+        times = {}
+        for line in result.stderr.splitlines():
+            _, cumulative, module = line.split("|")
+            if module.strip() in BASE_MODULES + ["spyctl.spyctl"]:
+                times[module.strip()] = int(cumulative)
+        base = sum(times[module] for module in BASE_MODULES)
+        ratios.append(times["spyctl.spyctl"] / base)
+    assert min(ratios) < IMPORT_TIME_RATIO
@@ -47,11 +47,14 @@ def diff(i: DiffInput) -> DiffOutput:
         msg = app_lib.flush_spyctl_log_messages()
         ex.internal_server_error(msg)
     app_lib.flush_spyctl_log_messages()
-    if i.content_type == "json":
-        diff_obj = True
+    if i.content_type == "patch":
+        diff_data = merge_data.get_patch()
     else:
-        diff_obj = False
-    diff_data = merge_data.get_diff(i.full_diff, diff_obj)
+        if i.content_type == "json":
+            diff_obj = True
+        else:
+            diff_obj = False
+        diff_data = merge_data.get_diff(i.full_diff, diff_obj)
     print(
         f"debug diff -- has irrelevant objects: {len(merge_data.get_irrelevant_objects()) > 0}",
     )